@@ -0,0 +1,34 @@
+# Generated by Django 4.0 on 2026-10-19 15:40
+
+from django.db import migrations, models
+import django.db.models.manager
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserSyncEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('action', models.CharField(choices=[('created', 'created'), ('renamed', 'renamed'), ('deleted', 'deleted')], max_length=7)),
+                ('user_pk', models.IntegerField(db_index=True, verbose_name='user.pk')),
+                ('username', models.CharField(max_length=150)),
+                ('date', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'verbose_name': 'user sync event',
+                'verbose_name_plural': 'user sync events',
+                'db_table': 'accounts_user_sync_outbox',
+                'ordering': ['pk'],
+            },
+            managers=[
+                ('manager', django.db.models.manager.Manager()),
+            ],
+        ),
+    ]
@@ -1,4 +1,5 @@
 from django.db import models
+from django.utils import timezone
 from django.contrib.auth.models import User
 
 
@@ -14,3 +15,27 @@ class ProxyUser(User):
         ordering = ['username']
 
     def __str__(self): return self.username
+
+
+class UserSyncEvent(models.Model):
+    """ The outbox of the User changes, written in the same transaction as the change.
+        The applications with their own copy of the users replay it, see auctions.sync. """
+    CREATED = 'created'
+    RENAMED = 'renamed'
+    DELETED = 'deleted'
+    ACTIONS = [(CREATED, 'created'), (RENAMED, 'renamed'), (DELETED, 'deleted')]
+
+    manager = models.Manager()
+
+    action = models.CharField(max_length=7, choices=ACTIONS)
+    user_pk = models.IntegerField('user.pk', db_index=True)
+    username = models.CharField(max_length=150)
+    date = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        db_table = 'accounts_user_sync_outbox'
+        verbose_name = 'user sync event'
+        verbose_name_plural = 'user sync events'
+        ordering = ['pk']
+
+    def __str__(self): return f'#{self.pk} {self.action} {self.username}'
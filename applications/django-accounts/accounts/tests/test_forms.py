@@ -4,12 +4,12 @@ from django.contrib.auth.hashers import make_password
 from django.contrib.auth.models import User
 from accounts.models import ProxyUser
 from accounts.forms import UserLoginForm, UserRegisterForm
-from .tests import PASSWORD_HASHER
+from .tests import AUCTIONS_DB, PASSWORD_HASHER
 
 
 @override_settings(PASSWORD_HASHERS=PASSWORD_HASHER)
 class UserRegisterFormTests(TestCase):
-    databases = ['default']
+    databases = ['default', AUCTIONS_DB]
 
     def test_register_form_normal_case(self):
         form_data = {
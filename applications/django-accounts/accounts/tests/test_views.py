@@ -1,3 +1,5 @@
+from unittest import mock
+
 from django.test import TestCase, override_settings
 from django.urls import reverse
 from django.contrib.auth.hashers import make_password
@@ -5,7 +7,7 @@ from django.contrib.auth.hashers import make_password
 from django.contrib.auth.models import User
 from accounts.models import ProxyUser
 from accounts.forms import UserLoginForm, UserRegisterForm
-from .tests import SECOND_DB, PASSWORD_HASHER
+from .tests import SECOND_DB, AUCTIONS_DB, PASSWORD_HASHER
 
 
 @override_settings(PASSWORD_HASHERS=PASSWORD_HASHER)
@@ -117,7 +119,7 @@ class AccountsLoginLogoutIntegrityTests(TestCase):
 
 @override_settings(PASSWORD_HASHERS=PASSWORD_HASHER)
 class AccountsRegisterViewTests(TestCase):
-    databases = ['default']
+    databases = ['default', AUCTIONS_DB]
 
     def test_register_page_loads(self):
         response = self.client.get(reverse('accounts:register'))
@@ -150,6 +152,15 @@ class AccountsRegisterViewTests(TestCase):
         )
         self.assertTrue(User.objects.filter(username='Serval-chan').exists())
 
+    def test_register_hashes_the_password_once(self):
+        from django.contrib.auth import hashers
+        data = {'username': 'Kaban-chan', 'password1': 'qwerty', 'password2': 'qwerty'}
+        with mock.patch.object(hashers, 'get_hasher', wraps=hashers.get_hasher) as get_hasher:
+            response_post = self.client.post(reverse('accounts:register'), data=data)
+        self.assertRedirects(response_post, reverse('core:index'))
+        self.assertEqual(get_hasher.call_count, 1)
+        self.assertTrue(User.objects.get(username='Kaban-chan').check_password('qwerty'))
+
     def test_register_errors(self):
         """ You shall not pass. """
         errors = [
@@ -165,7 +176,7 @@ class AccountsRegisterViewTests(TestCase):
 
 @override_settings(PASSWORD_HASHERS=PASSWORD_HASHER)
 class AccountsRegisterIntegrityTests(TestCase):
-    databases = ['default', SECOND_DB]
+    databases = ['default', SECOND_DB, AUCTIONS_DB]
 
     def test_register_redirects_back_to_app(self):
         response_register = self.client.post(
@@ -2,6 +2,7 @@ from django.test import SimpleTestCase
 from django.conf import settings
 
 SECOND_DB = settings.PROJECT_MAIN_APPS['polls']['db']['name']
+AUCTIONS_DB = settings.PROJECT_MAIN_APPS['auctions']['db']['name']
 PASSWORD_HASHER = ['django.contrib.auth.hashers.MD5PasswordHasher']
 """ TODO
 + proxy user model
@@ -1,10 +1,11 @@
 import logging
 
 from django.conf import settings
+from django.db import router, transaction
 from django.urls import reverse_lazy
 from django.views import generic
 from django.contrib.messages.views import SuccessMessageMixin
-from django.contrib.auth import views, login, authenticate
+from django.contrib.auth import views, login
 from django.contrib import messages
 
 from django.contrib.auth.models import User
@@ -37,12 +38,11 @@ class RegisterView(SuccessMessageMixin, generic.CreateView):
         next_ = redirect_on_success(self.kwargs.get('next'))
         if next_: self.success_url = next_
 
-        valid = super().form_valid(form)
-        new_user = authenticate(
-            username=form.cleaned_data.get('username'),
-            password=form.cleaned_data.get('password1')
-        )
-        login(self.request, new_user)
+        with transaction.atomic(router.db_for_write(User)):
+            # the user and its sync events are committed together
+            valid = super().form_valid(form)
+        # the password was just hashed by the form, no need to check it once again
+        login(self.request, self.object, backend=settings.AUTHENTICATION_BACKENDS[0])
         return valid
 
 
@@ -3,3 +3,8 @@ from django.apps import AppConfig
 
 class CoreAppConfig(AppConfig):
     name = 'core'
+
+    def ready(self):
+        from django.db.backends.signals import connection_created
+        from .db import apply_sqlite_profile
+        connection_created.connect(apply_sqlite_profile, dispatch_uid='sqlite-profile')
@@ -0,0 +1,59 @@
+""" Helpers for the bench_* management commands. """
+
+import time
+import shutil
+import tempfile
+import statistics
+from pathlib import Path
+from contextlib import contextmanager
+
+from django.db import connections
+
+
+@contextmanager
+def scratch_databases(*aliases):
+    """ Freshly migrated file copies of the given databases,
+        the real ones stay untouched. List the dependencies first. """
+    tmp_dir = Path(tempfile.mkdtemp(prefix='alpaca-bench-'))
+    old_names = {}
+    try:
+        for alias in aliases:
+            connection = connections[alias]
+            connection.close()
+            old_names[alias] = connection.settings_dict['NAME']
+            connection.settings_dict['TEST'] = {
+                **connection.settings_dict.get('TEST', {}),
+                'NAME': str(tmp_dir / f'{alias}.sqlite3'),
+            }
+            connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        yield tmp_dir
+    finally:
+        for alias in reversed(list(old_names)):
+            connections[alias].creation.destroy_test_db(old_names[alias], verbosity=0)
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+class Timer:
+    """ Collects the duration of each run. """
+    def __init__(self):
+        self.samples = []
+
+    @contextmanager
+    def __call__(self):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.samples.append(time.perf_counter() - start)
+
+    @property
+    def total(self) -> float:
+        return sum(self.samples)
+
+    def per_second(self) -> float:
+        return len(self.samples) / self.total if self.total else 0.0
+
+    def percentile_ms(self, percent) -> float:
+        if len(self.samples) < 2:
+            return self.total * 1000
+        return statistics.quantiles(self.samples, n=100)[percent - 1] * 1000
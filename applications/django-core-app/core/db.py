@@ -0,0 +1,162 @@
+import re
+import time
+import copy
+import random
+import logging
+import functools
+import threading
+
+from django.core.exceptions import ObjectDoesNotExist
+from django.db import connections, transaction, OperationalError
+from django.db.models import Model
+
+logger = logging.getLogger(__name__)
+
+LOCK_ERRORS = ('database is locked', 'database table is locked', 'database is busy')
+
+# The retries of a block on a database without a busy_timeout.
+DEFAULT_LOCK_DEADLINE = 3.0
+# The first lock error comes only after SQLite has waited out its busy_timeout,
+# the retries get as many more of them.
+BUSY_TIMEOUTS_PER_DEADLINE = 3
+
+# The order matters: journal_mode must be switched before anything else touches the file.
+SQLITE_PRAGMAS = ['journal_mode', 'synchronous', 'mmap_size', 'cache_size', 'temp_store', 'busy_timeout']
+PRAGMA_VALUE = re.compile(r'^(-?\d+|[A-Za-z]+)$')
+
+
+def apply_sqlite_profile(sender, connection, **kwargs):
+    """
+    A connection_created receiver, sets the PRAGMAS of a database from the settings:
+    DATABASES = {'alias': {..., 'PRAGMAS': {'journal_mode': 'WAL', 'busy_timeout': 5000}}}
+    """
+    if connection.vendor != 'sqlite':
+        return
+    profile = connection.settings_dict.get('PRAGMAS')
+    if not profile:
+        return
+
+    with connection.cursor() as cursor:
+        for pragma in SQLITE_PRAGMAS:
+            if pragma not in profile:
+                continue
+            value = str(profile[pragma])
+            if not PRAGMA_VALUE.match(value):
+                logger.error(f'core: bad value of PRAGMA {pragma} [{value}] on [{connection.alias}]')
+                continue
+            cursor.execute(f'PRAGMA {pragma} = {value}')
+
+
+class LockStats:
+    """ How often and how long the transactions waited for the SQLite write lock. """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self.retried = 0
+        self.retries = 0
+        self.gave_up = 0
+        self.lock_wait = 0.0
+
+    def record(self, retries, lock_wait, gave_up=False):
+        with self._lock:
+            self.retried += 1
+            self.retries += retries
+            self.lock_wait += lock_wait
+            if gave_up:
+                self.gave_up += 1
+
+
+lock_stats = LockStats()
+
+
+def is_lock_error(err) -> bool:
+    return isinstance(err, OperationalError) and any(msg in str(err) for msg in LOCK_ERRORS)
+
+
+def lock_deadline(using) -> float:
+    """ A few busy_timeouts of the PRAGMAS of the database, so the block is retried at all. """
+    busy_timeout = connections[using].settings_dict.get('PRAGMAS', {}).get('busy_timeout', 0) / 1000
+    return max(DEFAULT_LOCK_DEADLINE, busy_timeout * BUSY_TIMEOUTS_PER_DEADLINE)
+
+
+def _copy_instance_dict(instance_dict) -> dict:
+    """ Deep enough for the retry: own ModelState and cache of the related objects. """
+    state = copy.copy(instance_dict['_state'])
+    state.fields_cache = dict(instance_dict['_state'].fields_cache)
+    return {**instance_dict, '_state': state}
+
+
+def _restore(instance, snapshot):
+    instance.__dict__.clear()
+    instance.__dict__.update(_copy_instance_dict(snapshot))
+
+
+def _reload_related(instances):
+    """ The related instances cached on the arguments are reloaded, their changes were rolled back. """
+    seen = {id(instance) for instance in instances}
+    for instance in instances:
+        cache = instance._state.fields_cache
+        for name, related in list(cache.items()):
+            if not isinstance(related, Model) or id(related) in seen:
+                continue
+            seen.add(id(related))
+            if related.pk is None or related._state.adding:
+                continue
+            try:
+                related.refresh_from_db()
+            except ObjectDoesNotExist:
+                del cache[name]
+
+
+def retry_on_lock(using, deadline=None, base_delay=0.01, max_delay=0.25):
+    """
+    Runs the function in transaction.atomic(using) and reruns the whole block
+    when SQLite reports a lock, with jittered exponential backoff, until the deadline,
+    by default a few busy_timeouts of the database, see lock_deadline.
+
+    The model instances among the arguments are restored to their state before the first try,
+    so the block runs on the same input every time, and the saved instances related to them
+    are reloaded from the database, e.g. the listing.owner whose money was changed.
+    Side effects outside the database go to transaction.on_commit. Only the outermost block retries,
+    inside another transaction it is a plain atomic block and the lock goes up to the outer one.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if transaction.get_connection(using).in_atomic_block:
+                with transaction.atomic(using, savepoint=False):
+                    return func(*args, **kwargs)
+
+            limit = deadline if deadline is not None else lock_deadline(using)
+            instances = [arg for arg in (*args, *kwargs.values()) if isinstance(arg, Model)]
+            snapshots = [_copy_instance_dict(instance.__dict__) for instance in instances]
+            start = time.monotonic()
+            attempt = 0
+            while True:
+                try:
+                    with transaction.atomic(using, savepoint=False):
+                        result = func(*args, **kwargs)
+                except OperationalError as err:
+                    if not is_lock_error(err):
+                        raise
+                    waited = time.monotonic() - start
+                    delay = random.uniform(0, min(max_delay, base_delay * 2 ** attempt))
+                    if waited + delay > limit:
+                        lock_stats.record(attempt, waited, gave_up=True)
+                        logger.error(f'core: [{func.__qualname__}] gave up on [{using}] lock '
+                                     f'after {attempt} retries, {waited:.3f}s')
+                        raise
+                    attempt += 1
+                    logger.warning(f'core: [{func.__qualname__}] [{using}] is locked, retry #{attempt}')
+                    for instance, snapshot in zip(instances, snapshots):
+                        _restore(instance, snapshot)
+                    _reload_related(instances)
+                    time.sleep(delay)
+                else:
+                    if attempt:
+                        lock_stats.record(attempt, time.monotonic() - start)
+                    return result
+        return wrapper
+    return decorator
@@ -0,0 +1,210 @@
+"""
+The handlers of alpaca.logger_config: the records of all the loggers are written to the files
+by one background thread, the files are rotated by size and the rotated ones are gzipped.
+
+The server may run several processes, forked from one another, each with its listener thread.
+They write the same files: the size is the one of the file on disk, one process at a time rotates
+it, and the others find it moved before their next record and reopen the new one.
+"""
+
+import os
+import copy
+import gzip
+import fcntl
+import atexit
+import shutil
+import logging.config
+import logging.handlers
+from queue import SimpleQueue
+
+LOG_MAX_BYTES = 5 * 1024 * 1024
+LOG_BACKUP_COUNT = 5
+
+
+def gzip_rotator(source, dest):
+    with open(source, 'rb') as src, gzip.open(dest, 'wb') as dst:
+        shutil.copyfileobj(src, dst)
+    os.remove(source)
+
+
+class GzipRotatingFileHandler(logging.handlers.RotatingFileHandler):
+    """ app.log, then app.log.1, app.log.2.gz, app.log.3.gz and so on, the oldest one is removed.
+        app.log.1 is gzipped at the next rotation: the processes still writing it have left it by then.
+        The size is the one on disk, with the records of the other processes, plus the records
+        of this one not flushed yet. """
+    # the listener flushes once it has written the records at hand
+    flush_each = True
+
+    def __init__(self, filename, maxBytes=LOG_MAX_BYTES, backupCount=LOG_BACKUP_COUNT,
+                 encoding='utf-8', delay=True):
+        self.file_id = None
+        self.pending = 0
+        super().__init__(filename, maxBytes=maxBytes, backupCount=backupCount,
+                         encoding=encoding, delay=delay)
+
+    def _open(self):
+        stream = super()._open()
+        stat = os.fstat(stream.fileno())
+        self.file_id = (stat.st_dev, stat.st_ino)
+        self.pending = 0
+        return stream
+
+    def _size(self):
+        """ None when no file is open, or another process has rotated it away. """
+        if self.stream is None:
+            return None
+        try:
+            stat = os.stat(self.baseFilename)
+        except FileNotFoundError:
+            return None
+        if (stat.st_dev, stat.st_ino) != self.file_id:
+            return None
+        return stat.st_size + self.pending
+
+    def _reopen(self):
+        if self.stream is not None:
+            self.stream.close()
+        self.stream = self._open()
+        return os.fstat(self.stream.fileno()).st_size
+
+    def flush(self):
+        super().flush()
+        self.pending = 0
+
+    def emit(self, record):
+        try:
+            msg = self.format(record) + self.terminator
+            length = len(msg) if msg.isascii() else len(msg.encode(self.encoding))
+            size = self._size()
+            if size is None:
+                size = self._reopen()
+            if self.maxBytes > 0 and size and size + length > self.maxBytes:
+                self._rollover(length)
+            self.stream.write(msg)
+            self.pending += length
+            if self.flush_each:
+                self.flush()
+        except RecursionError:
+            raise
+        except Exception:
+            self.handleError(record)
+
+    def _rollover(self, length):
+        """ The processes take turns on a lock of the directory; the file is rotated once,
+            the ones after the first find it moved and write to the new one. """
+        directory = os.open(os.path.dirname(self.baseFilename), os.O_RDONLY)
+        try:
+            fcntl.flock(directory, fcntl.LOCK_EX)
+            self.flush()
+            size = self._size()
+            if size is None:
+                size = self._reopen()
+            if size and size + length > self.maxBytes:
+                self.doRollover()
+        finally:
+            os.close(directory)
+
+    def doRollover(self):
+        if self.stream is not None:
+            self.stream.close()
+            self.stream = None
+        if self.backupCount > 0:
+            for i in range(self.backupCount - 1, 1, -1):
+                source = f'{self.baseFilename}.{i}.gz'
+                if os.path.exists(source):
+                    os.replace(source, f'{self.baseFilename}.{i + 1}.gz')
+            first = f'{self.baseFilename}.1'
+            if self.backupCount > 1 and os.path.exists(first):
+                gzip_rotator(first, f'{self.baseFilename}.2.gz')
+            if os.path.exists(self.baseFilename):
+                os.replace(self.baseFilename, first)
+        self.stream = self._open()
+
+
+class QueuedHandler(logging.handlers.QueueHandler):
+    """ Puts the records of a logger in the shared queue, along with the handlers of the logger. """
+    def __init__(self, queue, handlers):
+        super().__init__(queue)
+        self.targets = tuple(handlers)
+        for handler in self.targets:
+            if isinstance(handler, GzipRotatingFileHandler):
+                handler.flush_each = False
+
+    def prepare(self, record):
+        """ The message is formatted here, the arguments may change once the call returns.
+            The record stays in the process, so it keeps exc_info for the formatters. """
+        record = copy.copy(record)
+        record.message = record.getMessage()
+        record.msg, record.args = record.message, None
+        return record
+
+    def enqueue(self, record):
+        self.queue.put_nowait((self.targets, record))
+
+
+class DispatchingListener(logging.handlers.QueueListener):
+    """ The one thread that passes the records of all the loggers to their handlers.
+        The files are flushed when the queue is empty, not after every record. """
+    def __init__(self, queue):
+        super().__init__(queue)
+        self.written = set()
+
+    def handle(self, item):
+        targets, record = item
+        for handler in targets:
+            if record.levelno >= handler.level:
+                handler.handle(record)
+                self.written.add(handler)
+        if self.queue.empty():
+            self.flush()
+
+    def flush(self):
+        for handler in self.written:
+            handler.flush()
+        self.written.clear()
+
+    def stop(self):
+        super().stop()
+        self.flush()
+
+
+_listener = None
+
+
+def queue_loggers(loggers) -> DispatchingListener:
+    """ The handlers of the loggers are put behind one queue and written on one listener thread. """
+    global _listener
+    stop_listener()
+    queue = SimpleQueue()
+    for logger in loggers:
+        if logger.handlers:
+            logger.handlers = [QueuedHandler(queue, logger.handlers)]
+    _listener = DispatchingListener(queue)
+    _listener.start()
+    return _listener
+
+
+def stop_listener():
+    """ Writes out what is left in the queue. """
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+def _restart_in_child():
+    """ A forked process has no listener thread, its records would stay in the queue. """
+    global _listener
+    if _listener is not None:
+        _listener = DispatchingListener(_listener.queue)
+        _listener.start()
+
+
+atexit.register(stop_listener)
+os.register_at_fork(after_in_child=_restart_in_child)
+
+
+def configure(logging_settings):
+    """ settings.LOGGING_CONFIG: dictConfig, then the loggers it configures write through the queue. """
+    logging.config.dictConfig(logging_settings)
+    queue_loggers([logging.getLogger(name) for name in logging_settings.get('loggers', {})])
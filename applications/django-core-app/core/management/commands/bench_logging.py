@@ -0,0 +1,94 @@
+import logging
+import tempfile
+import threading
+from queue import SimpleQueue
+from pathlib import Path
+
+from django.core.management.base import BaseCommand
+from django.core.signals import request_started
+from django.test import Client
+
+from core.bench import Timer
+from core.log_handlers import GzipRotatingFileHandler, QueuedHandler, DispatchingListener, LOG_MAX_BYTES
+
+logger = logging.getLogger('core.bench')
+FORMAT = '[{levelname}] {asctime} {message}'
+
+
+class Command(BaseCommand):
+    help = 'Measures the request latency with the records logged at INFO on every request: ' \
+           'without logging, with a plain file handler, with the rotating handler on the request thread ' \
+           'and behind the queue, as in alpaca.logger_config. The files are written to a temporary directory.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', default='/', help='the page requested')
+        parser.add_argument('--requests', type=int, default=300, help='requests per client')
+        parser.add_argument('--clients', type=int, default=4, help='threads sending the requests')
+        parser.add_argument('--records', type=int, default=20, help='log records per request')
+        parser.add_argument('--max-bytes', type=int, default=LOG_MAX_BYTES,
+                            help='the size the rotating handlers rotate at')
+
+    def handle(self, *args, **options):
+        def log_request(**kwargs):
+            for i in range(options['records']):
+                logger.info('bench record %d of the request, %s', i, options['url'])
+
+        request_started.connect(log_request, dispatch_uid='bench-logging')
+        logger.setLevel(logging.INFO)
+        logger.propagate = False
+        try:
+            with tempfile.TemporaryDirectory(prefix='alpaca-bench-') as tmp_dir:
+                self.stdout.write(f'{"handler":<32}{"requests/s":>12}{"p50 ms":>10}{"p95 ms":>10}')
+                self._report('no logging', self._run(None, options))
+                plain_handler = logging.FileHandler(Path(tmp_dir, 'plain.log'), delay=True)
+                plain_handler.setFormatter(logging.Formatter(FORMAT, style='{'))
+                try:
+                    self._report('FileHandler', self._run(plain_handler, options))
+                finally:
+                    plain_handler.close()
+
+                rotating_handler = GzipRotatingFileHandler(Path(tmp_dir, 'rotating.log'),
+                                                           maxBytes=options['max_bytes'])
+                rotating_handler.setFormatter(logging.Formatter(FORMAT, style='{'))
+                try:
+                    self._report('GzipRotatingFileHandler', self._run(rotating_handler, options))
+                finally:
+                    rotating_handler.close()
+
+                file_handler = GzipRotatingFileHandler(Path(tmp_dir, 'queued.log'), maxBytes=options['max_bytes'])
+                file_handler.setFormatter(logging.Formatter(FORMAT, style='{'))
+                # a queue of its own, the listener of the project loggers is left alone
+                queue = SimpleQueue()
+                listener = DispatchingListener(queue)
+                listener.start()
+                try:
+                    self._report('QueuedHandler', self._run(QueuedHandler(queue, [file_handler]), options))
+                finally:
+                    listener.stop()
+                    file_handler.close()
+        finally:
+            request_started.disconnect(dispatch_uid='bench-logging')
+
+    def _report(self, label, timer):
+        self.stdout.write(f'{label:<32}{timer.per_second():>12.1f}'
+                          f'{timer.percentile_ms(50):>10.2f}{timer.percentile_ms(95):>10.2f}')
+
+    @staticmethod
+    def _run(handler, options) -> Timer:
+        logger.handlers = [handler] if handler is not None else []
+        timer = Timer()
+
+        def client_loop():
+            # not from the INTERNAL_IPS, the debug toolbar would dominate the timing
+            client = Client(HTTP_HOST='localhost', REMOTE_ADDR='192.0.2.1')
+            for _ in range(options['requests']):
+                with timer():
+                    client.get(options['url'])
+
+        clients = [threading.Thread(target=client_loop) for _ in range(options['clients'])]
+        for client in clients:
+            client.start()
+        for client in clients:
+            client.join()
+        logger.handlers = []
+        return timer
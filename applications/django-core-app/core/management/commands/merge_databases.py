@@ -0,0 +1,103 @@
+from pathlib import Path
+
+from django.apps import apps
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections, transaction
+
+
+class Command(BaseCommand):
+    help = 'Copies the tables of the main applications from their own .sqlite3 files ' \
+           'into one database, for the SINGLE_DATABASE mode of alpaca.presets. ' \
+           'Run migrate on the source files first. The missing tables are created in the target: ' \
+           'its migrations may be recorded as applied while their tables were routed elsewhere.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', default='default', help='the target database')
+        parser.add_argument('--source', action='append', default=[], metavar='APP=PATH',
+                            help='a database file of an application, '
+                                 'by default the <app>.sqlite3 in the directory of each main application')
+
+    def handle(self, *args, **options):
+        connection = connections[options['database']]
+        if connection.vendor != 'sqlite':
+            raise CommandError('only SQLite databases can be merged')
+        sources = self._sources(options['source'])
+
+        self._create_tables(connection, sources)
+        tables = {
+            app: self._tables(app, connection, path)
+            for app, path in sources.items()
+        }
+        connection.ensure_connection()
+        with connection.cursor() as cursor:
+            for app, path in sources.items():
+                cursor.execute(f'ATTACH DATABASE %s AS src_{app}', [str(path)])
+            try:
+                # the tables are copied in any order, the foreign keys are checked at the end
+                with connection.constraint_checks_disabled(), transaction.atomic(options['database']):
+                    for app, app_tables in tables.items():
+                        for table, columns in app_tables.items():
+                            self._copy(cursor, connection, app, table, columns)
+                    connection.check_constraints(table_names=[t for ts in tables.values() for t in ts])
+            finally:
+                for app in sources:
+                    cursor.execute(f'DETACH DATABASE src_{app}')
+        self.stdout.write(self.style.SUCCESS(f'merged {", ".join(sources)} into {options["database"]}'))
+
+    @staticmethod
+    def _sources(options) -> dict:
+        if options:
+            try:
+                sources = dict(option.split('=', 1) for option in options)
+            except ValueError:
+                raise CommandError('use --source APP=PATH')
+        else:
+            sources = {
+                app: conf['app_dir'] / f'{app}.sqlite3'
+                for app, conf in settings.PROJECT_MAIN_APPS.items()
+            }
+        for app, path in sources.items():
+            if app not in settings.PROJECT_MAIN_APPS:
+                raise CommandError(f'"{app}" is not a main application')
+            if not Path(path).is_file():
+                raise CommandError(f'no such file "{path}"')
+        return sources
+
+    def _create_tables(self, connection, sources):
+        existing = set(connection.introspection.table_names())
+        with connection.schema_editor() as editor:
+            for app in sources:
+                # the auto-created many-to-many tables come along with their models
+                for model in apps.get_app_config(app).get_models():
+                    if model._meta.managed and not model._meta.proxy and \
+                            model._meta.db_table not in existing:
+                        editor.create_model(model)
+                        self.stdout.write(f'{app}: {model._meta.db_table} created')
+
+    @staticmethod
+    def _tables(app, connection, path) -> dict:
+        """ The tables of the application models, with their columns, they must be empty. """
+        tables = {}
+        for model in apps.get_app_config(app).get_models(include_auto_created=True):
+            if model._meta.proxy or not model._meta.managed:
+                continue
+            table = model._meta.db_table
+            with connection.cursor() as cursor:
+                cursor.execute(f'SELECT EXISTS (SELECT 1 FROM {connection.ops.quote_name(table)})')
+                if cursor.fetchone()[0]:
+                    raise CommandError(f'the table "{table}" is not empty, merged already? ({path})')
+            tables[table] = [field.column for field in model._meta.local_concrete_fields]
+        return tables
+
+    def _copy(self, cursor, connection, app, table, columns):
+        quote = connection.ops.quote_name
+        cursor.execute(f'SELECT name FROM src_{app}.sqlite_master WHERE type = %s AND name = %s',
+                       ['table', table])
+        if cursor.fetchone() is None:
+            self.stdout.write(f'{app}: no table {table} in the source, skipped')
+            return
+        names = ', '.join(quote(column) for column in columns)
+        cursor.execute(f'INSERT INTO main.{quote(table)} ({names}) '
+                       f'SELECT {names} FROM src_{app}.{quote(table)}')
+        self.stdout.write(f'{app}: {table} — {cursor.rowcount} rows')
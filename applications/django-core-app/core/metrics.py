@@ -0,0 +1,299 @@
+import os
+import json
+import time
+import atexit
+import fcntl
+import logging
+import tempfile
+import threading
+from pathlib import Path
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+
+from .server_timing import add_timing
+
+logger = logging.getLogger(__name__)
+
+"""
+Runtime metrics in the Prometheus text format, see the view core.views.metrics.
+
+Every process keeps its own values. The ones serving the requests, see serve(), also write them
+to a file of their own in METRICS_DIR, at most every METRICS_FLUSH_SECONDS and at exit;
+the view sums the files of all of them. The commands and the tests write nothing.
+A process forked with the values of its parent starts from zero, they are counted by the parent.
+The files of the stopped processes are merged into one archive file, as the counters only grow:
+empty the directory when the server is deployed anew.
+"""
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+ARCHIVE = 'archive.json'
+
+
+def metrics_dir() -> Path:
+    return Path(getattr(settings, 'METRICS_DIR', Path(tempfile.gettempdir(), 'alpaca-metrics')))
+
+
+class Registry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._metrics = {}
+        self._pid = None
+        self._values = {}
+        self._filename = None
+        self._flushed = 0.0
+        self.serving = False
+
+    def register(self, metric):
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f'metric {metric.name} registered twice')
+            self._metrics[metric.name] = metric
+
+    def values(self, name) -> dict:
+        """ The values of this process, under the lock of the registry. """
+        if self._pid != os.getpid():
+            # a new process, or a forked one with the values of the parent
+            self._pid = os.getpid()
+            self._filename = f'{self._pid}-{time.time_ns()}.json'
+            self._values = {}
+        return self._values.setdefault(name, {})
+
+    def flush(self, every=0.0):
+        """ Writes the values of this process to its file, if it serves the requests
+            and the last write is older than `every`. """
+        with self._lock:
+            if not self.serving or self._pid != os.getpid() or time.monotonic() - self._flushed < every:
+                return
+            self._flushed = time.monotonic()
+            data = self._dump({name: (metric.describe(), self._values.get(name, {}))
+                               for name, metric in self._metrics.items()})
+            path = metrics_dir() / self._filename
+        try:
+            _write(path, data)
+        except OSError as exc:
+            logger.warning(f'core: the metrics were not written to [{path}]: {exc}')
+
+    def collect(self) -> dict:
+        """ The values of this process and of the files of the others summed,
+            {name: (description, {labels: value})}. """
+        with self._lock:
+            own = self._filename if self._pid == os.getpid() else None
+            collected = {name: (metric.describe(), dict(self._values.get(name, {})) if own else {})
+                         for name, metric in self._metrics.items()}
+        self._archive(keep=own)
+        for path in sorted(metrics_dir().glob('*.json')):
+            if path.name == own:
+                continue
+            try:
+                data = json.loads(path.read_text())
+            except (OSError, ValueError) as exc:
+                logger.warning(f'core: the metrics file [{path}] was not read: {exc}')
+                continue
+            _merge(collected, data)
+        return collected
+
+    def _archive(self, keep=None):
+        """ Merges the files of the stopped processes into the archive file, one process at a time. """
+        directory = metrics_dir()
+        if not directory.is_dir():
+            return
+        try:
+            with open(directory / '.lock', 'a') as lock:
+                fcntl.flock(lock, fcntl.LOCK_EX)
+                stopped = [path for path in directory.glob('*.json')
+                           if path.name not in (keep, ARCHIVE) and not _alive(path)]
+                if not stopped:
+                    return
+                archive = directory / ARCHIVE
+                merged = {}
+                for path in [archive, *stopped]:
+                    if path.exists():
+                        _merge(merged, json.loads(path.read_text()))
+                _write(archive, self._dump(merged))
+                for path in stopped:
+                    path.unlink()
+        except (OSError, ValueError) as exc:
+            logger.warning(f'core: the metrics of the stopped processes were not archived: {exc}')
+
+    @staticmethod
+    def _dump(collected) -> dict:
+        return {name: {**metric, 'samples': [[list(labels), value] for labels, value in samples.items()]}
+                for name, (metric, samples) in collected.items()}
+
+    def render(self) -> str:
+        lines = []
+        for name, (metric, samples) in sorted(self.collect().items()):
+            lines += [f'# HELP {name} {metric["help"]}', f'# TYPE {name} {metric["type"]}']
+            for labels, value in sorted(samples.items()):
+                labels = dict(zip(metric['labelnames'], labels))
+                if metric['type'] == 'histogram':
+                    lines += _histogram_lines(name, metric['buckets'], labels, value)
+                else:
+                    lines.append(f'{name}{_labels(labels)} {_number(value)}')
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = Registry()
+
+
+def serve():
+    """ Called by wsgi.py and asgi.py: this process serves the requests, its metrics are written. """
+    if not REGISTRY.serving:
+        REGISTRY.serving = True
+        atexit.register(REGISTRY.flush)
+
+
+def _merge(collected:dict, data:dict):
+    """ Adds the values of a file to the collected ones. """
+    for name, metric in data.items():
+        samples = metric.pop('samples')
+        _, summed = collected.setdefault(name, (metric, {}))
+        for labels, value in samples:
+            labels = tuple(labels)
+            if labels not in summed:
+                summed[labels] = value
+            elif isinstance(value, list):
+                summed[labels] = [a + b for a, b in zip(summed[labels], value)]
+            else:
+                summed[labels] += value
+
+
+def _write(path, data):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix('.tmp')
+    tmp.write_text(json.dumps(data))
+    os.replace(tmp, path)
+
+
+def _alive(path) -> bool:
+    """ The files are named <pid>-<start time>.json. """
+    try:
+        os.kill(int(path.name.split('-')[0]), 0)
+    except ValueError:
+        return True  # not a file of a process
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass  # of another user
+    return True
+
+
+def _labels(labels:dict) -> str:
+    if not labels:
+        return ''
+    escaped = {name: str(value).replace('\\', r'\\').replace('"', r'\"').replace('\n', r'\n')
+               for name, value in labels.items()}
+    return '{' + ','.join(f'{name}="{value}"' for name, value in escaped.items()) + '}'
+
+
+def _number(value) -> str:
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def _histogram_lines(name, buckets, labels, value) -> list:
+    """ The value is [count per bucket..., sum, count]; the buckets are cumulative in the output. """
+    lines, cumulative = [], 0
+    for bound, count in zip(buckets, value):
+        cumulative += count
+        lines.append(f'{name}_bucket{_labels({**labels, "le": _number(float(bound))})} {cumulative}')
+    lines += [f'{name}_bucket{_labels({**labels, "le": "+Inf"})} {value[-1]}',
+              f'{name}_sum{_labels(labels)} {_number(value[-2])}',
+              f'{name}_count{_labels(labels)} {value[-1]}']
+    return lines
+
+
+class Counter:
+    type = 'counter'
+
+    def __init__(self, name, help, labelnames=(), registry=REGISTRY):
+        self.name, self.help, self.labelnames = name, help, tuple(labelnames)
+        self.registry = registry
+        registry.register(self)
+
+    def describe(self) -> dict:
+        return {'type': self.type, 'help': self.help, 'labelnames': self.labelnames}
+
+    def inc(self, amount=1, **labels):
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        with self.registry._lock:
+            values = self.registry.values(self.name)
+            values[key] = values.get(key, 0) + amount
+
+    def get(self, **labels):
+        """ The value in this process. """
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        with self.registry._lock:
+            return self.registry.values(self.name).get(key, 0)
+
+
+class Histogram(Counter):
+    type = 'histogram'
+
+    def __init__(self, name, help, labelnames=(), buckets=DEFAULT_BUCKETS, registry=REGISTRY):
+        self.buckets = tuple(buckets)
+        super().__init__(name, help, labelnames, registry)
+
+    def describe(self) -> dict:
+        return {**super().describe(), 'buckets': self.buckets}
+
+    def observe(self, value, **labels):
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        with self.registry._lock:
+            values = self.registry.values(self.name)
+            counts = values.setdefault(key, [0] * len(self.buckets) + [0.0, 0])
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+                    break
+            counts[-2] += value
+            counts[-1] += 1
+
+
+REQUESTS = Counter('http_requests_total', 'Requests by the URL name, method and status code.',
+                   ['view', 'method', 'status'])
+REQUEST_LATENCY = Histogram('http_request_duration_seconds', 'Request latency by the URL name.', ['view'])
+DB_QUERIES = Counter('db_queries_total', 'Queries by the database alias.', ['database'])
+DB_QUERY_SECONDS = Counter('db_query_duration_seconds_total', 'Time spent in the queries, by the database alias.',
+                           ['database'])
+
+
+class MetricsMiddleware:
+    """ The latency and status of every request, the number and time of its queries per database. """
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.flush_seconds = getattr(settings, 'METRICS_FLUSH_SECONDS', 1.0)
+
+    def __call__(self, request):
+        start = time.perf_counter()
+        with ExitStack() as stack:
+            for alias in connections:
+                stack.enter_context(connections[alias].execute_wrapper(QueryTimer(alias)))
+            response = self.get_response(request)
+        elapsed = time.perf_counter() - start
+
+        match = request.resolver_match
+        view = match.view_name if match else '<unresolved>'
+        REQUEST_LATENCY.observe(elapsed, view=view)
+        REQUESTS.inc(view=view, method=request.method, status=response.status_code)
+        REGISTRY.flush(every=self.flush_seconds)
+        return response
+
+
+class QueryTimer:
+    """ A connection.execute_wrapper, it feeds the Server-Timing of the request too. """
+    def __init__(self, alias):
+        self.alias = alias
+        self.timing_name = f'db-{alias}'
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - start
+            DB_QUERIES.inc(database=self.alias)
+            DB_QUERY_SECONDS.inc(elapsed, database=self.alias)
+            add_timing(self.timing_name, elapsed)
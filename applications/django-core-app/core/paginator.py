@@ -0,0 +1,33 @@
+from django.core.paginator import Paginator
+from django.db.models import QuerySet
+from django.utils.functional import cached_property
+
+""" Paginators for the tables that grow without limit. """
+
+COUNT_LIMIT = 10_000
+
+
+class BoundedCountPaginator(Paginator):
+    """
+    Counts the rows only up to the limit: SELECT COUNT(*) FROM (SELECT ... LIMIT n),
+    SQLite stops reading there instead of scanning the whole table.
+    Past the limit the count is an estimate, shown as 10,000+, the later pages are reached
+    by narrowing the list, e.g. with the date filters or a date_hierarchy of the admin;
+    the links of the admin's own date_hierarchy come from a scan of the whole table, though.
+    Set show_full_result_count = False in the admin, or it counts the whole table anyway.
+    """
+    count_limit = COUNT_LIMIT
+
+    @cached_property
+    def count(self) -> int:
+        if not isinstance(self.object_list, QuerySet):
+            return super().count
+        return self.object_list[:self.count_limit].count()
+
+    @cached_property
+    def is_estimate(self) -> bool:
+        return self.count >= self.count_limit
+
+    @cached_property
+    def display_count(self) -> str:
+        return f'{self.count:,}+' if self.is_estimate else str(self.count)
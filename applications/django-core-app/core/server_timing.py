@@ -0,0 +1,89 @@
+import time
+import random
+import contextvars
+from contextlib import contextmanager
+
+from django.conf import settings
+
+"""
+The Server-Timing header of a sampled request of a staff user: the time and the number
+of the queries per database, the template rendering, the phases marked with timed(), and the total.
+The browser shows them in the timing of the request, no debug toolbar needed.
+The queries are timed by the execute_wrapper of core.metrics.MetricsMiddleware.
+The phases overlap, e.g. the lazy queries of a template are in its rendering too.
+"""
+
+_timings = contextvars.ContextVar('server_timings', default=None)
+
+
+class Timings:
+    def __init__(self):
+        self.phases = {}
+
+    def add(self, name, seconds):
+        duration, count = self.phases.get(name, (0.0, 0))
+        self.phases[name] = (duration + seconds, count + 1)
+
+    def header(self) -> str:
+        entries = []
+        for name, (duration, count) in self.phases.items():
+            entry = f'{name};dur={duration * 1000:.1f}'
+            if name.startswith('db-'):
+                entry += f';desc="{count} queries"'
+            entries.append(entry)
+        return ', '.join(entries)
+
+
+def add_timing(name, seconds):
+    """ Adds the time to the Server-Timing of the request, if it is sampled. """
+    timings = _timings.get()
+    if timings is not None:
+        timings.add(name, seconds)
+
+
+@contextmanager
+def timed(name):
+    """ Adds the time of the block to the Server-Timing of the request, if it is sampled. """
+    timings = _timings.get()
+    if timings is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings.add(name, time.perf_counter() - start)
+
+
+class ServerTimingMiddleware:
+    """ SERVER_TIMING_SAMPLE_RATE of the requests are timed, the others cost a random() call.
+        The header shows how the site works inside, only the staff get it. """
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.sample_rate = getattr(settings, 'SERVER_TIMING_SAMPLE_RATE', 0.0)
+
+    def __call__(self, request):
+        if random.random() >= self.sample_rate:
+            return self.get_response(request)
+
+        timings = Timings()
+        token = _timings.set(timings)
+        start = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            _timings.reset(token)
+        timings.add('total', time.perf_counter() - start)
+        user = getattr(request, 'user', None)
+        if user is not None and user.is_staff:
+            response['Server-Timing'] = timings.header()
+        return response
+
+    def process_template_response(self, request, response):
+        """ The response is rendered right after the template response middleware. """
+        timings = _timings.get()
+        if timings is not None:
+            start = time.perf_counter()
+            response.add_post_render_callback(lambda _: timings.add('template', time.perf_counter() - start))
+        return response
+
@@ -0,0 +1,219 @@
+from django.conf import settings
+from django.db import connections
+from django.test import SimpleTestCase, TestCase, TransactionTestCase
+
+
+class SQLiteProfileTests(TestCase):
+    databases = '__all__'
+
+    def test_pragmas_applied_to_every_database(self):
+        """ The connection_created receiver has set up each connection. """
+        for alias in connections:
+            profile = connections[alias].settings_dict['PRAGMAS']
+            with connections[alias].cursor() as cursor:
+                cursor.execute('PRAGMA busy_timeout')
+                self.assertEqual(cursor.fetchone()[0], profile['busy_timeout'], msg=alias)
+                cursor.execute('PRAGMA temp_store')
+                self.assertEqual(cursor.fetchone()[0], 2, msg=alias)
+
+    def test_profile_declared_for_each_app(self):
+        for app in settings.PROJECT_MAIN_APPS:
+            self.assertIn('sqlite', settings.PROJECT_MAIN_APPS[app]['db'], msg=app)
+
+
+class ProjectRouterTests(TestCase):
+    databases = '__all__'
+
+    def test_app_databases_from_presets(self):
+        from django.contrib.auth.models import User
+        from polls.models import Question
+        from encyclopedia.models import Entry
+        from auctions.models import Profile
+        from alpaca.db_router import ProjectRouter
+        router = ProjectRouter()
+        for model, app in [(Question, 'polls'), (Entry, 'encyclopedia'), (Profile, 'auctions')]:
+            db = settings.PROJECT_MAIN_APPS[app]['db']['name']
+            self.assertEqual(router.db_for_read(model), db)
+            self.assertEqual(router.db_for_write(model), db)
+            self.assertTrue(router.allow_migrate(db, app))
+            if not settings.SINGLE_DATABASE:
+                self.assertFalse(router.allow_migrate('default', app))
+        self.assertEqual(router.db_for_read(User), 'default')
+        self.assertEqual(router.db_for_write(User), 'default')
+
+    def test_single_database_collapses_the_routes(self):
+        from auctions.models import Profile
+        from alpaca.db_router import ProjectRouter
+        router = ProjectRouter(app_databases={app: 'default' for app in settings.PROJECT_MAIN_APPS},
+                               replicas={})
+        self.assertEqual(router.db_for_read(Profile), 'default')
+        self.assertEqual(router.db_for_write(Profile), 'default')
+        self.assertTrue(router.allow_migrate('default', 'auctions'))
+        self.assertTrue(router.allow_relation(Profile(), Profile()))
+
+    def test_sticky_cookie_after_post(self):
+        from django.http import HttpResponse
+        from django.test import RequestFactory
+        from alpaca.db_router import STICKY_COOKIE, ReadYourWritesMiddleware
+        middleware = ReadYourWritesMiddleware(lambda request: HttpResponse())
+        middleware.replicas = {'auctions_db': 'auctions_db_replica'}
+        response = middleware(RequestFactory().post('/accounts/login'))
+        self.assertIn(STICKY_COOKIE, response.cookies)
+        response = middleware(RequestFactory().get('/accounts/login'))
+        self.assertNotIn(STICKY_COOKIE, response.cookies)
+
+    def test_no_sticky_cookie_without_replicas(self):
+        from alpaca.db_router import STICKY_COOKIE, get_replicas
+        self.assertEqual(get_replicas(), {}, msg='the presets enable no replica')
+        response = self.client.post('/accounts/login', {'username': 'nobody', 'password': 'none'})
+        self.assertNotIn(STICKY_COOKIE, response.cookies)
+
+
+class ReplicaRoutingTests(SimpleTestCase):
+    databases = '__all__'
+
+    def test_replica_reads(self):
+        """ Reads go to the replica, except for the sticky requests and open transactions. """
+        from django.db import transaction
+        from auctions.models import Profile
+        from alpaca.db_router import ProjectRouter, read_primary
+        db = settings.PROJECT_MAIN_APPS['auctions']['db']['name']
+        router = ProjectRouter(replicas={db: f'{db}_replica'})
+        self.assertEqual(router.db_for_read(Profile), f'{db}_replica')
+        self.assertEqual(router.db_for_write(Profile), db)
+        self.assertFalse(router.allow_migrate(f'{db}_replica', 'auctions'))
+
+        token = read_primary.set(True)
+        self.assertEqual(router.db_for_read(Profile), db)
+        read_primary.reset(token)
+
+        with transaction.atomic(db):
+            self.assertEqual(router.db_for_read(Profile), db)
+
+
+class RetryOnLockTests(SimpleTestCase):
+    databases = '__all__'
+    db = settings.PROJECT_MAIN_APPS['polls']['db']['name']
+
+    def setUp(self):
+        from core.db import lock_stats
+        lock_stats.reset()
+
+    def test_retries_the_whole_block(self):
+        """ The instance is restored before each try, the stats count the retries. """
+        from django.db import OperationalError
+        from core.db import retry_on_lock, lock_stats
+        from polls.models import Question
+        question = Question(question_text='Locked?')
+        tries = []
+
+        @retry_on_lock(self.db, base_delay=0.001)
+        def rename(instance):
+            tries.append(instance.question_text)
+            instance.question_text += '!'
+            if len(tries) < 3:
+                raise OperationalError('database is locked')
+
+        rename(question)
+        self.assertEqual(tries, ['Locked?', 'Locked?', 'Locked?'])
+        self.assertEqual(question.question_text, 'Locked?!')
+        self.assertEqual(lock_stats.retries, 2)
+        self.assertEqual(lock_stats.retried, 1)
+
+    def test_gives_up_after_the_deadline(self):
+        from django.db import OperationalError
+        from core.db import retry_on_lock, lock_stats
+
+        @retry_on_lock(self.db, deadline=0.05, base_delay=0.01)
+        def locked():
+            raise OperationalError('database is locked')
+
+        with self.assertRaises(OperationalError):
+            locked()
+        self.assertEqual(lock_stats.gave_up, 1)
+
+    def test_deadline_from_the_busy_timeout(self):
+        """ The lock error comes after the busy_timeout, a shorter deadline would never retry. """
+        from unittest import mock
+        from core.db import lock_deadline, DEFAULT_LOCK_DEADLINE
+        for alias in connections:
+            busy_timeout = connections[alias].settings_dict['PRAGMAS']['busy_timeout'] / 1000
+            self.assertGreater(lock_deadline(alias), busy_timeout, msg=alias)
+        with mock.patch.dict(connections[self.db].settings_dict, {'PRAGMAS': {}}):
+            self.assertEqual(lock_deadline(self.db), DEFAULT_LOCK_DEADLINE)
+
+    def test_nested_block_does_not_retry(self):
+        from django.db import OperationalError, transaction
+        from core.db import retry_on_lock, lock_stats
+
+        @retry_on_lock(self.db)
+        def locked():
+            raise OperationalError('database is locked')
+
+        with self.assertRaises(OperationalError):
+            with transaction.atomic(self.db):
+                locked()
+        self.assertEqual(lock_stats.retries, 0)
+
+
+class RetryOnLockRelatedTests(TransactionTestCase):
+    db = settings.PROJECT_MAIN_APPS['polls']['db']['name']
+    databases = [db]
+
+    def test_related_instances_reloaded(self):
+        """ The changes of the failed tries to the related instances are rolled back in memory too. """
+        from django.db import OperationalError
+        from django.utils import timezone
+        from core.db import retry_on_lock
+        from polls.models import Question, Choice
+        question = Question.manager.create(question_text='Locked?', pub_date=timezone.now())
+        choice = Choice.manager.create(question=question, choice_text='Yes')
+        choice = Choice.manager.select_related('question').get(pk=choice.pk)
+        tries = []
+
+        @retry_on_lock(self.db, base_delay=0.001)
+        def rename(instance):
+            tries.append(instance.question.question_text)
+            instance.question.question_text += '!'
+            instance.question.save()
+            if len(tries) < 3:
+                raise OperationalError('database is locked')
+
+        rename(choice)
+        self.assertEqual(tries, ['Locked?', 'Locked?', 'Locked?'])
+        self.assertEqual(choice.question.question_text, 'Locked?!')
+        self.assertEqual(Question.manager.get(pk=question.pk).question_text, 'Locked?!')
+
+
+class MergeDatabasesTests(TransactionTestCase):
+    db = settings.PROJECT_MAIN_APPS['polls']['db']['name']
+    databases = [db]
+
+    def test_merge_app_database(self):
+        """ The tables of the app are copied over from its file, with the same pks. """
+        import io
+        import tempfile
+        from pathlib import Path
+        from django.core.management import call_command, CommandError
+        from django.utils import timezone
+        from polls.models import Question, Choice
+        question = Question.manager.db_manager(self.db).create(
+            question_text='Merged?', pub_date=timezone.now()
+        )
+        choice = Choice.manager.db_manager(self.db).create(question=question, choice_text='Yes')
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        source = Path(tmp_dir.name, 'polls.sqlite3')
+        with connections[self.db].cursor() as cursor:
+            cursor.execute('VACUUM INTO %s', [str(source)])
+        Choice.manager.db_manager(self.db).all().delete()
+        Question.manager.db_manager(self.db).all().delete()
+
+        out = io.StringIO()
+        call_command('merge_databases', database=self.db, source=[f'polls={source}'], stdout=out)
+        self.assertIn('polls_choice — 1 rows', out.getvalue())
+        merged = Choice.manager.db_manager(self.db).select_related('question').get()
+        self.assertEqual((merged.pk, merged.question.pk), (choice.pk, question.pk))
+
+        with self.assertRaisesMessage(CommandError, 'merged already?'):
+            call_command('merge_databases', database=self.db, source=[f'polls={source}'], stdout=out)
@@ -0,0 +1,114 @@
+import gzip
+import logging
+import logging.config
+import threading
+import tempfile
+from pathlib import Path
+
+from django.conf import settings
+from django.test import SimpleTestCase
+
+from core import log_handlers
+from core.log_handlers import GzipRotatingFileHandler, QueuedHandler
+
+
+class LogHandlersTests(SimpleTestCase):
+
+    def setUp(self):
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        self.path = Path(tmp_dir.name, 'app.log')
+        self.logger = logging.getLogger('core.tests.log_handlers')
+        self.logger.setLevel(logging.INFO)
+        self.logger.propagate = False
+        self.addCleanup(setattr, self.logger, 'handlers', [])
+
+    def test_rotated_files_gzipped(self):
+        handler = GzipRotatingFileHandler(self.path, maxBytes=100, backupCount=2)
+        self.addCleanup(handler.close)
+        self.logger.addHandler(handler)
+        for i in range(10):
+            self.logger.info('record %02d %s', i, 'x' * 40)
+
+        self.assertEqual(sorted(p.name for p in self.path.parent.iterdir()),
+                         ['app.log', 'app.log.1', 'app.log.2.gz'])
+        self.assertIn('record 08', Path(f'{self.path}.1').read_text())
+        with gzip.open(f'{self.path}.2.gz', 'rt') as file:
+            self.assertIn('record 07', file.read())
+        self.assertIn('record 09', self.path.read_text())
+
+    def test_rotated_with_other_processes(self):
+        """ Two handlers of the same file, as in two processes: one rotates it, the other follows. """
+        handlers = [GzipRotatingFileHandler(self.path, maxBytes=200, backupCount=10) for _ in range(2)]
+        for handler in handlers:
+            self.addCleanup(handler.close)
+        for i in range(20):
+            handlers[i % 2].handle(logging.makeLogRecord({'msg': f'record {i:02d} ' + 'x' * 40}))
+
+        text = ''
+        for path in self.path.parent.iterdir():
+            if path.suffix == '.gz':
+                with gzip.open(path, 'rt') as file:
+                    text += file.read()
+            else:
+                self.assertLessEqual(path.stat().st_size, 200)
+                text += path.read_text()
+        for i in range(20):
+            self.assertEqual(text.count(f'record {i:02d} '), 1)
+
+    def test_records_written_on_listener_thread(self):
+        """ One listener thread for all the loggers, each record goes to the handlers of its logger. """
+        self.addCleanup(logging.config.dictConfig, settings.LOGGING)
+        self.addCleanup(log_handlers.stop_listener)
+        other = logging.getLogger('core.tests.log_handlers_other')
+        self.addCleanup(setattr, other, 'handlers', [])
+        threads_before = threading.active_count()
+        log_handlers.configure({
+            'version': 1,
+            'disable_existing_loggers': False,
+            'loggers': {
+                self.logger.name: {'handlers': ['file'], 'level': 'INFO', 'propagate': False},
+                other.name: {'handlers': ['other_file'], 'level': 'INFO', 'propagate': False},
+            },
+            'handlers': {
+                'file': {
+                    'class': 'core.log_handlers.GzipRotatingFileHandler',
+                    'filename': self.path,
+                    'formatter': 'file',
+                },
+                'other_file': {
+                    'class': 'core.log_handlers.GzipRotatingFileHandler',
+                    'filename': self.path.with_name('other.log'),
+                    'level': 'ERROR',
+                },
+            },
+            'formatters': {'file': {'format': '{message}\n{exc_info}', 'style': '{'}},
+        })
+        self.assertEqual(threading.active_count(), threads_before + 1)
+        queue_handler, = self.logger.handlers
+        other_handler, = other.handlers
+        self.assertIsInstance(queue_handler, QueuedHandler)
+        self.assertIs(queue_handler.queue, other_handler.queue)
+        file_handler, = queue_handler.targets
+        threads = []
+        file_handler.addFilter(lambda record: threads.append(threading.current_thread()) or True)
+
+        args = ['before']
+        try:
+            1 / 0
+        except ZeroDivisionError:
+            self.logger.error('boom %s', args, exc_info=True)
+        args[0] = 'after'
+        other.info('below the level of the handler')
+        other.error('the other one')
+        log_handlers.stop_listener()
+
+        text = self.path.read_text()
+        self.assertIn("boom ['before']", text)
+        self.assertIn('ZeroDivisionError', text)
+        self.assertNotIn('the other one', text)
+        self.assertEqual(self.path.with_name('other.log').read_text(), 'the other one\n')
+        self.assertNotEqual(threads, [])
+        self.assertNotIn(threading.main_thread(), threads)
+        for handler in (file_handler, *other_handler.targets):
+            handler.close()
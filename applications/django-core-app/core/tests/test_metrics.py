@@ -0,0 +1,138 @@
+import json
+import tempfile
+from pathlib import Path
+
+from django.contrib.auth.models import User
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+
+from core.metrics import Registry, Counter, Histogram, REQUESTS, DB_QUERIES
+
+
+class MetricsTests(SimpleTestCase):
+
+    def setUp(self):
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        self.dir = Path(tmp_dir.name)
+        settings_override = override_settings(METRICS_DIR=self.dir)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        self.registry = Registry()
+        self.registry.serving = True
+        self.bids = Counter('bids_total', 'Bids.', ['lot'], registry=self.registry)
+        self.latency = Histogram('latency_seconds', 'Latency.', buckets=[0.1, 1], registry=self.registry)
+
+    def test_rendered_in_text_format(self):
+        self.bids.inc(lot='japari-bun')
+        self.bids.inc(2, lot='japari-bun')
+        self.bids.inc(lot='say "bun"')
+        for value in (0.05, 0.5, 5):
+            self.latency.observe(value)
+
+        self.assertEqual(self.registry.render().splitlines(), [
+            '# HELP bids_total Bids.',
+            '# TYPE bids_total counter',
+            'bids_total{lot="japari-bun"} 3',
+            r'bids_total{lot="say \"bun\""} 1',
+            '# HELP latency_seconds Latency.',
+            '# TYPE latency_seconds histogram',
+            'latency_seconds_bucket{le="0.1"} 1',
+            'latency_seconds_bucket{le="1.0"} 2',
+            'latency_seconds_bucket{le="+Inf"} 3',
+            'latency_seconds_sum 5.55',
+            'latency_seconds_count 3',
+        ])
+
+    def test_processes_summed(self):
+        self.bids.inc(lot='japari-bun')
+        self.latency.observe(0.5)
+        # a file of another worker
+        (self.dir / '1-1.json').write_text(json.dumps({
+            'bids_total': {'type': 'counter', 'help': 'Bids.', 'labelnames': ['lot'],
+                           'samples': [[['japari-bun'], 4], [['japari-manju'], 1]]},
+            'latency_seconds': {'type': 'histogram', 'help': 'Latency.', 'labelnames': [],
+                                'buckets': [0.1, 1], 'samples': [[[], [1, 0, 0.05, 1]]]},
+            'votes_total': {'type': 'counter', 'help': 'Votes.', 'labelnames': [], 'samples': [[[], 7]]},
+        }))
+
+        text = self.registry.render()
+        self.assertIn('bids_total{lot="japari-bun"} 5\n', text)
+        self.assertIn('bids_total{lot="japari-manju"} 1\n', text)
+        self.assertIn('latency_seconds_bucket{le="0.1"} 1\n', text)
+        self.assertIn('latency_seconds_bucket{le="1.0"} 2\n', text)
+        self.assertIn('latency_seconds_count 2\n', text)
+        self.assertIn('# TYPE votes_total counter\nvotes_total 7\n', text)
+        self.assertEqual([path.name for path in self.dir.glob('*.json')], ['1-1.json'],
+                         msg='the values of this process are read from memory')
+
+    def test_forked_process_starts_from_zero(self):
+        self.bids.inc(lot='japari-bun')
+        self.registry.flush()
+        # as if the values were inherited from the parent process
+        self.registry._pid = -1
+        self.bids.inc(lot='japari-bun')
+        self.registry.flush()
+
+        self.assertEqual(self.bids.get(lot='japari-bun'), 1)
+        self.assertEqual(len(list(self.dir.glob('*.json'))), 2)
+        self.assertIn('bids_total{lot="japari-bun"} 2\n', self.registry.render())
+
+    def test_stopped_processes_archived(self):
+        self.bids.inc(lot='japari-bun')
+        self.registry.flush()
+        own = [path.name for path in self.dir.glob('*.json')]
+        # no process has a pid this high
+        for i in range(2):
+            (self.dir / f'999999999-{i}.json').write_text(json.dumps({
+                'bids_total': {'type': 'counter', 'help': 'Bids.', 'labelnames': ['lot'],
+                               'samples': [[['japari-bun'], 2]]},
+            }))
+
+        for _ in range(2):
+            self.assertIn('bids_total{lot="japari-bun"} 5\n', self.registry.render())
+        self.assertEqual(sorted(path.name for path in self.dir.glob('*.json')), sorted([*own, 'archive.json']))
+
+    def test_not_written_unless_serving(self):
+        self.registry.serving = False
+        self.bids.inc(lot='japari-bun')
+        self.registry.flush()
+        self.assertEqual(list(self.dir.iterdir()), [])
+        self.assertIn('bids_total{lot="japari-bun"} 1\n', self.registry.render())
+
+
+class MetricsEndpointTests(TestCase):
+    databases = '__all__'
+
+    def setUp(self):
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        settings_override = override_settings(METRICS_DIR=Path(tmp_dir.name))
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def test_requests_and_queries_recorded(self):
+        requests = REQUESTS.get(view='core:index', method='GET', status=200)
+        self.client.get(reverse('core:index'))
+        self.assertEqual(REQUESTS.get(view='core:index', method='GET', status=200), requests + 1)
+
+        queries = DB_QUERIES.get(database='default')
+        self.client.force_login(User.objects.create_superuser('Alpaca', password='qwerty'))
+        response = self.client.get(reverse('core:metrics'))
+        self.assertGreater(DB_QUERIES.get(database='default'), queries, msg='the session and the user')
+
+        self.assertEqual(response['Content-Type'], 'text/plain; version=0.0.4; charset=utf-8')
+        text = response.content.decode()
+        self.assertIn('http_requests_total{view="core:index",method="GET",status="200"}', text)
+        self.assertIn('http_request_duration_seconds_bucket{view="core:index",le="+Inf"}', text)
+        self.assertIn('# TYPE auctions_bids_placed_total counter', text)
+        self.assertIn('# TYPE polls_votes_total counter', text)
+
+    def test_for_the_admins_only(self):
+        url = reverse('core:metrics')
+        response = self.client.get(url)
+        self.assertRedirects(response, f'{reverse("admin:login")}?next={url}')
+
+        self.client.force_login(User.objects.create_user('Serval', password='qwerty'))
+        self.assertEqual(self.client.get(url).status_code, 302)
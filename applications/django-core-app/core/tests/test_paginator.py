@@ -0,0 +1,31 @@
+from django.test import TestCase
+
+from django.contrib.auth.models import User
+from core.paginator import BoundedCountPaginator
+
+
+class BoundedCountPaginatorTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        User.objects.bulk_create([User(username=f'Friend-{i}') for i in range(5)])
+
+    def test_count_up_to_the_limit(self):
+        users = User.objects.order_by('pk')
+        paginator = BoundedCountPaginator(users, 2)
+        paginator.count_limit = 3
+        with self.assertNumQueries(1) as context:
+            self.assertEqual(paginator.count, 3)
+        self.assertIn('LIMIT 3', context.captured_queries[0]['sql'])
+        self.assertTrue(paginator.is_estimate)
+        self.assertEqual(paginator.display_count, '3+')
+        self.assertEqual(paginator.num_pages, 2)
+        # the rows past the limit are left out
+        self.assertEqual(len(paginator.page(2)), 1)
+
+    def test_exact_count_under_the_limit(self):
+        paginator = BoundedCountPaginator(User.objects.order_by('pk'), 2)
+        self.assertEqual(paginator.count, 5)
+        self.assertFalse(paginator.is_estimate)
+        self.assertEqual(paginator.display_count, '5')
+        self.assertEqual(BoundedCountPaginator(list(range(5)), 2).count, 5)
@@ -0,0 +1,69 @@
+import re
+
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from core.metrics import DB_QUERIES
+from core.server_timing import timed, _timings
+from encyclopedia.models import Entry
+
+
+class ServerTimingTests(TestCase):
+    databases = '__all__'
+
+    @classmethod
+    def setUpTestData(cls):
+        Entry.manager.create(slug='japari-bun', entry_name='Japari bun', entry_text='# An endless source of energy!')
+        cls.staff = User.objects.create_user('Alpaca', password='qwerty', is_staff=True)
+
+    def setUp(self):
+        self.client.force_login(self.staff)
+
+    def _phases(self, response) -> dict:
+        return {name: (float(duration), desc) for name, duration, desc in
+                re.findall(r'([\w-]+);dur=([\d.]+)(?:;desc="([^"]*)")?', response['Server-Timing'])}
+
+    @override_settings(SERVER_TIMING_SAMPLE_RATE=1.0)
+    def test_phases_of_a_sampled_request(self):
+        response = self.client.get(reverse('encyclopedia:detail', args=['japari-bun']))
+        self.assertContains(response, 'An endless source of energy!')
+        phases = self._phases(response)
+
+        self.assertEqual(list(phases)[-1], 'total')
+        self.assertIn('template', phases)
+        self.assertIn('markdown', phases)
+        duration, desc = phases['db-encyclopedia_db']
+        self.assertRegex(desc, r'^\d+ queries$')
+        self.assertLessEqual(duration, phases['total'][0])
+        self.assertNotIn('db-auctions_db', phases, msg='only the databases queried')
+
+    @override_settings(SERVER_TIMING_SAMPLE_RATE=1.0)
+    def test_queries_timed_once_for_both(self):
+        """ The execute_wrapper of the metrics feeds the header too. """
+        queries = DB_QUERIES.get(database='encyclopedia_db')
+        response = self.client.get(reverse('encyclopedia:detail', args=['japari-bun']))
+        _, desc = self._phases(response)['db-encyclopedia_db']
+        self.assertEqual(desc, f'{DB_QUERIES.get(database="encyclopedia_db") - queries} queries')
+
+    @override_settings(SERVER_TIMING_SAMPLE_RATE=1.0)
+    def test_for_the_staff_only(self):
+        self.client.logout()
+        response = self.client.get(reverse('encyclopedia:detail', args=['japari-bun']))
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.has_header('Server-Timing'))
+
+        self.client.force_login(User.objects.create_user('Serval', password='qwerty'))
+        response = self.client.get(reverse('encyclopedia:detail', args=['japari-bun']))
+        self.assertFalse(response.has_header('Server-Timing'))
+
+    @override_settings(SERVER_TIMING_SAMPLE_RATE=0.0)
+    def test_not_sampled(self):
+        response = self.client.get(reverse('encyclopedia:detail', args=['japari-bun']))
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.has_header('Server-Timing'))
+
+    def test_timed_outside_of_a_request(self):
+        self.assertIsNone(_timings.get())
+        with timed('markdown'):
+            pass
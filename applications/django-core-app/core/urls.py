@@ -7,4 +7,5 @@ app_name = 'core'
 urlpatterns = [
     path('', views.IndexView.as_view(), name='index'),
     path('/', views.IndexView.as_view(), name='index_slash'),
+    path('metrics', views.metrics, name='metrics'),
 ]
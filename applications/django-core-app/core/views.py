@@ -3,7 +3,11 @@ import markdown2
 import logging
 
 from django.conf import settings
+from django.http import HttpResponse
 from django.views import generic
+from django.contrib.admin.views.decorators import staff_member_required
+
+from .metrics import REGISTRY, CONTENT_TYPE
 
 logger = logging.getLogger(__name__)
 
@@ -32,3 +36,9 @@ def get_context():
 class IndexView(generic.TemplateView):
     template_name = 'core/index.html'
     extra_context = get_context()
+
+
+@staff_member_required
+def metrics(request):
+    """ The metrics of all the processes in the Prometheus text format, for the admins only. """
+    return HttpResponse(REGISTRY.render(), content_type=CONTENT_TYPE)
@@ -1,52 +1,263 @@
-from django.contrib import admin
-
+import time
+from collections import defaultdict
+
+from django import forms
+from django.conf import settings
+from django.contrib import admin, messages
+from django.contrib.admin.helpers import ActionForm
+from django.core.paginator import Paginator
+from django.forms.models import BaseInlineFormSet
+from django.http import QueryDict
+from django.utils.text import slugify
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from core.paginator import BoundedCountPaginator
+
+from . import bulk
+from .export import export_response
 from .models import ListingCategory, Profile, Listing, Comment, Bid, Watchlist, Log
 
 
-class ListingInline(admin.TabularInline):
-    model = Listing
+def count_of(model, field):
+    """ The number of the model rows pointing to the row by the field,
+        a subquery for the whole changelist instead of a query per row. """
+    rows = model.manager.filter(**{field: OuterRef('pk')}).order_by()\
+        .values(field).annotate(count=Count('pk')).values('count')
+    return Coalesce(Subquery(rows), 0)
+
+
+def prefix_search(queryset, field, term):
+    """ field >= term AND field < term + the last character, the index of the field serves it,
+        while LIKE 'term%' of istartswith scans the table on SQLite. Case-sensitive. """
+    if not term:
+        return queryset
+    return queryset.filter(**{f'{field}__gte': term, f'{field}__lt': f'{term}\U0010ffff'})
+
+
+def is_autocomplete(request) -> bool:
+    return request.resolver_match is not None and request.resolver_match.url_name == 'autocomplete'
+
+
+class AutocompleteFilter(admin.FieldListFilter):
+    """
+    A foreign key filter with a select that looks up the related rows as you type,
+    through the autocomplete view of the admin, instead of a link for each of them.
+    The admin of the related model needs search_fields. The changelist loads nothing
+    but the selected row.
+    """
+    template = 'admin/auctions/autocomplete_filter.html'
+
+    def __init__(self, field, request, params, model, model_admin, field_path):
+        self.lookup_kwarg = f'{field_path}__{field.target_field.name}__exact'
+        self.lookup_val = params.get(self.lookup_kwarg)
+        super().__init__(field, request, params, model, model_admin, field_path)
+        self.app_label = model._meta.app_label
+        self.model_name = model._meta.model_name
+        self.field_name = field.name
+
+    def expected_parameters(self):
+        return [self.lookup_kwarg]
+
+    def has_output(self):
+        return True
+
+    def selected(self):
+        if not self.lookup_val:
+            return None
+        related_model = self.field.remote_field.model
+        return related_model._default_manager.filter(pk=self.lookup_val).first()
+
+    def choices(self, changelist):
+        yield {
+            'selected': self.lookup_val is None,
+            'query_string': changelist.get_query_string(remove=[self.lookup_kwarg]),
+            'display': 'All',
+        }
+
+
+class AutocompleteFilterMedia:
+    js = ['admin/js/vendor/jquery/jquery.js', 'admin/js/vendor/select2/select2.full.js',
+          'admin/js/jquery.init.js', 'admin/js/autocomplete.js',
+          'auctions/admin/autocomplete_filter.js']
+    css = {'screen': ['admin/css/vendor/select2/select2.css', 'admin/css/autocomplete.css']}
+
+
+class MoneyFilter(admin.SimpleListFilter):
+    """ A few ranges instead of every distinct amount. """
+    title = 'money on account'
+    parameter_name = 'money'
+    RANGES = {'0': (None, 0.01), '100': (0.01, 100), '1000': (100, 1000), 'more': (1000, None)}
+
+    def lookups(self, request, model_admin):
+        return [('0', 'none'), ('100', 'less than 100'), ('1000', '100 – 1000'), ('more', '1000 and more')]
+
+    def queryset(self, request, queryset):
+        if self.value() not in self.RANGES:
+            return queryset
+        low, high = self.RANGES[self.value()]
+        if low is not None:
+            queryset = queryset.filter(money__gte=low)
+        if high is not None:
+            queryset = queryset.filter(money__lt=high)
+        return queryset
+
+
+class ExportActions:
+    """ Streamed exports of the selected rows, or of all the filtered ones with "Select all",
+        see also manage.py export_table. """
+    export_name = None
+    actions = ['export_csv', 'export_jsonl']
+
+    @admin.action(description='Export the selected %(verbose_name_plural)s as CSV', permissions=['view'])
+    def export_csv(self, request, queryset):
+        return export_response(queryset, self.export_name, 'csv')
+
+    @admin.action(description='Export the selected %(verbose_name_plural)s as JSON lines', permissions=['view'])
+    def export_jsonl(self, request, queryset):
+        return export_response(queryset, self.export_name, 'jsonl')
+
+
+class LotsActionForm(ActionForm):
+    category = forms.ModelChoiceField(ListingCategory.manager.all(), required=False,
+                                      help_text='for "Reassign the selected listings"')
+
+
+class LotsActions:
+    """ The operations on many lots, set-based and in batches, see auctions.bulk.
+        The result of every lot is reported, with the time it took. """
+    action_form = LotsActionForm
+    actions = ['withdraw_selected', 'close_selected', 'reassign_category']
+    shown_per_outcome = 10
+
+    @admin.action(description='Withdraw the selected listings from the auction', permissions=['change'])
+    def withdraw_selected(self, request, queryset):
+        self._run(request, queryset, 'Withdrawn', bulk.withdraw_lots)
+
+    @admin.action(description='Close the selected listings to the highest bidders', permissions=['change'])
+    def close_selected(self, request, queryset):
+        self._run(request, queryset, 'Closed', bulk.close_lots)
+
+    @admin.action(description='Reassign the selected listings to the category', permissions=['change'])
+    def reassign_category(self, request, queryset):
+        form = self.action_form(request.POST)
+        category = form.fields['category'].clean(request.POST.get('category'))
+        if category is None:
+            self.message_user(request, 'Choose the category to move the listings to.', messages.WARNING)
+            return
+        self._run(request, queryset, f'Moved to {category}', bulk.reassign_category, category)
+
+    def _run(self, request, queryset, title, operation, *args):
+        start = time.perf_counter()
+        outcomes = operation(queryset.values_list('pk', flat=True), *args)
+        elapsed = time.perf_counter() - start
+
+        lots = defaultdict(list)
+        for pk, outcome in sorted(outcomes.items()):
+            lots[outcome].append(pk)
+        slugs = dict(Listing.manager.filter(pk__in=outcomes).values_list('pk', 'slug'))
+        summary = []
+        for outcome, pks in sorted(lots.items()):
+            names = [slugs.get(pk, f'#{pk}') for pk in pks[:self.shown_per_outcome]]
+            if len(pks) > self.shown_per_outcome:
+                names.append(f'{len(pks) - self.shown_per_outcome} more')
+            summary.append(f'{outcome} {len(pks)} ({", ".join(names)})')
+        self.message_user(request, f'{title}: {len(outcomes)} listings in {elapsed:.2f} s; '
+                                   f'{"; ".join(summary)}.', messages.SUCCESS)
+
+
+class PaginatedInlineFormSet(BaseInlineFormSet):
+    """ A page of the related rows, the number of the page is in the query string. """
+    per_page = 20
+    query = QueryDict()
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.page_param = f'{self.prefix}-page'
+        self.paginator = Paginator(self.queryset, self.per_page)
+        self.page = self.paginator.get_page(self.query.get(self.page_param))
+        self.queryset = self.page.object_list
+
+    @property
+    def page_links(self) -> list:
+        """ (number, url) of the pages around the current one, the url is empty for the ellipsis. """
+        if self.paginator.num_pages < 2:
+            return []
+        links = []
+        for number in self.paginator.get_elided_page_range(self.page.number):
+            if number == self.paginator.ELLIPSIS:
+                links.append((number, ''))
+                continue
+            query = self.query.copy()
+            query[self.page_param] = number
+            links.append((number, f'?{query.urlencode()}'))
+        return links
+
+
+class BoundedChangeList:
+    """ The changelist of a table that grows without limit: counted up to a limit, see
+        core.paginator.BoundedCountPaginator, and a date_hierarchy read from the date index. """
+    paginator = BoundedCountPaginator
+    show_full_result_count = False
+    change_list_template = 'admin/auctions/bounded_change_list.html'
+
+
+class PaginatedInline(admin.TabularInline):
+    """ The change pages of the veteran profiles would list thousands of rows. """
+    formset = PaginatedInlineFormSet
+    template = 'admin/auctions/paginated_tabular.html'
+    per_page = 20
+    list_select_related = []
+
     extra = 0
     can_delete = False
     show_change_link = True
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related(*self.list_select_related)
+
+    def get_formset(self, request, obj=None, **kwargs):
+        formset = super().get_formset(request, obj, **kwargs)
+        formset.per_page = self.per_page
+        formset.query = request.GET
+        return formset
+
+
+class ListingInline(PaginatedInline):
+    model = Listing
     fields = ['slug', 'category', 'owner', 'starting_price',
               'date_created', 'date_published', 'is_active']
     readonly_fields = fields
+    list_select_related = ['category', 'owner']
 
 
-class CommentInline(admin.TabularInline):
+class CommentInline(PaginatedInline):
     model = Comment
-    extra = 0
-    can_delete = False
-    show_change_link = True
     fields = ['pub_date', '__str__', 'author']
     readonly_fields = fields
+    list_select_related = ['author']
 
 
-class LogInline(admin.TabularInline):
+class LogInline(PaginatedInline):
     model = Log
-    extra = 0
-    can_delete = False
-    show_change_link = True
-    fields = ['date', 'entry']
+    fk_name = 'profile'
+    fields = ['date', 'message']
     readonly_fields = fields
+    list_select_related = ['listing', 'counterparty']
 
 
-class WatchlistInline(admin.TabularInline):
+class WatchlistInline(PaginatedInline):
     model = Watchlist
-    extra = 0
-    can_delete = False
-    show_change_link = True
     fields = ['__str__', 'profile', 'listing']
     readonly_fields = fields
+    list_select_related = ['profile', 'listing']
 
 
-class BidInline(admin.TabularInline):
+class BidInline(PaginatedInline):
     model = Bid
-    extra = 0
-    can_delete = False
-    show_change_link = True
     fields = ['__str__', 'bid_date', 'bid_value', 'auctioneer', 'lot']
     readonly_fields = fields
+    list_select_related = ['auctioneer', 'lot']
 
 
 @admin.register(ListingCategory)
@@ -60,30 +271,86 @@ class CategoryAdmin(admin.ModelAdmin):
 
     inlines = [ListingInline]
 
+    def get_queryset(self, request):
+        return super().get_queryset(request).annotate(listings_count=count_of(Listing, 'category'))
+
+    @admin.display(description='items in category', ordering='listings_count')
+    def items_in_category(self, obj):
+        return obj.listings_count
+
 
 @admin.register(Profile)
 class ProfileAdmin(admin.ModelAdmin):
     list_display = ['pk', 'user_model_pk', 'username', 'money', 'items_owned_count',
                     'placed_bids_count', 'comments_written_count']
     list_display_links = ['pk', 'username']
-    list_filter = ['username', 'money']
+    list_filter = [MoneyFilter]
+
+    search_fields = ['^username']
+    search_help_text = 'username starts with'
 
     fields = ['pk', 'user_model_pk', 'username', 'money']
     readonly_fields = ['pk', 'user_model_pk']
 
+    if settings.SINGLE_DATABASE:
+        # the users can be joined only when they are in the same database
+        list_display = list_display + ['user_last_login']
+        list_select_related = ['user']
+
+    @admin.display(description='last login')
+    def user_last_login(self, obj):
+        return obj.user.last_login if obj.user else None
+
+    def get_queryset(self, request):
+        if is_autocomplete(request):
+            return super().get_queryset(request)
+        return super().get_queryset(request).annotate(
+            lots_count=count_of(Listing, 'owner'),
+            bids_count=count_of(Bid, 'auctioneer'),
+            comments_count=count_of(Comment, 'author'),
+        )
+
+    def get_search_results(self, request, queryset, search_term):
+        if is_autocomplete(request):
+            # the autocomplete filters look up the profiles as you type
+            return prefix_search(queryset, 'username', search_term.strip()), False
+        return super().get_search_results(request, queryset, search_term)
+
+    @admin.display(description='items owned', ordering='lots_count')
+    def items_owned_count(self, obj):
+        return obj.lots_count
+
+    @admin.display(description='placed bids', ordering='bids_count')
+    def placed_bids_count(self, obj):
+        return obj.bids_count
+
+    @admin.display(description='comments', ordering='comments_count')
+    def comments_written_count(self, obj):
+        return obj.comments_count
+
     inlines = [ListingInline, BidInline, WatchlistInline, CommentInline, LogInline]
 
 
 @admin.register(Listing)
-class ListingAdmin(admin.ModelAdmin):
+class ListingAdmin(LotsActions, ExportActions, admin.ModelAdmin):
+    export_name = 'listings'
+    actions = LotsActions.actions + ExportActions.actions
     list_display = ['pk', 'slug', 'owner', 'category', 'date_created', 'is_active', 'date_published']
     list_display_links = ['pk', 'slug']
-    list_filter = ['slug', 'category', 'owner', 'date_created', 'is_active']
+    list_filter = ['category', ('owner', AutocompleteFilter), 'date_created', 'is_active']
     list_select_related = ['category', 'owner']
 
     search_fields = ['title']
     search_help_text = 'search listing title'
 
+    Media = AutocompleteFilterMedia
+
+    def get_search_results(self, request, queryset, search_term):
+        if is_autocomplete(request):
+            # the lots are shown by their slugs, made of the titles
+            return prefix_search(queryset, 'slug', slugify(search_term)), False
+        return super().get_search_results(request, queryset, search_term)
+
     fields = ['pk', 'slug', 'title', 'category', 'owner',
               'starting_price', 'description', 'image',
               'date_created', 'date_published', 'is_active']
@@ -100,11 +367,13 @@ class ListingAdmin(admin.ModelAdmin):
 
 
 @admin.register(Comment)
-class CommentsAdmin(admin.ModelAdmin):
+class CommentsAdmin(BoundedChangeList, admin.ModelAdmin):
     list_display = ['pk', '__str__', 'pub_date', 'listing', 'author']
     list_display_links = ['pk', '__str__']
-    list_filter = ['pub_date', 'listing', 'author']
+    list_filter = ['pub_date', ('listing', AutocompleteFilter), ('author', AutocompleteFilter)]
     list_select_related = ['listing', 'author']
+    Media = AutocompleteFilterMedia
+    date_hierarchy = 'pub_date'
 
     search_fields = ['text']
     search_help_text = 'search in comments text'
@@ -114,11 +383,14 @@ class CommentsAdmin(admin.ModelAdmin):
 
 
 @admin.register(Bid)
-class BidsAdmin(admin.ModelAdmin):
+class BidsAdmin(BoundedChangeList, ExportActions, admin.ModelAdmin):
+    export_name = 'bids'
     list_display = ['pk', 'bid_date', '__str__', 'bid_value', 'auctioneer', 'lot']
     list_display_links = ['pk', '__str__']
-    list_filter = ['bid_date', 'auctioneer', 'lot']
+    list_filter = ['bid_date', ('auctioneer', AutocompleteFilter), ('lot', AutocompleteFilter)]
     list_select_related = ['auctioneer', 'lot']
+    Media = AutocompleteFilterMedia
+    date_hierarchy = 'bid_date'
 
     fields = ['pk', 'auctioneer', 'lot', 'bid_value', 'bid_date']
     readonly_fields = ['pk']
@@ -128,19 +400,23 @@ class BidsAdmin(admin.ModelAdmin):
 class WatchlistAdmin(admin.ModelAdmin):
     list_display = ['pk', '__str__', 'profile', 'listing']
     list_display_links = ['pk', '__str__']
-    list_filter = ['profile', 'listing']
+    list_filter = [('profile', AutocompleteFilter), ('listing', AutocompleteFilter)]
     list_select_related = ['profile', 'listing']
+    Media = AutocompleteFilterMedia
 
     fields = ['pk', 'profile', 'listing']
     readonly_fields = ['pk']
 
 
 @admin.register(Log)
-class LogAdmin(admin.ModelAdmin):
-    list_display = ['pk', 'date', 'profile']
+class LogAdmin(BoundedChangeList, ExportActions, admin.ModelAdmin):
+    export_name = 'logs'
+    list_display = ['pk', 'date', 'profile', 'event', 'amount']
     list_display_links = ['pk', 'profile']
-    list_filter = ['date']
+    list_filter = ['event', 'date']
     list_select_related = ['profile']
+    date_hierarchy = 'date'
 
-    fields = ['pk', 'date', 'profile', 'entry']
-    readonly_fields = ['pk', 'date']
+    fields = ['pk', 'date', 'profile', 'event', 'listing', 'counterparty', 'amount', 'message']
+    readonly_fields = ['pk', 'date', 'message']
+    raw_id_fields = ['profile', 'listing', 'counterparty']
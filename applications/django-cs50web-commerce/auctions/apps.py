@@ -3,7 +3,8 @@ import sys
 import logging
 
 from django.apps import AppConfig
-from django.db.models.signals import pre_save, post_save, pre_delete, post_delete
+from django.conf import settings
+from django.db.models.signals import post_init, pre_save, post_save, pre_delete, post_delete
 
 logger = logging.getLogger(__name__)
 
@@ -20,16 +21,20 @@ class AuctionsConfig(AppConfig):
                 pass
             else:
                 self._user_model_signals(User)
+            self._cache_signals()
 
-            if 'test' not in sys.argv:
+            if not {'test', 'migrate', 'makemigrations', 'merge_databases'} & set(sys.argv):
+                # the tables may not be up to date yet while migrating
                 from .models import Profile
-                users = User.objects.all()
-                profiles = Profile.manager.all()
+                from .sync import apply_pending
+                profiles = Profile.manager.filter(is_deleted=False)
 
-                self._logger_signals(Profile)
+                if settings.MODEL_LOGS:
+                    self._logger_signals(Profile)
                 self._clean_watchlist(profiles)
                 self._clean_bids(profiles)
-                self._user_and_profile_models_sync(User, Profile, users, profiles)
+                # the user changes not applied yet, if the server stopped in between
+                apply_pending()
 
     @staticmethod
     def _user_model_signals(user_model):
@@ -38,21 +43,34 @@ class AuctionsConfig(AppConfig):
         the need to keep User model in sync with Profile model.
         Surely there are better ways to do this... I wonder...
         I need a knowledge about large systems building.
+        The changes go through the accounts outbox, see auctions.sync.
         """
-        from .signals import user_saved_signal, user_pre_saved_signal, user_pre_delete_signal
+        from .signals import (
+            user_loaded_signal, user_saved_signal,
+            user_pre_saved_signal, user_pre_delete_signal
+        )
+        post_init.connect(user_loaded_signal, sender=user_model, dispatch_uid='user-loaded')
         post_save.connect(user_saved_signal, sender=user_model, dispatch_uid='user-saved')
         pre_save.connect(user_pre_saved_signal, sender=user_model, dispatch_uid='user-pre-save')
         pre_delete.connect(user_pre_delete_signal, sender=user_model, dispatch_uid='user-delete')
 
+    @staticmethod
+    def _cache_signals():
+        from .models import Comment
+        from .signals import comment_changed_signal
+        post_save.connect(comment_changed_signal, sender=Comment, dispatch_uid='comment-cache-save')
+        post_delete.connect(comment_changed_signal, sender=Comment, dispatch_uid='comment-cache-delete')
+
     @staticmethod
     def _logger_signals(profile_model):
         """ Technical logs in files about some key operations with the models. """
-        from .models import ListingCategory, Listing, Bid
+        from .models import ListingCategory, Listing, Bid, money_changed
         from .logs import (
-            log_profile_save, log_profile_deleted,
+            log_profile_save, log_profile_deleted, log_money_changed,
             log_category_save, log_bid_save, log_listing_save
         )
         post_save.connect(log_profile_save, sender=profile_model, dispatch_uid='profile')
+        money_changed.connect(log_money_changed, sender=profile_model, dispatch_uid='profile-money')
         post_delete.connect(log_profile_deleted, sender=profile_model, dispatch_uid='profile-delete')
         post_save.connect(log_category_save, sender=ListingCategory, dispatch_uid='category')
         post_save.connect(log_bid_save, sender=Bid, dispatch_uid='bid')
@@ -79,49 +97,3 @@ class AuctionsConfig(AppConfig):
                 for bid in result:
                     bid.delete(refund=True)
                 logger.info(f'AUCTIONS APP: the profile [{profile}] had bids on unpublished items')
-
-    def _user_and_profile_models_sync(self, user_model, profile_model, users, profiles):
-        """ The debug mechanism for the User-Profile synchronisation. """
-        users_usernames_set = set([q.username for q in users])
-        profiles_usernames_set = set([q.username for q in profiles])
-
-        if users_usernames_set != profiles_usernames_set:
-            logger.critical(f'AUCTIONS APP: models usernames do not match. '
-                            f'User{users_usernames_set} Profile{profiles_usernames_set}')
-            self._fix_usernames(users, profile_model)
-
-        users_pk_set = set([q.pk for q in users])
-        profiles_external_pk_set = set([q.user_model_pk for q in profiles])
-
-        if users_pk_set != profiles_external_pk_set:
-            logger.critical(f'AUCTIONS APP: models pks do not match. '
-                            f'User{users_pk_set} Profile{profiles_external_pk_set}')
-            self._fix_pks(users, profile_model)
-
-    @staticmethod
-    def _fix_usernames(users, profile_model):
-        logger.critical('try to fix usernames through user.pk...')
-        for user in users:
-            if not profile_model.manager.filter(username=user.username).exists():
-                if profile_model.manager.filter(user_model_pk=user.pk).exists():
-                    profile = profile_model.manager.filter(user_model_pk=user.pk).first()
-                    logger.critical(f'found the profile [{profile}] of the user [{user}-{user.pk}]')
-                    profile.username = user.username
-                    profile.save(update_fields=['username'])
-                    logger.critical(f'renamed the profile to [{profile}]')
-                else:
-                    logger.critical(f'no profile found for this user [{user}-{user.pk}]')
-
-    @staticmethod
-    def _fix_pks(users, profile_model):
-        logger.critical('try to fix the pk problem...')
-        for user in users:
-            if not profile_model.manager.filter(user_model_pk=user.pk).exists():
-                if profile_model.manager.filter(username=user.username).exists():
-                    profile = profile_model.manager.filter(username=user.username).first()
-                    logger.critical(f'found the profile [{profile}] of the user [{user}-{user.pk}]')
-                    profile.user_model_pk = user.pk
-                    profile.save()
-                    logger.critical(f'[{user}] pk saved to the [{profile}]')
-                else:
-                    logger.critical(f'no profile found for this user [{user}-{user.pk}]')
@@ -0,0 +1,150 @@
+import logging
+from collections import defaultdict
+
+from django.db.models import F, Case, When, Value, OuterRef, Subquery
+
+from core.db import retry_on_lock
+from .models import (
+    Profile, Listing, Bid, Watchlist, Log, DB, DEFAULT_STARTING_PRICE,
+    AUCTIONS_CLOSED, REFUNDS, REFUNDED_COINS, count_on_commit
+)
+
+logger = logging.getLogger(__name__)
+
+""" The admin operations on many lots at once, a constant number of statements per chunk,
+    the per-lot methods of Listing are a transaction and a loop of bids each. """
+
+CHUNK_SIZE = 200
+
+WITHDRAWN = 'withdrawn'
+SOLD = 'sold'
+MOVED = 'moved'
+NOT_ACTIVE = 'not active'
+NO_BIDS = 'no bids'
+UNCHANGED = 'already in the category'
+GONE = 'gone'
+
+
+def withdraw_lots(pks, chunk_size=CHUNK_SIZE) -> dict:
+    """ Listing.withdraw for every lot: the bids are refunded and the watchlists cleared.
+        Returns the outcome of every lot, {pk: outcome}. """
+    return _in_chunks(_withdraw_chunk, pks, chunk_size)
+
+
+def close_lots(pks, chunk_size=CHUNK_SIZE) -> dict:
+    """ Listing.change_the_owner for every lot: sold to the highest bid, the others refunded.
+        The lots without bids stay on the auction. """
+    return _in_chunks(_close_chunk, pks, chunk_size)
+
+
+def reassign_category(pks, category, chunk_size=CHUNK_SIZE) -> dict:
+    return _in_chunks(_reassign_chunk, pks, chunk_size, category)
+
+
+def _in_chunks(operation, pks, chunk_size, *args) -> dict:
+    pks = list(pks)
+    outcomes = dict.fromkeys(pks, GONE)
+    for i in range(0, len(pks), chunk_size):
+        outcomes.update(operation(pks[i:i+chunk_size], *args))
+    return outcomes
+
+
+def _refund(bids, event) -> list:
+    """ Refunds the bids, [(pk, auctioneer pk, lot pk, value)]; the caller deletes them by the lots.
+        Returns the log entries of the refunds. """
+    totals = defaultdict(float)
+    for _, auctioneer, _, value in bids:
+        totals[auctioneer] += value
+    Profile.manager.credit_many(totals)
+    count_on_commit(REFUNDS, len(bids))
+    count_on_commit(REFUNDED_COINS, sum(totals.values()))
+    return [Log(profile_id=auctioneer, event=event, listing_id=lot, amount=value)
+            for _, auctioneer, lot, value in bids]
+
+
+def _take_off(pks, **values):
+    """ The lots leave the auction, only the owners keep them in the watchlists. """
+    Watchlist.manager.filter(listing__in=pks).exclude(profile=F('listing__owner')).delete()
+    Listing.manager.filter(pk__in=pks).update(
+        is_active=False, date_published=None, highest_bid=None, **values)
+
+
+def _active(pks) -> (dict, dict):
+    """ The outcomes of the lots that are not on the auction, and the owners of those that are. """
+    outcomes, owners = {}, {}
+    for pk, is_active, owner in Listing.manager.filter(pk__in=pks).values_list('pk', 'is_active', 'owner'):
+        if is_active:
+            owners[pk] = owner
+        else:
+            outcomes[pk] = NOT_ACTIVE
+    return outcomes, owners
+
+
+@retry_on_lock(DB)
+def _withdraw_chunk(pks) -> dict:
+    outcomes, owners = _active(pks)
+    if not owners:
+        return outcomes
+
+    bids = list(Bid.manager.filter(lot__in=owners).values_list('pk', 'auctioneer', 'lot', 'bid_value'))
+    logs = [Log(profile_id=owner, event=Log.WITHDRAWN, listing_id=pk) for pk, owner in owners.items()]
+    logs += _refund(bids, Log.OWNER_REMOVED)
+    Bid.manager.filter(lot__in=owners).delete()
+    _take_off(owners)
+    Log.manager.bulk_create(logs)
+
+    logger.info(f'AUCTIONS APP: {len(owners)} lots withdrawn, {len(bids)} bids refunded')
+    outcomes.update(dict.fromkeys(owners, WITHDRAWN))
+    return outcomes
+
+
+@retry_on_lock(DB)
+def _close_chunk(pks) -> dict:
+    outcomes, owners = _active(pks)
+    top = Bid.manager.filter(lot=OuterRef('pk')).order_by('-bid_value', '-pk').values('pk')[:1]
+    winners = set(Listing.manager.filter(pk__in=owners)
+                  .annotate(top=Subquery(top)).exclude(top=None).values_list('top', flat=True))
+    if not winners:
+        outcomes.update(dict.fromkeys(owners, NO_BIDS))
+        return outcomes
+
+    bids = list(Bid.manager.filter(lot__in=owners).values_list('pk', 'auctioneer', 'lot', 'bid_value'))
+    sold = {lot: (auctioneer, value) for pk, auctioneer, lot, value in bids if pk in winners}
+    logs, takings = [], defaultdict(float)
+    for lot, (winner, value) in sold.items():
+        takings[owners[lot]] += value
+        logs += [Log(profile_id=owners[lot], event=Log.ITEM_SOLD, listing_id=lot, counterparty_id=winner),
+                 Log(profile_id=owners[lot], event=Log.MONEY_ADDED, amount=value),
+                 Log(profile_id=winner, event=Log.YOU_WON, listing_id=lot, amount=value)]
+    Profile.manager.credit_many(takings)
+    logs += _refund([bid for bid in bids if bid[0] not in winners], Log.YOU_LOSE)
+    Bid.manager.filter(lot__in=sold).delete()
+
+    new_owner = Case(*[When(pk=lot, then=Value(winner)) for lot, (winner, _) in sold.items()])
+    Listing.manager.filter(pk__in=sold).update(owner=new_owner)
+    _take_off(sold, starting_price=DEFAULT_STARTING_PRICE)
+    _watch(sold)
+    Log.manager.bulk_create(logs)
+    count_on_commit(AUCTIONS_CLOSED, len(sold))
+
+    logger.info(f'AUCTIONS APP: {len(sold)} lots sold, {len(bids) - len(sold)} bids refunded')
+    outcomes.update({lot: SOLD if lot in sold else NO_BIDS for lot in owners})
+    return outcomes
+
+
+def _watch(sold):
+    """ The lots are in the watchlists of the new owners, as after Listing.save. """
+    watched = set(Watchlist.manager.filter(listing__in=sold, profile=F('listing__owner'))
+                  .values_list('listing', flat=True))
+    Watchlist.manager.bulk_create(Watchlist(profile_id=winner, listing_id=lot)
+                                  for lot, (winner, _) in sold.items() if lot not in watched)
+
+
+@retry_on_lock(DB)
+def _reassign_chunk(pks, category) -> dict:
+    lots = dict(Listing.manager.filter(pk__in=pks).values_list('pk', 'category'))
+    moved = [pk for pk, category_pk in lots.items() if category_pk != category.pk]
+    Listing.manager.filter(pk__in=moved).update(category=category)
+    outcomes = dict.fromkeys(lots, UNCHANGED)
+    outcomes.update(dict.fromkeys(moved, MOVED))
+    return outcomes
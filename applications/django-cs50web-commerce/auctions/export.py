@@ -0,0 +1,74 @@
+import csv
+import json
+from datetime import datetime
+
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+
+from .models import Listing, Bid, Log
+
+""" Exports of the auction tables, streamed row by row: the memory does not grow with the table. """
+
+CHUNK_SIZE = 2000
+
+""" The exported columns, (name, lookup), and the date field to take a period by. """
+EXPORTS = {
+    'bids': {
+        'model': Bid,
+        'date_field': 'bid_date',
+        'columns': [('id', 'pk'), ('date', 'bid_date'), ('value', 'bid_value'),
+                    ('auctioneer_id', 'auctioneer_id'), ('auctioneer', 'auctioneer__username'),
+                    ('lot_id', 'lot_id'), ('lot', 'lot__slug')],
+    },
+    'logs': {
+        'model': Log,
+        'date_field': 'date',
+        'columns': [('id', 'pk'), ('date', 'date'), ('profile_id', 'profile_id'),
+                    ('profile', 'profile__username'), ('event', 'event'), ('amount', 'amount'),
+                    ('listing_id', 'listing_id'), ('listing', 'listing__slug'),
+                    ('counterparty', 'counterparty__username')],
+    },
+    'listings': {
+        'model': Listing,
+        'date_field': 'date_created',
+        'columns': [('id', 'pk'), ('slug', 'slug'), ('title', 'title'), ('category', 'category__label'),
+                    ('owner_id', 'owner_id'), ('owner', 'owner__username'),
+                    ('starting_price', 'starting_price'), ('highest_bid', 'highest_bid'),
+                    ('created', 'date_created'), ('published', 'date_published'), ('is_active', 'is_active')],
+    },
+}
+FORMATS = {'csv': 'text/csv', 'jsonl': 'application/x-ndjson'}
+
+
+class _Echo:
+    """ A file for the csv.writer that hands the line back instead of keeping it. """
+    def write(self, value):
+        return value
+
+
+def _plain(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+def export_lines(queryset, name, fmt='csv'):
+    """ Yields the lines of the export, the rows are fetched in chunks and never all at once. """
+    columns = EXPORTS[name]['columns']
+    names = [column for column, _ in columns]
+    rows = queryset.values_list(*[lookup for _, lookup in columns]).iterator(chunk_size=CHUNK_SIZE)
+    if fmt == 'csv':
+        writer = csv.writer(_Echo())
+        yield writer.writerow(names)
+        for row in rows:
+            yield writer.writerow([_plain(value) for value in row])
+    else:
+        for row in rows:
+            yield json.dumps(dict(zip(names, map(_plain, row))), ensure_ascii=False) + '\n'
+
+
+def export_response(queryset, name, fmt='csv') -> StreamingHttpResponse:
+    filename = f'auctions-{name}-{timezone.localtime():%Y%m%d-%H%M%S}.{fmt}'
+    response = StreamingHttpResponse(export_lines(queryset, name, fmt), content_type=FORMATS[fmt])
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
@@ -10,9 +10,10 @@ from django.forms import (
 )
 from .models import (
     SLUG_MAX_LEN, LOT_TITLE_MAX_LEN, DEFAULT_STARTING_PRICE,
-    USERNAME_MAX_LEN, Profile, Listing, ListingCategory
+    USERNAME_MAX_LEN, DB, Profile, Listing, ListingCategory
 )
 from .utils import format_bid_value
+from core.db import retry_on_lock
 
 logger = logging.getLogger(__name__)
 
@@ -38,7 +39,6 @@ class TransferMoneyForm(ModelForm):
     def save(self, commit=True):
         money = self.cleaned_data['transfer_money']
         self.instance.add_money(money)
-        self.instance.refresh_from_db()
         return self.instance
 
 
@@ -127,7 +127,7 @@ class AuctionLotForm(ModelForm):
             self.instance.make_a_bid(profile, bid_value)
         elif 'btn_user_watching' in self.data:
             profile = Profile.manager.filter(username=username).first()
-            profile.items_watched.add(self.instance)
+            self.instance.watch(profile)
         elif 'btn_user_unwatched' in self.data:
             self.instance.unwatch(username=username)
 
@@ -151,6 +151,7 @@ class CommentForm(ModelForm):
         model = Listing
         fields = ['text_field', 'author_hidden']
 
+    @retry_on_lock(DB)
     def save(self, commit=True):
         username = self.cleaned_data['author_hidden']
         self.instance.comment_set.create(
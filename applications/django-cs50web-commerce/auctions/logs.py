@@ -2,33 +2,49 @@ import logging
 
 logger = logging.getLogger(__name__)
 
+"""
+The receivers run in every save, so they use only what the instance has loaded
+and never query: a related object not loaded is written as its pk.
+The messages are formatted by the logger, only when it is going to write them.
+Turned off with alpaca.presets.MODEL_LOGS.
+"""
+
+
+def _related(instance, name):
+    field = instance._meta.get_field(name)
+    if field.is_cached(instance):
+        return field.get_cached_value(instance)
+    return f'pk-{getattr(instance, field.attname)}'
+
 
 def log_profile_save(instance, created, update_fields=None, **kwargs):
     if created:
-        logger.info(f'profile [{instance}] created')
-    elif update_fields and 'money' in update_fields:
-        instance.refresh_from_db()
-        logger.info(f'profile [{instance}] money changed, now has {instance.money} coins')
+        logger.info('profile [%s] created', instance)
     elif update_fields and 'username' in update_fields:
-        logger.info(f'profile [{instance}, pk-{instance.pk}] username updated')
+        logger.info('profile [%s, pk-%s] username updated', instance, instance.pk)
+
+
+def log_money_changed(pk, balance, **kwargs):
+    logger.info('profile [pk-%s] money changed, now has %s coins', pk, balance)
 
 
 def log_profile_deleted(instance, **kwargs):
-    logger.info(f'profile [{instance}] deleted')
+    logger.info('profile [%s] deleted', instance)
 
 
 def log_category_save(instance, created, **kwargs):
     if created:
-        logger.info(f'category [{instance}] created')
+        logger.info('category [%s] created', instance)
 
 
 def log_bid_save(instance, created, **kwargs):
-    if created:
-        logger.info(f'bid from [{instance.auctioneer}], on [{instance.lot}]')
+    if created and logger.isEnabledFor(logging.INFO):
+        logger.info('bid from [%s], on [%s]',
+                    _related(instance, 'auctioneer'), _related(instance, 'lot'))
 
 
 def log_listing_save(instance, created, update_fields=None, **kwargs):
     if created:
-        logger.info(f'listing [{instance}] created')
-    elif update_fields and 'owner' in update_fields:
-        logger.info(f'listing [{instance}] owner changed to [{instance.owner}]')
+        logger.info('listing [%s] created', instance)
+    elif update_fields and 'owner' in update_fields and logger.isEnabledFor(logging.INFO):
+        logger.info('listing [%s] owner changed to [%s]', instance, _related(instance, 'owner'))
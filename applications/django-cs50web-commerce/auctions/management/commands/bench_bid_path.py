@@ -0,0 +1,125 @@
+""" The bid path under the SQLite settings: every step adds one setting on top of the previous one. """
+
+import math
+import threading
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from core.bench import scratch_databases, Timer
+
+DB = settings.PROJECT_MAIN_APPS['auctions']['db']['name']
+
+BASELINE = {'journal_mode': 'DELETE', 'synchronous': 'FULL'}
+STEPS = [
+    ('baseline (rollback journal, synchronous=FULL)', {}),
+    ('+ journal_mode=WAL', {'journal_mode': 'WAL'}),
+    ('+ synchronous=NORMAL', {'synchronous': 'NORMAL'}),
+    ('+ mmap_size', {'mmap_size': 64 * 1024 * 1024}),
+    ('+ cache_size', {'cache_size': -32 * 1024}),
+    ('+ temp_store=MEMORY', {'temp_store': 'MEMORY'}),
+    ('+ busy_timeout', {'busy_timeout': 10000}),
+]
+
+
+class Command(BaseCommand):
+    help = 'Measures the auction bid path (writes) and the lot page (reads) ' \
+           'under each SQLite setting of the database profile, on scratch databases.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--bids', type=int, default=300, help='bids placed per step')
+        parser.add_argument('--lots', type=int, default=30, help='number of published lots')
+        parser.add_argument('--readers', type=int, default=2,
+                            help='threads loading lot pages while the bids are placed')
+
+    def handle(self, *args, **options):
+        with scratch_databases('default', DB):
+            lots, profiles = self._fixtures(options['lots'])
+            self.stdout.write(f'{"step":<48}{"bids/s":>10}{"p95 ms":>10}{"reads/s":>10}')
+
+            pragmas = dict(BASELINE)
+            for label, step in STEPS:
+                pragmas.update(step)
+                self._report(label, *self._run(pragmas, False, lots, profiles, options))
+            self._report('+ persistent connections (CONN_MAX_AGE)',
+                         *self._run(pragmas, True, lots, profiles, options))
+
+            configured = settings.PROJECT_MAIN_APPS['auctions']['db']['sqlite']
+            self._report('configured profile (alpaca.presets)',
+                         *self._run(configured, True, lots, profiles, options))
+
+    def _report(self, label, writes, reads):
+        self.stdout.write(f'{label:<48}{writes.per_second():>10.1f}'
+                          f'{writes.percentile_ms(95):>10.2f}{reads.per_second():>10.1f}')
+
+    @staticmethod
+    def _fixtures(lots_count):
+        from auctions.models import Profile, ListingCategory, Listing
+        category = ListingCategory.manager.create(label='bench')
+        owner = Profile.manager.create(username='bench-owner')
+        profiles = [
+            Profile.manager.create(username=f'bench-bidder-{i}', money=10 ** 9)
+            for i in range(2)
+        ]
+        lots = []
+        for i in range(lots_count):
+            lot = Listing.manager.create(
+                title=f'bench lot {i}', description='bench lot',
+                image='bench.jpg', category=category, owner=owner
+            )
+            lot.publish_the_lot()
+            lots.append(lot.pk)
+        return lots, [p.pk for p in profiles]
+
+    def _run(self, pragmas, persistent, lots, profiles, options):
+        connection = connections[DB]
+        connection.settings_dict['PRAGMAS'] = pragmas
+        connection.close()
+
+        stop = threading.Event()
+        reads = Timer()
+        readers = [
+            threading.Thread(target=self._read_loop, args=(pragmas, lots, reads, stop))
+            for _ in range(options['readers'])
+        ]
+        for reader in readers:
+            reader.start()
+
+        writes = Timer()
+        try:
+            for i in range(options['bids']):
+                with writes():
+                    self._bid(lots[i % len(lots)], profiles[(i // len(lots)) % len(profiles)])
+                if not persistent:
+                    connection.close()
+        finally:
+            stop.set()
+            for reader in readers:
+                reader.join()
+        return writes, reads
+
+    @staticmethod
+    def _bid(lot_pk, profile_pk):
+        """ One POST of the bid form: load the lot and the auctioneer, place the bid. """
+        from auctions.models import Profile, Listing
+        lot = Listing.manager.select_related('owner').get(pk=lot_pk)
+        auctioneer = Profile.manager.get(pk=profile_pk)
+        value = math.ceil(lot.get_highest_price(percent=True) * 100) / 100
+        lot.make_a_bid(auctioneer, value)
+
+    @staticmethod
+    def _read_loop(pragmas, lots, timer, stop):
+        """ One GET of a lot page: the lot, its bid count and the latest comments. """
+        from auctions.models import Listing
+        connections[DB].settings_dict['PRAGMAS'] = pragmas
+        i = 0
+        try:
+            while not stop.is_set():
+                with timer():
+                    lot = Listing.manager.select_related('category', 'owner').get(pk=lots[i % len(lots)])
+                    lot.potential_buyers.count()
+                    list(lot.comment_set.select_related('author')[:10])
+                i += 1
+        finally:
+            connections.close_all()
@@ -0,0 +1,56 @@
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connections
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+
+from core.bench import scratch_databases, Timer
+
+DB = settings.PROJECT_MAIN_APPS['auctions']['db']['name']
+PASSWORD = 'bench-password'
+
+
+class Command(BaseCommand):
+    help = 'Measures the login path (authentication, last_login update, session) ' \
+           'and the queries it makes on each database, on scratch databases.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--logins', type=int, default=300, help='number of logins')
+        parser.add_argument('--users', type=int, default=30, help='number of users')
+        parser.add_argument('--with-password', action='store_true',
+                            help='authenticate with the password, the hashing then dominates the timing')
+
+    def handle(self, *args, **options):
+        from django.contrib.auth.models import User
+        with scratch_databases('default', DB):
+            users = [
+                User.objects.create_user(f'bench-user-{i}', password=PASSWORD)
+                for i in range(options['users'])
+            ]
+            timer = Timer()
+            queries = {alias: 0 for alias in ('default', DB)}
+            client = Client()
+
+            for i in range(options['logins']):
+                user = users[i % len(users)]
+                with ExitStack() as stack:
+                    contexts = [
+                        stack.enter_context(CaptureQueriesContext(connections[alias]))
+                        for alias in queries
+                    ]
+                    with timer():
+                        if options['with_password']:
+                            client.login(username=user.username, password=PASSWORD)
+                        else:
+                            client.force_login(User.objects.get(pk=user.pk))
+                for alias, context in zip(queries, contexts):
+                    queries[alias] += len(context)
+                client.logout()
+
+            logins = len(timer.samples)
+            self.stdout.write(f'logins/s     {timer.per_second():.1f}')
+            self.stdout.write(f'p95 ms       {timer.percentile_ms(95):.2f}')
+            for alias, count in queries.items():
+                self.stdout.write(f'queries/login on {alias}: {count / logins:.2f}')
@@ -0,0 +1,45 @@
+from datetime import datetime, time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from auctions.export import EXPORTS, FORMATS, export_lines
+
+
+class Command(BaseCommand):
+    help = 'Exports an auctions table as CSV or JSON lines, row by row, ' \
+           'optionally for a period. To a file or to stdout.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('table', choices=list(EXPORTS))
+        parser.add_argument('--format', choices=list(FORMATS), default='csv')
+        parser.add_argument('--output', help='a file, stdout by default')
+        parser.add_argument('--since', help='YYYY-MM-DD, the first day of the period')
+        parser.add_argument('--until', help='YYYY-MM-DD, the day after the period')
+
+    def handle(self, *args, **options):
+        export = EXPORTS[options['table']]
+        queryset = export['model'].manager.order_by('pk')
+        for option, lookup in [('since', 'gte'), ('until', 'lt')]:
+            if options[option]:
+                queryset = queryset.filter(**{f'{export["date_field"]}__{lookup}': self._day(options[option])})
+
+        lines = export_lines(queryset, options['table'], options['format'])
+        if options['output']:
+            with open(options['output'], 'w', newline='', encoding='utf-8') as file:
+                count = 0
+                for count, line in enumerate(lines, start=1):
+                    file.write(line)
+            rows = count - 1 if options['format'] == 'csv' else count
+            self.stderr.write(self.style.SUCCESS(f'{rows} rows exported to {options["output"]}'))
+        else:
+            for line in lines:
+                self.stdout.write(line, ending='')
+
+    @staticmethod
+    def _day(value) -> datetime:
+        day = parse_date(value) if value else None
+        if day is None:
+            raise CommandError(f'"{value}" is not a date, use YYYY-MM-DD')
+        return timezone.make_aware(datetime.combine(day, time.min))
@@ -0,0 +1,144 @@
+import os
+import csv
+import json
+import time
+from itertools import islice
+from concurrent.futures import ProcessPoolExecutor
+
+import django
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Case, When, Value
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+DB = settings.PROJECT_MAIN_APPS['auctions']['db']['name']
+USER_FIELDS = ('username', 'email', 'first_name', 'last_name')
+
+
+def read_rows(path, fmt):
+    """ Streams the user records from a CSV file with a header or from a JSONL file. """
+    with open(path, newline='', encoding='utf-8') as file:
+        if fmt == 'csv':
+            yield from csv.DictReader(file)
+        else:
+            for line in file:
+                if line.strip():
+                    yield json.loads(line)
+
+
+def parse_date_joined(value):
+    """ An ISO date and time, naive ones are in the current time zone; empty is now. """
+    if not value:
+        return timezone.now()
+    date = parse_datetime(value.strip())
+    if date is None:
+        raise CommandError(f'bad date_joined "{value}"')
+    return timezone.make_aware(date) if timezone.is_naive(date) else date
+
+
+def chunked(iterable, size):
+    iterator = iter(iterable)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
+
+class Command(BaseCommand):
+    help = 'Imports users from a CSV or JSONL file (username, password, email, first_name, ' \
+           'last_name, date_joined) with their auctions profiles, in batches. ' \
+           'Users that already exist are skipped, so an interrupted import can be run again.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='a .csv file with a header or a .jsonl file')
+        parser.add_argument('--format', choices=['csv', 'jsonl'],
+                            help='by default taken from the file extension')
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--workers', type=int, default=os.cpu_count(),
+                            help='processes hashing the passwords, 1 to hash in this process')
+
+    def handle(self, *args, **options):
+        fmt = options['format'] or os.path.splitext(options['path'])[1].lstrip('.').lower()
+        if fmt not in ('csv', 'jsonl'):
+            raise CommandError(f'unknown file format "{fmt}", use --format')
+        if not os.path.isfile(options['path']):
+            raise CommandError(f'no such file "{options["path"]}"')
+
+        self.created = self.skipped = self.profiles = 0
+        start = time.perf_counter()
+        # the workers set Django up themselves, they may be spawned rather than forked
+        pool = ProcessPoolExecutor(options['workers'], initializer=django.setup) \
+            if options['workers'] > 1 else None
+        try:
+            rows = read_rows(options['path'], fmt)
+            for number, chunk in enumerate(chunked(rows, options['batch_size']), start=1):
+                self._import_chunk(chunk, pool)
+                if options['verbosity'] > 1:
+                    self.stdout.write(f'batch {number}: {self.created} created, {self.skipped} skipped')
+        finally:
+            if pool is not None:
+                pool.shutdown()
+
+        seconds = time.perf_counter() - start
+        rate = self.created / seconds if seconds else 0.0
+        self.stdout.write(self.style.SUCCESS(
+            f'{self.created} users imported, {self.skipped} skipped, '
+            f'{self.profiles} profiles created in {seconds:.1f}s ({rate:.1f} users/s)'
+        ))
+
+    def _import_chunk(self, chunk, pool):
+        from django.contrib.auth.models import User
+        records = {}
+        for row in chunk:
+            username = (row.get('username') or '').strip()
+            if username and username not in records:
+                records[username] = row
+        self.skipped += len(chunk) - len(records)
+
+        existing = set(User.objects.filter(username__in=records).values_list('username', flat=True))
+        self.skipped += len(existing)
+        new = [row for username, row in records.items() if username not in existing]
+        if new:
+            passwords = [row.get('password') or None for row in new]
+            if pool is None:
+                hashes = list(map(make_password, passwords))
+            else:
+                hashes = list(pool.map(make_password, passwords, chunksize=max(1, len(new) // 16)))
+            users = [
+                User(password=hashed, date_joined=parse_date_joined(row.get('date_joined')),
+                     **{field: (row.get(field) or '').strip() for field in USER_FIELDS})
+                for row, hashed in zip(new, hashes)
+            ]
+            with transaction.atomic('default'):
+                User.objects.bulk_create(users)
+            self.created += len(users)
+
+        # profiles for every user of the chunk, also those left without one by an interrupted run
+        self.profiles += self._create_profiles(
+            User.objects.filter(username__in=records).values_list('pk', 'username', 'date_joined')
+        )
+
+    @staticmethod
+    def _create_profiles(users) -> int:
+        from auctions.models import Profile, Log
+        users = {pk: (username, date_joined) for pk, username, date_joined in users}
+        with transaction.atomic(DB):
+            have_profile = set(
+                Profile.manager.filter(user_model_pk__in=users).values_list('user_model_pk', flat=True)
+            )
+            profiles = [
+                Profile(username=username, user_model_pk=pk)
+                for pk, (username, _) in users.items() if pk not in have_profile
+            ]
+            if not profiles:
+                return 0
+            Profile.manager.bulk_create(profiles)
+            created = dict(Profile.manager.filter(user_model_pk__in=[p.user_model_pk for p in profiles])
+                           .values_list('pk', 'user_model_pk'))
+            Log.manager.bulk_create([Log(event=Log.REGISTRATION, profile_id=pk) for pk in created])
+            # Log.date is auto_now, the registrations are dated when the users joined
+            Log.manager.filter(event=Log.REGISTRATION, profile__in=created).update(date=Case(
+                *[When(profile=pk, then=Value(users[user_pk][1])) for pk, user_pk in created.items()]
+            ))
+        return len(profiles)
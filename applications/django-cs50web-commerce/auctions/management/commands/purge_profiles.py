@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from auctions.models import Profile, PURGE_CHUNK_SIZE
+
+
+class Command(BaseCommand):
+    help = 'Purges the profiles of the deleted users, run it regularly, e.g. from cron. ' \
+           'A profile stays marked deleted until it is purged, an interrupted run is resumed by the next.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=PURGE_CHUNK_SIZE,
+                            help='rows deleted per transaction')
+
+    def handle(self, *args, **options):
+        purged = 0
+        for profile in Profile.manager.filter(is_deleted=True).order_by('pk'):
+            profile.purge(chunk_size=options['chunk_size'])
+            purged += 1
+        self.stdout.write(self.style.SUCCESS(f'{purged} profiles purged'))
@@ -0,0 +1,16 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auctions', '0016_alter_bid_options_alter_listing_potential_buyers'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='profile',
+            name='is_deleted',
+            field=models.BooleanField(db_index=True, default=False, verbose_name='deleted, waiting for the purge'),
+        ),
+    ]
@@ -0,0 +1,28 @@
+from django.db import migrations, models
+import django.db.models.manager
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auctions', '0017_profile_is_deleted'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SyncCursor',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, unique=True)),
+                ('position', models.IntegerField(default=0)),
+            ],
+            options={
+                'verbose_name': 'sync cursor',
+                'verbose_name_plural': 'sync cursors',
+                'db_table': 'auctions_sync_cursor',
+            },
+            managers=[
+                ('manager', django.db.models.manager.Manager()),
+            ],
+        ),
+    ]
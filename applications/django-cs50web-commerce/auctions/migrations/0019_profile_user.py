@@ -0,0 +1,18 @@
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('auctions', '0018_synccursor'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='profile',
+            name='user',
+            field=models.ForeignObject(blank=True, from_fields=('user_model_pk',), null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='auth.user', to_fields=('id',)),
+        ),
+    ]
@@ -0,0 +1,147 @@
+import re
+
+from django.db import migrations, models
+from django.db.models import Q
+import django.db.models.deletion
+
+""" The messages of the old rows are parsed back into the events,
+    those that do not parse are kept as they were, as the LEGACY event.
+    A copy of the messages as they were, the migrations should not depend on the models. """
+MESSAGES = {
+    1: ('Date of your registration.', []),
+    2: ('Wallet topped up with %0.2f coins.', ['amount']),
+    3: ('The item [%s] has been added to your listings.', ['title']),
+    4: ('You have created an auction — [%s].', ['title']),
+    5: ('Made a bid on [%s]. Value — %0.2f.', ['title', 'amount']),
+    6: ('You have withdrawn [%s] from the auction.', ['title']),
+    7: ('The owner removed the lot [%s] from the auction. Refund %0.2f coins.', ['title', 'amount']),
+    8: ('You lost the auction — [%s]. Refund %0.2f coins.', ['title', 'amount']),
+    9: ('The listing [%s] has been taken into possession. Price — %0.2f.', ['title', 'amount']),
+    10: ('You closed the auction — [%s]. The winner is %s.', ['title', 'counterparty']),
+}
+LEGACY = 11
+PLACEHOLDER = re.compile(r'%0\.2f|%s')
+
+
+def _pattern(template):
+    """ The full message, and the one cut off at the 100 characters of the old field. """
+    parts = PLACEHOLDER.split(template)
+    groups = [r'(-?\d+(?:\.\d+)?)' if p == '%0.2f' else '(.*)' for p in PLACEHOLDER.findall(template)]
+    full = ''.join(re.escape(part) + (groups[i] if i < len(groups) else '') for i, part in enumerate(parts))
+    return re.compile(full + '$'), parts[0]
+
+
+PATTERNS = {event: _pattern(template) for event, (template, _) in MESSAGES.items()}
+
+
+def parse(entry) -> (int, dict):
+    """ The event of an old message and the values it was filled with,
+        (LEGACY, {}) if it is not one of the MESSAGES. """
+    for event, (pattern, prefix) in PATTERNS.items():
+        match = pattern.match(entry)
+        if match:
+            return event, dict(zip(MESSAGES[event][1], match.groups()))
+        if prefix and entry.startswith(prefix):
+            # cut off, only the title is left, maybe cut off too
+            return event, {'title': entry[len(prefix):].split('] ')[0]}
+    return LEGACY, {}
+
+
+def find_listing(listings, profile_id, counterparty_id, title):
+    """ The listing of the message among those of the profile, of the buyer of its item,
+        with the bids or in the watchlist of the profile; None unless exactly one matches. """
+    connected = listings.filter(
+        Q(owner__in=[profile_id, counterparty_id]) |
+        Q(bid__auctioneer=profile_id) | Q(watchlist__profile=profile_id)
+    ).distinct()
+    for lookup in ('title', 'title__startswith'):
+        found = list(connected.filter(**{lookup: title}).values_list('pk', flat=True)[:2])
+        if found:
+            return found[0] if len(found) == 1 else None
+    return None
+
+
+def parse_entries(apps, schema_editor):
+    Log = apps.get_model('auctions', 'Log')
+    Listing = apps.get_model('auctions', 'Listing')
+    Profile = apps.get_model('auctions', 'Profile')
+    db = schema_editor.connection.alias
+    listings = Listing._default_manager.using(db)
+
+    for log in Log._default_manager.using(db).iterator():
+        event, values = parse(log.entry)
+        log.event = event
+        if event == LEGACY:
+            # kept as it was, entry and all
+            log.save(update_fields=['event'])
+            continue
+
+        log.entry = ''
+        if values.get('amount'):
+            log.amount = float(values['amount'])
+        if values.get('counterparty'):
+            log.counterparty = Profile._default_manager.using(db).filter(username=values['counterparty']).first()
+        if values.get('title'):
+            log.listing_id = find_listing(listings, log.profile_id, log.counterparty_id, values['title'])
+        log.save(update_fields=['event', 'entry', 'amount', 'listing', 'counterparty'])
+
+
+def render_entries(apps, schema_editor):
+    Log = apps.get_model('auctions', 'Log')
+    db = schema_editor.connection.alias
+    for log in Log._default_manager.using(db).select_related('listing', 'counterparty').iterator():
+        if log.event == LEGACY:
+            continue
+        template, args = MESSAGES[log.event]
+        values = {
+            'title': log.listing.title if log.listing else 'deleted',
+            'counterparty': log.counterparty.username if log.counterparty else 'deleted',
+            'amount': log.amount or 0,
+        }
+        log.entry = (template % tuple(values[arg] for arg in args))[:100]
+        log.save(update_fields=['entry'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auctions', '0019_profile_user'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='log',
+            name='event',
+            field=models.PositiveSmallIntegerField(null=True, choices=[(1, 'registration'), (2, 'money added'), (3, 'new listing'), (4, 'lot published'), (5, 'new bid'), (6, 'lot withdrawn'), (7, 'lot removed by the owner'), (8, 'auction lost'), (9, 'auction won'), (10, 'item sold'), (11, 'legacy entry')]),
+        ),
+        migrations.AddField(
+            model_name='log',
+            name='listing',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='auctions.listing'),
+        ),
+        migrations.AddField(
+            model_name='log',
+            name='counterparty',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='auctions.profile'),
+        ),
+        migrations.AddField(
+            model_name='log',
+            name='amount',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name='log',
+            name='entry',
+            field=models.CharField('legacy message', max_length=100, blank=True),
+        ),
+        migrations.RunPython(parse_entries, render_entries),
+        migrations.AlterField(
+            model_name='log',
+            name='event',
+            field=models.PositiveSmallIntegerField(choices=[(1, 'registration'), (2, 'money added'), (3, 'new listing'), (4, 'lot published'), (5, 'new bid'), (6, 'lot withdrawn'), (7, 'lot removed by the owner'), (8, 'auction lost'), (9, 'auction won'), (10, 'item sold'), (11, 'legacy entry')]),
+        ),
+        migrations.AddIndex(
+            model_name='log',
+            index=models.Index(fields=['event', '-date'], name='auctions_logs_event_idx'),
+        ),
+    ]
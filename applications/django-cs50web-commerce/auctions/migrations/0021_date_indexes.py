@@ -0,0 +1,22 @@
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auctions', '0020_log_event'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='bid',
+            name='bid_date',
+            field=models.DateTimeField(db_index=True, default=django.utils.timezone.localtime, verbose_name='date'),
+        ),
+        migrations.AlterField(
+            model_name='log',
+            name='date',
+            field=models.DateTimeField(auto_now=True, db_index=True),
+        ),
+    ]
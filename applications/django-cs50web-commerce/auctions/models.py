@@ -1,32 +1,52 @@
+import math
 import logging
+from datetime import datetime, timedelta
 from pathlib import Path
 
+from django.conf import settings
 from django.contrib import admin
+from django.core.cache import cache
 from django.utils import timezone
 from django.urls import reverse, reverse_lazy
 from django.utils.text import slugify
-from django.core.exceptions import ObjectDoesNotExist
-from django.db import models, transaction
+from django.core.exceptions import ObjectDoesNotExist, SuspiciousFileOperation
+from django.db import models, connections, router, transaction
+from django.dispatch import Signal
 from django.db.models import (
     Model, CharField, TextField,
     SlugField, FloatField, ImageField,
     DateTimeField, BooleanField,
-    ForeignKey, ManyToManyField,
-    IntegerField, Sum, F
+    ForeignKey, ForeignObject, ManyToManyField,
+    IntegerField, PositiveSmallIntegerField,
+    Sum, Max, Q, F,
+    Case, When, Value,
+    OuterRef, Subquery
 )
 from core.utils import unique_slugify
+from core.db import retry_on_lock
+from core.metrics import Counter
 
 logger = logging.getLogger(__name__)
 
 
 class LowOnMoney(Exception): pass
 
+DB = settings.PROJECT_MAIN_APPS['auctions']['db']['name']
+
 NEW_BID_PERCENT = 1+5/100
 
 SLUG_MAX_LEN = 16
 USERNAME_MAX_LEN = 150
 LOT_TITLE_MAX_LEN = 300
 DEFAULT_STARTING_PRICE = 1
+PURGE_CHUNK_SIZE = 100
+CREDIT_BATCH_SIZE = 400
+COMMENTS_PER_PAGE = 10
+BIDS_PER_PAGE = 50
+COMMENTS_COUNT_CACHE_KEY = 'auctions:comments-count:%s'
+COMMENTS_COUNT_CACHE_TIMEOUT = 5 * 60
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+DELETED_USERNAME = '~deleted-%s'
 
 NO_BID_NOT_PUBLISHED = 'Listing is not published'
 NO_BID_THE_OWNER = 'You are the owner'
@@ -44,21 +64,23 @@ LOG_WITHDRAWN = 'You have withdrawn [%s] from the auction.'
 LOG_YOU_LOSE = 'You lost the auction — [%s]. Refund %0.2f coins.'
 LOG_OWNER_REMOVED = 'The owner removed the lot [%s] from the auction. Refund %0.2f coins.'
 LOG_ITEM_SOLD = 'You closed the auction — [%s]. The winner is %s.'
+LOG_GONE = 'deleted'
+
+
+def log_entry(profile, event, listing=None, counterparty=None, coins=None):
+    """ The message itself is rendered when displayed, see Log.message. """
+    profile.logs.create(event=event, listing=listing, counterparty=counterparty, amount=coins)
+
 
+BIDS_PLACED = Counter('auctions_bids_placed_total', 'Bids placed on the lots.')
+AUCTIONS_CLOSED = Counter('auctions_closed_total', 'Auctions closed, the lots sold to the highest bids.')
+REFUNDS = Counter('auctions_refunds_total', 'Bids refunded to the auctioneers.')
+REFUNDED_COINS = Counter('auctions_refunded_coins_total', 'Coins refunded to the auctioneers.')
 
-def log_entry(profile, msg, listing='None', user='None', coins=0):
-    case = {
-        'money_added': LOG_MONEY_ADDED % coins,
-        'new_item': LOG_NEW_LISTING % listing,
-        'published': LOG_LOT_PUBLISHED % listing,
-        'withdrawn': LOG_WITHDRAWN % listing,
-        'removed': LOG_OWNER_REMOVED % (listing, coins),
-        'sold': LOG_ITEM_SOLD % (listing, user),
-        'you_won': LOG_YOU_WON % (listing, coins),
-        'you_lose': LOG_YOU_LOSE % (listing, coins),
-        'bid': LOG_NEW_BID % (listing, coins),
-    }[msg]
-    profile.logs.create(entry=case)
+
+def count_on_commit(counter, amount=1):
+    """ The business metrics count only what is committed. """
+    transaction.on_commit(lambda: counter.inc(amount), using=DB)
 
 
 def user_media_path(listing=None, filename=None, slug=None) -> Path:
@@ -69,12 +91,93 @@ def user_media_path(listing=None, filename=None, slug=None) -> Path:
     return Path('auctions', 'listings', f'{date}__{slug}', f'{filename}')
 
 
+""" Sent with the new balance by the wallet operations, they are not saves of the profile. """
+money_changed = Signal()
+
+
+class ProfileManager(models.Manager):
+    """ The wallet operations, each is one statement that returns the new balance. """
+
+    def credit(self, pk, amount:float) -> float:
+        balance = self._update_money(pk, round(amount, 2))
+        if balance is None:
+            raise self.model.DoesNotExist
+        return balance
+
+    def credit_many(self, totals:dict, batch_size=CREDIT_BATCH_SIZE) -> dict:
+        """ credit() for many profiles, {pk: amount}: an UPDATE and a SELECT per batch.
+            Returns the new balances, {pk: balance}. """
+        balances = {}
+        totals = list(totals.items())
+        for i in range(0, len(totals), batch_size):
+            batch = dict(totals[i:i+batch_size])
+            amount = Case(*[When(pk=pk, then=Value(round(total, 2))) for pk, total in batch.items()],
+                          output_field=FloatField())
+            self.filter(pk__in=batch).update(money=F('money') + amount)
+            balances.update(self.filter(pk__in=batch).values_list('pk', 'money'))
+        for pk, balance in balances.items():
+            money_changed.send(sender=self.model, pk=pk, balance=balance)
+        return balances
+
+    def debit(self, pk, amount:float) -> (float, LowOnMoney):
+        """ The money is checked by the same statement, so it never goes below zero. """
+        amount = round(amount, 2)
+        balance = self._update_money(pk, -amount, minimum=amount)
+        if balance is None:
+            raise LowOnMoney
+        return balance
+
+    @retry_on_lock(DB)
+    def _update_money(self, pk, delta, minimum=None):
+        """ UPDATE ... RETURNING, None when no row matches.
+            It does not raise, a failed query would break the transaction of the caller. """
+        db = router.db_for_write(self.model)
+        connection = connections[db]
+        quote = connection.ops.quote_name
+        opts = self.model._meta
+        money = quote(opts.get_field('money').column)
+        sql = f'UPDATE {quote(opts.db_table)} SET {money} = {money} + %s WHERE {quote(opts.pk.column)} = %s'
+        params = [delta, pk]
+        if minimum is not None:
+            sql += f' AND {money} >= %s'
+            params.append(minimum)
+        with connection.cursor() as cursor:
+            if can_return_from_update(connection):
+                cursor.execute(f'{sql} RETURNING {money}', params)
+                row = cursor.fetchone()
+            else:
+                # the same transaction, no other write can come in between
+                cursor.execute(sql, params)
+                row = None
+                if cursor.rowcount:
+                    cursor.execute(f'SELECT {money} FROM {quote(opts.db_table)} '
+                                   f'WHERE {quote(opts.pk.column)} = %s', [pk])
+                    row = cursor.fetchone()
+        if row is None:
+            return None
+        money_changed.send(sender=self.model, pk=pk, balance=row[0])
+        return row[0]
+
+
+def can_return_from_update(connection) -> bool:
+    """ UPDATE ... RETURNING came with SQLite 3.35. """
+    if connection.vendor == 'sqlite':
+        return connection.Database.sqlite_version_info >= (3, 35)
+    return connection.vendor == 'postgresql'
+
+
 class Profile(Model):
-    manager = models.Manager()
+    manager = ProfileManager()
 
     user_model_pk = IntegerField('user.pk', unique=True, blank=True, null=True)
     username = CharField(max_length=USERNAME_MAX_LEN, unique=True, db_index=True)
     money = FloatField('money on account', default=0.0)
+    is_deleted = BooleanField('deleted, waiting for the purge', default=False, db_index=True)
+    # no column of its own, the user is looked up by the user_model_pk;
+    # select_related('user') works only with alpaca.presets.SINGLE_DATABASE
+    user = ForeignObject(settings.AUTH_USER_MODEL, on_delete=models.DO_NOTHING,
+                         from_fields=['user_model_pk'], to_fields=['id'],
+                         null=True, blank=True, related_name='+')
 
     class Meta:
         """
@@ -91,30 +194,68 @@ class Profile(Model):
     def get_absolute_url(self):
         return reverse('auctions:profile', args=[self.pk])
 
+    @retry_on_lock(DB)
     def save(self, date_joined=None, log=False, update_fields=None, *args, **kwargs):
         if not self.pk:
             log = True
-        with transaction.atomic('auctions_db', savepoint=False):
-            super().save(*args, update_fields=update_fields, **kwargs)
-            if log is True:
-                date = date_joined if date_joined else timezone.localtime()
-                self.logs.create(entry=LOG_REGISTRATION, date=date)
-
-    def add_money(self, amount:float, silent=False):
-        with transaction.atomic('auctions_db', savepoint=False):
-            self.money = F('money') + round(amount, 2)
-            self.save(update_fields=['money'])
-            if silent is False:
-                log_entry(self, 'money_added', coins=amount)
+        super().save(*args, update_fields=update_fields, **kwargs)
+        if log is True:
+            date = date_joined if date_joined else timezone.localtime()
+            self.logs.create(event=Log.REGISTRATION, date=date)
+
+    @retry_on_lock(DB)
+    def add_money(self, amount:float, silent=False) -> float:
+        """ Returns the new balance, self.money is up to date. """
+        self.money = Profile.manager.credit(self.pk, amount)
+        if silent is False:
+            log_entry(self, Log.MONEY_ADDED, coins=amount)
+        return self.money
 
     def get_money(self, value:float) -> (float, LowOnMoney):
         value = round(value, 2)
-        if self.money >= value:
-            self.money = F('money') - value
-            self.save(update_fields=['money'])
-            return value
-        else:
-            raise LowOnMoney
+        self.money = Profile.manager.debit(self.pk, value)
+        return value
+
+    @retry_on_lock(DB)
+    def mark_deleted(self):
+        """ The quick part of the deletion, done along with the user.
+            Frees the username, withdraws the listings from the auction, refunding the bids
+            of the others, and takes the bids of the profile out of it; the rest is up to purge(). """
+        from .bulk import withdraw_lots
+        self.is_deleted = True
+        self.username = DELETED_USERNAME % self.pk
+        self.user_model_pk = None
+        super().save(update_fields=['is_deleted', 'username', 'user_model_pk'])
+        withdraw_lots(self.lots_owned.filter(is_active=True).values_list('pk', flat=True))
+        lots = set(self.bid_set.values_list('lot', flat=True))
+        self.bid_set.all().delete()
+        _update_highest_bids(lots)
+
+    def purge(self, chunk_size=PURGE_CHUNK_SIZE):
+        """ Deletes the profile and everything that depends on it, a chunk per transaction,
+            so the database is never locked for long. Done by the purge_profiles command. """
+        for lots in _chunks(self.lots_owned.all(), chunk_size):
+            for image in self._purge_listings(lots):
+                _delete_file(image)
+        for comments in _chunks(self.comment_set.all(), chunk_size):
+            _update_chunk(Comment, comments, author=None)
+        for model in (Watchlist, Log):
+            for rows in _chunks(model.manager.filter(profile=self), chunk_size):
+                _delete_chunk(model, rows)
+        _delete_chunk(Profile, [self.pk])
+        logger.info(f'AUCTIONS APP: the profile #{self.pk} purged')
+
+    @staticmethod
+    @retry_on_lock(DB)
+    def _purge_listings(pks) -> list:
+        """ The bids of the others on the listings are refunded.
+            Returns the images, to delete them once the transaction is over. """
+        listings = list(Listing.manager.filter(pk__in=pks))
+        for listing in listings:
+            for bid in listing.bid_set.select_related('auctioneer'):
+                bid.delete(refund=True)
+        Listing.manager.filter(pk__in=pks).delete()
+        return [listing.image for listing in listings]
 
     def display_money(self) -> (float, float):
         """ Returns current money + in all the bids. """
@@ -124,35 +265,128 @@ class Profile(Model):
             bids_total = result['bid_value__sum']
         return self.money, bids_total
 
-    @admin.display(description='items owned')
-    def items_owned_count(self):
-        return self.lots_owned.count()
+    def __str__(self): return self.username
 
-    @admin.display(description='comments')
-    def comments_written_count(self):
-        return self.comment_set.count()
 
-    @admin.display(description='placed bids')
-    def placed_bids_count(self):
-        return self.bid_set.count()
+def _chunks(queryset, size):
+    """ Primary keys of the queryset in lists of the given size, until it is empty.
+        The caller must remove the rows of each chunk from the queryset. """
+    while pks := list(queryset.order_by('pk').values_list('pk', flat=True)[:size]):
+        yield pks
+
+
+def _update_highest_bids(lots):
+    """ The highest bids of the active lots, recalculated after some bids were deleted. """
+    highest = Bid.manager.filter(lot=OuterRef('pk')).values('lot').annotate(top=Max('bid_value'))
+    Listing.manager.filter(pk__in=lots, is_active=True)\
+        .update(highest_bid=Subquery(highest.values('top')))
+
+
+def _delete_file(file):
+    try:
+        file.delete(save=False)
+    except (OSError, SuspiciousFileOperation) as exc:
+        logger.warning(f'AUCTIONS APP: the file [{file.name}] was not deleted: {exc}')
+
+
+@retry_on_lock(DB)
+def _delete_chunk(model, pks):
+    model.manager.filter(pk__in=pks).delete()
 
-    def __str__(self): return self.username
+
+@retry_on_lock(DB)
+def _update_chunk(model, pks, **values):
+    model.manager.filter(pk__in=pks).update(**values)
 
 
 class Log(Model):
+    """ An event in the history of a profile, the message is rendered when displayed. """
+    REGISTRATION = 1
+    MONEY_ADDED = 2
+    NEW_LISTING = 3
+    PUBLISHED = 4
+    NEW_BID = 5
+    WITHDRAWN = 6
+    OWNER_REMOVED = 7
+    YOU_LOSE = 8
+    YOU_WON = 9
+    ITEM_SOLD = 10
+    LEGACY = 11
+    EVENTS = [
+        (REGISTRATION, 'registration'), (MONEY_ADDED, 'money added'),
+        (NEW_LISTING, 'new listing'), (PUBLISHED, 'lot published'),
+        (NEW_BID, 'new bid'), (WITHDRAWN, 'lot withdrawn'),
+        (OWNER_REMOVED, 'lot removed by the owner'), (YOU_LOSE, 'auction lost'),
+        (YOU_WON, 'auction won'), (ITEM_SOLD, 'item sold'),
+        (LEGACY, 'legacy entry'),
+    ]
+    # the message and what it is filled with
+    MESSAGES = {
+        REGISTRATION: (LOG_REGISTRATION, []),
+        MONEY_ADDED: (LOG_MONEY_ADDED, ['amount']),
+        NEW_LISTING: (LOG_NEW_LISTING, ['title']),
+        PUBLISHED: (LOG_LOT_PUBLISHED, ['title']),
+        NEW_BID: (LOG_NEW_BID, ['title', 'amount']),
+        WITHDRAWN: (LOG_WITHDRAWN, ['title']),
+        OWNER_REMOVED: (LOG_OWNER_REMOVED, ['title', 'amount']),
+        YOU_LOSE: (LOG_YOU_LOSE, ['title', 'amount']),
+        YOU_WON: (LOG_YOU_WON, ['title', 'amount']),
+        ITEM_SOLD: (LOG_ITEM_SOLD, ['title', 'counterparty']),
+        LEGACY: ('%s', ['entry']),
+    }
+
     manager = models.Manager()
 
-    entry = CharField(max_length=100)
-    date = DateTimeField(auto_now=True)
+    event = PositiveSmallIntegerField(choices=EVENTS)
+    date = DateTimeField(auto_now=True, db_index=True)
     profile = ForeignKey(Profile, on_delete=models.CASCADE, related_name='logs')
+    listing = ForeignKey('Listing', null=True, blank=True, on_delete=models.SET_NULL, related_name='+')
+    counterparty = ForeignKey(Profile, null=True, blank=True, on_delete=models.SET_NULL, related_name='+')
+    amount = FloatField(null=True, blank=True)
+    # the old message, kept for the LEGACY rows that did not parse, see the migration 0020
+    entry = CharField('legacy message', max_length=100, blank=True)
 
     class Meta:
         db_table = 'auctions_logs'
         verbose_name = 'auctioneer log'
         verbose_name_plural = 'auctioneer logs'
         ordering = ['-date']
+        indexes = [
+            models.Index(fields=['event', '-date'], name='auctions_logs_event_idx'),
+        ]
+
+    @property
+    @admin.display(description='message')
+    def message(self) -> str:
+        """ Select the listing and the counterparty along with the logs. """
+        if self.event is None:
+            # a new one, e.g. the empty form of the admin inline
+            return ''
+        template, args = self.MESSAGES[self.event]
+        values = {
+            'title': self.listing.title if self.listing_id else LOG_GONE,
+            'counterparty': self.counterparty if self.counterparty_id else LOG_GONE,
+            'amount': self.amount or 0,
+            'entry': self.entry,
+        }
+        return template % tuple(values[arg] for arg in args)
+
+    def __str__(self): return self.message
+
+
+class SyncCursor(Model):
+    """ How far an outbox of another database has been applied here, see auctions.sync. """
+    manager = models.Manager()
+
+    name = CharField(max_length=100, unique=True)
+    position = IntegerField(default=0)
 
-    def __str__(self): return self.entry
+    class Meta:
+        db_table = 'auctions_sync_cursor'
+        verbose_name = 'sync cursor'
+        verbose_name_plural = 'sync cursors'
+
+    def __str__(self): return f'{self.name} at #{self.position}'
 
 
 class ListingCategory(Model):
@@ -167,10 +401,6 @@ class ListingCategory(Model):
         verbose_name_plural = 'categories'
         ordering = ['label']
 
-    @admin.display(description='items in category')
-    def items_in_category(self):
-        return self.listing_set.count()
-
     def __str__(self): return self.label
 
 
@@ -178,29 +408,30 @@ class Bid(Model):
     manager = models.Manager()
 
     bid_value = FloatField('value', db_index=True)
-    bid_date = DateTimeField('date', default=timezone.localtime)
+    bid_date = DateTimeField('date', default=timezone.localtime, db_index=True)
 
     auctioneer = ForeignKey(Profile, on_delete=models.CASCADE)
     lot = ForeignKey('Listing', on_delete=models.CASCADE)
 
+    @retry_on_lock(DB)
     def delete(self, refund=False, item_sold=False, **kwargs):
         if refund:
             self._refund(item_sold)
         return super().delete(**kwargs)
 
+    @retry_on_lock(DB)
     def _refund(self, item_sold):
         """ Returns the money back to the profile if
             the auction was lost or
             the owner withdrew the lot from the auction. """
-        with transaction.atomic('auctions_db', savepoint=False):
-            if item_sold is True:
-                log_entry(self.auctioneer, 'you_lose',
-                          self.lot.title, coins=self.bid_value)
-            else:
-                log_entry(self.auctioneer, 'removed',
-                          self.lot.title, coins=self.bid_value)
+        if item_sold is True:
+            log_entry(self.auctioneer, Log.YOU_LOSE, self.lot, coins=self.bid_value)
+        else:
+            log_entry(self.auctioneer, Log.OWNER_REMOVED, self.lot, coins=self.bid_value)
 
-            self.auctioneer.add_money(self.bid_value, silent=True)
+        self.auctioneer.add_money(self.bid_value, silent=True)
+        count_on_commit(REFUNDS)
+        count_on_commit(REFUNDED_COINS, self.bid_value)
 
     class Meta:
         """ profiles >-- bid --< listings """
@@ -209,6 +440,14 @@ class Bid(Model):
         verbose_name_plural = 'placed bids'
         ordering = ['-bid_date']
         get_latest_by = ['bid_value']
+        indexes = [
+            models.Index(fields=['lot', 'bid_value']),
+        ]
+
+    @property
+    def cursor(self) -> str:
+        """ The position of the bid in the lot's bid history, see get_bids_page. """
+        return encode_cursor(self.bid_value, self.pk)
 
     def __str__(self):
         return f'{self.auctioneer} >-- bid --< {self.lot}'
@@ -267,28 +506,31 @@ class Listing(Model):
         else:
             return reverse_lazy('auctions:listing', args=[self.slug])
 
+    @retry_on_lock(DB)
     def save(self, *args, **kwargs):
         """ Auto get a unique slug and
             add a new listing to owner's watchlist. """
-        with transaction.atomic('auctions_db', savepoint=False):
-            if not self.pk:
-                if self.slug:
-                    s = str(self.slug)
-                else:
-                    s = slugify(self.title)
-                unique_slugify(self, s)
+        created = not self.pk
+        if created:
+            if self.slug:
+                s = str(self.slug)
+            else:
+                s = slugify(self.title)
+            unique_slugify(self, s)
 
-                log_entry(self.owner, 'new_item', self.title)
+        super().save(*args, **kwargs)
 
-            super().save(*args, **kwargs)
+        if created:
+            log_entry(self.owner, Log.NEW_LISTING, self)
 
-            if self.in_watchlist.contains(self.owner) is False:
-                self.in_watchlist.add(self.owner)
+        if self.in_watchlist.contains(self.owner) is False:
+            self.in_watchlist.add(self.owner)
 
+    @retry_on_lock(DB)
     def delete(self, **kwargs):
-        with transaction.atomic('auctions_db', savepoint=False):
-            self.image.delete()
-            return super().delete(**kwargs)
+        image = self.image
+        transaction.on_commit(lambda: _delete_file(image), using=DB)
+        return super().delete(**kwargs)
 
     def can_be_published(self) -> bool:
         if self.starting_price < 1 or self.is_active is True:
@@ -296,18 +538,19 @@ class Listing(Model):
         else:
             return True
 
+    @retry_on_lock(DB)
     def publish_the_lot(self) -> bool:
         """ Make the listing available on the auction. """
         if self.can_be_published() is False:
             return False
         else:
-            with transaction.atomic('auctions_db', savepoint=False):
-                self.date_published = timezone.localtime()
-                self.is_active = True
-                self.save()
-                log_entry(self.owner, 'published', self.title)
+            self.date_published = timezone.localtime()
+            self.is_active = True
+            self.save()
+            log_entry(self.owner, Log.PUBLISHED, self)
             return True
 
+    @retry_on_lock(DB)
     def withdraw(self, item_sold=False) -> bool:
         """ Get the listing back from the auction.
             Refund money back to the auctioneers and
@@ -315,23 +558,22 @@ class Listing(Model):
         if self.is_active is False:
             return False
 
-        with transaction.atomic('auctions_db', savepoint=False):
-            self.date_published = None
-            self.is_active = False
-            self.highest_bid = None
+        self.date_published = None
+        self.is_active = False
+        self.highest_bid = None
 
-            if item_sold is False:
-                log_entry(self.owner, 'withdrawn', self.title)
+        if item_sold is False:
+            log_entry(self.owner, Log.WITHDRAWN, self)
 
-            if self.potential_buyers.count() > 0:
-                for bid in self.bid_set.iterator():
-                    bid.delete(refund=True, item_sold=item_sold)
+        if self.potential_buyers.count() > 0:
+            for bid in self.bid_set.iterator():
+                bid.delete(refund=True, item_sold=item_sold)
 
-            if self.in_watchlist.count() > 1:
-                self.watchlist_set.exclude(profile=self.owner).delete()
+        if self.in_watchlist.count() > 1:
+            self.watchlist_set.exclude(profile=self.owner).delete()
 
-            self.save()
-            return True
+        self.save()
+        return True
 
     def can_unwatch(self, profile:Profile = None, username:str = None) -> bool:
         """ Can remove from watchlist if
@@ -344,6 +586,15 @@ class Listing(Model):
         else:
             return True
 
+    @retry_on_lock(DB)
+    def watch(self, profile:Profile) -> bool:
+        if self.in_watchlist.contains(profile):
+            return False
+        else:
+            self.in_watchlist.add(profile)
+            return True
+
+    @retry_on_lock(DB)
     def unwatch(self, profile:Profile = None, username:str = None) -> bool:
         """ Remove from watchlist if
             the user is not the owner or potential buyer of the lot. """
@@ -378,6 +629,7 @@ class Listing(Model):
                 auctioneer.money < self.starting_price:
             return NO_BID_NO_MONEY_SP
 
+    @retry_on_lock(DB)
     def make_a_bid(self, auctioneer:Profile, bid_value:float) -> bool:
         """ Also add the lot to user's watchlist. """
         if not isinstance(bid_value, (int, float)):
@@ -392,18 +644,19 @@ class Listing(Model):
         elif self.highest_bid and self.highest_bid * NEW_BID_PERCENT > bid_value:
             return False
 
-        with transaction.atomic('auctions_db', savepoint=False):
-            if not self.in_watchlist.contains(auctioneer):
-                self.in_watchlist.add(auctioneer)
+        if not self.in_watchlist.contains(auctioneer):
+            self.in_watchlist.add(auctioneer)
 
-            money = auctioneer.get_money(bid_value)
-            auctioneer.placed_bids.add(self, through_defaults={'bid_value': money})
-            self.highest_bid = money
-            self.save()
+        money = auctioneer.get_money(bid_value)
+        auctioneer.placed_bids.add(self, through_defaults={'bid_value': money})
+        self.highest_bid = money
+        self.save()
 
-            log_entry(auctioneer, 'bid', self.title, coins=money)
-            return True
+        log_entry(auctioneer, Log.NEW_BID, self, coins=money)
+        count_on_commit(BIDS_PLACED)
+        return True
 
+    @retry_on_lock(DB)
     def change_the_owner(self) -> bool:
         """ Transfer the money to the owner form the auctioneer that offers the highest bid,
             transfer the lot to its new owner,
@@ -415,18 +668,19 @@ class Listing(Model):
         new_owner = highest_bid.auctioneer
         money = highest_bid.bid_value
 
-        with transaction.atomic('auctions_db', savepoint=False):
-            log_entry(self.owner, 'sold', self.title, new_owner)
-            self.owner.add_money(money)
-            highest_bid.delete()
+        log_entry(self.owner, Log.ITEM_SOLD, self, new_owner)
+        self.owner.add_money(money)
+        highest_bid.delete()
 
-            self.save_new_owner(new_owner)
-            self.starting_price = DEFAULT_STARTING_PRICE
-            self.withdraw(item_sold=True)
+        self.save_new_owner(new_owner)
+        self.starting_price = DEFAULT_STARTING_PRICE
+        self.withdraw(item_sold=True)
 
-            log_entry(self.owner, 'you_won', self.title, coins=money)
-            return True
+        log_entry(self.owner, Log.YOU_WON, self, coins=money)
+        count_on_commit(AUCTIONS_CLOSED)
+        return True
 
+    @retry_on_lock(DB)
     def save_new_owner(self, new_owner):
         self.owner = new_owner
         super().save(update_fields=['owner'])
@@ -441,6 +695,20 @@ class Listing(Model):
         else:
             return 0.0
 
+    def latest_comments(self, limit=COMMENTS_PER_PAGE) -> list:
+        """ LIMIT in the query, over the (listing, -pub_date) index. """
+        return list(self.comment_set.select_related('author')[:limit])
+
+    def comments_count(self) -> int:
+        """ Cached in the cache shared by the workers, dropped by the comment signals once the change
+            is committed. The timeout bounds a count cached by a reader that raced the commit. """
+        key = COMMENTS_COUNT_CACHE_KEY % self.pk
+        count = cache.get(key)
+        if count is None:
+            count = self.comment_set.count()
+            cache.set(key, count, COMMENTS_COUNT_CACHE_TIMEOUT)
+        return count
+
     def get_highest_bid_entry(self) -> Bid or None:
         try:
             highest_bid = self.bid_set.latest()
@@ -466,6 +734,73 @@ class Comment(Model):
         db_table = 'auctions_comment'
         verbose_name = 'comment'
         verbose_name_plural = 'comments'
-        ordering = ['-pub_date']
+        ordering = ['-pub_date', '-pk']
+        indexes = [
+            models.Index(fields=['listing', '-pub_date']),
+        ]
+
+    @property
+    def cursor(self) -> str:
+        """ The position of the comment in the listing's comments, see get_comments_page. """
+        return encode_cursor((self.pub_date - EPOCH) // timedelta(microseconds=1), self.pk)
 
     def __str__(self): return f'comment #{self.pk}'
+
+
+def encode_cursor(value, pk) -> str:
+    """ The position of a row in a keyset page, (the ordering value, pk). """
+    return f'{value!r}_{pk}'
+
+
+def parse_cursor(cursor, to_value=float) -> tuple or None:
+    """ The (value, pk) of encode_cursor, None for the first page.
+        The cursor comes from the query string: a malformed, non-finite or out of range one
+        is the first page too. """
+    if not cursor:
+        return None
+    value, _, pk = cursor.rpartition('_')
+    try:
+        if not math.isfinite(float(value)):
+            return None
+        return to_value(value), int(pk)
+    except (ValueError, OverflowError):
+        return None
+
+
+def _comment_date(microseconds:str) -> datetime:
+    return EPOCH + timedelta(microseconds=int(microseconds))
+
+
+def get_comments_page(listing, cursor=None, per_page=COMMENTS_PER_PAGE) -> (list, str or None):
+    """ The comments older than the cursor, newest first, and the cursor of the next page.
+        The position is (pub_date, pk), so no page reads or counts the comments before it. """
+    comments = listing.comment_set.select_related('author')
+    position = parse_cursor(cursor, _comment_date)
+    if position is not None:
+        date, pk = position
+        comments = comments.filter(Q(pub_date__lt=date) | Q(pub_date=date, pk__lt=pk))
+    comments = list(comments[:per_page + 1])
+    if len(comments) > per_page:
+        return comments[:per_page], comments[per_page - 1].cursor
+    return comments, None
+
+
+def get_bids_page(listing, cursor=None, per_page=BIDS_PER_PAGE) -> (list, str or None):
+    """ The bids below the cursor, highest first, and the cursor of the next page.
+        The position is (bid_value, pk), over the (lot, bid_value) index;
+        only the shown columns are read, the auctioneers joined. """
+    bids = listing.bid_set.select_related('auctioneer')\
+        .only('bid_value', 'bid_date', 'lot', 'auctioneer__username')\
+        .order_by('-bid_value', 'pk')
+    position = parse_cursor(cursor)
+    if position is not None:
+        value, pk = position
+        bids = bids.filter(Q(bid_value__lt=value) | Q(bid_value=value, pk__gt=pk))
+    bids = list(bids[:per_page + 1])
+    if len(bids) > per_page:
+        return bids[:per_page], bids[per_page - 1].cursor
+    return bids, None
+
+
+def invalidate_comments_count(listing_pk):
+    cache.delete(COMMENTS_COUNT_CACHE_KEY % listing_pk)
@@ -1,33 +1,63 @@
+from functools import partial
+
+from django.db import router, transaction
+from django.utils import timezone
 from django.contrib.auth.models import User
 
-from .models import Profile
+from accounts.models import UserSyncEvent
+from .models import invalidate_comments_count
+from .sync import apply_pending
+
+
+def user_loaded_signal(instance, **kwargs):
+    """ Remembers the username the user was loaded with, see user_pre_saved_signal. """
+    instance._loaded_username = instance.__dict__.get('username')
 
 
 def user_saved_signal(instance, created, **kwargs):
-    """ For every created user create a profile in the auctions app. """
+    """ Every new user gets a profile in the auctions app, every renamed one a new profile name. """
     if created is True:
-        p = Profile(username=instance.username, user_model_pk=instance.pk)
-        p.save(date_joined=instance.date_joined)
+        record_user_event(UserSyncEvent.CREATED, instance, instance.date_joined)
+    elif getattr(instance, '_renamed', False):
+        record_user_event(UserSyncEvent.RENAMED, instance)
+    instance._loaded_username = instance.username
+    instance._renamed = False
 
 
-def user_pre_saved_signal(instance, **kwargs):
-    """ Ensures the auction's profile name and User username always match. """
+def user_pre_saved_signal(instance, update_fields=None, **kwargs):
+    """ Notices the username changes, see user_saved_signal. """
     if not instance.pk:
         return
-    else:
-        old_user_entry = User.objects.get(pk=instance.pk)
-
-    if old_user_entry.username == instance.username:
-        return
-    elif not Profile.manager.filter(username=old_user_entry.username).exists():
+    elif update_fields is not None and 'username' not in update_fields:
+        # the last_login update on every login, and the like
         return
-    else:
-        profile = Profile.manager.get(username=old_user_entry.username)
-        profile.username = instance.username
-        profile.save(update_fields=['username'])
+
+    old_username = getattr(instance, '_loaded_username', None)
+    if old_username is None or instance._state.adding:
+        # not loaded from the database, or loaded without the username
+        old_username = User.objects.filter(pk=instance.pk).values_list('username', flat=True).first()
+    instance._renamed = old_username is not None and old_username != instance.username
 
 
 def user_pre_delete_signal(instance, **kwargs):
-    """ Delete the auction's profile along with its user. """
-    p = Profile.manager.get(username=instance.username)
-    p.delete()
+    """ The auction's profile is deleted along with its user. """
+    record_user_event(UserSyncEvent.DELETED, instance)
+
+
+def record_user_event(action, user, date=None):
+    """ Writes the outbox in the transaction of the user change, the profiles are updated
+        once it is committed. The deletion is atomic, the saves are made atomic by their
+        callers: RegisterView, the admin views, import_users creates the profiles itself. """
+    db = router.db_for_write(User)
+    UserSyncEvent.manager.using(db).create(
+        action=action, user_pk=user.pk, username=user.username,
+        date=date or timezone.now()
+    )
+    transaction.on_commit(apply_pending, using=db)
+
+
+def comment_changed_signal(instance, using, **kwargs):
+    """ The cached comment count of the listing, see Listing.comments_count.
+        Dropped again after the commit, a reader may have cached the old count meanwhile. """
+    invalidate_comments_count(instance.listing_id)
+    transaction.on_commit(partial(invalidate_comments_count, instance.listing_id), using=using)
@@ -0,0 +1,15 @@
+'use strict';
+{
+    // auctions.admin.AutocompleteFilter: goes to the changelist filtered by the chosen row
+    const $ = django.jQuery;
+
+    $(document).on('change', '.autocomplete-filter', function() {
+        const queryString = this.dataset.queryString;
+        let url = queryString;
+        if (this.value) {
+            const separator = queryString.length > 1 ? '&' : '';
+            url = `${queryString}${separator}${encodeURIComponent(this.dataset.lookup)}=${encodeURIComponent(this.value)}`;
+        }
+        window.location.search = url;
+    });
+}
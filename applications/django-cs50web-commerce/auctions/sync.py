@@ -0,0 +1,81 @@
+""" Keeps the profiles in sync with the users, by replaying the accounts outbox. """
+
+import logging
+
+from django.db import transaction, IntegrityError
+
+from core.db import retry_on_lock
+from accounts.models import UserSyncEvent
+from .models import Profile, SyncCursor, DB
+
+logger = logging.getLogger(__name__)
+
+USERS_OUTBOX = 'accounts.usersyncevent'
+BATCH_SIZE = 500
+
+
+def apply_outbox(batch_size=BATCH_SIZE) -> int:
+    """ Replays the pending user events into the profiles, a batch per transaction.
+        The cursor moves in the same transaction as the changes, and only from the position
+        the batch was read at, so every event is applied exactly once, even by concurrent appliers.
+        Returns the number of events applied. """
+    applied = 0
+    while True:
+        cursor, _ = SyncCursor.manager.get_or_create(name=USERS_OUTBOX)
+        events = list(UserSyncEvent.manager.filter(pk__gt=cursor.position)[:batch_size])
+        if not events:
+            if applied:
+                prune_outbox(cursor.position)
+            return applied
+        if _apply_batch(cursor, events):
+            applied += len(events)
+
+
+def prune_outbox(position):
+    """ The events up to the position are applied for good, the cursor only moves forward. """
+    deleted, _ = UserSyncEvent.manager.filter(pk__lte=position).delete()
+    if deleted:
+        logger.info(f'AUCTIONS APP: {deleted} applied user sync events pruned')
+
+
+def apply_pending():
+    """ Runs after the commit of a user change, whatever is left is applied on the next run. """
+    try:
+        apply_outbox()
+    except Exception:
+        logger.exception('AUCTIONS APP: failed to apply the user sync events')
+
+
+@retry_on_lock(DB)
+def _apply_batch(cursor, events) -> bool:
+    """ The deleted profiles are only marked, see the purge_profiles command. """
+    moved = SyncCursor.manager\
+        .filter(pk=cursor.pk, position=cursor.position)\
+        .update(position=events[-1].pk)
+    if not moved:
+        # another applier took this batch
+        return False
+
+    for event in events:
+        if event.action == UserSyncEvent.CREATED:
+            create_profile(event.user_pk, event.username, event.date)
+        elif event.action == UserSyncEvent.RENAMED:
+            profile = Profile.manager.filter(user_model_pk=event.user_pk).first()
+            if profile is not None and profile.username != event.username:
+                profile.username = event.username
+                profile.save(update_fields=['username'])
+        elif event.action == UserSyncEvent.DELETED:
+            profile = Profile.manager.filter(user_model_pk=event.user_pk, is_deleted=False).first()
+            if profile is not None:
+                profile.mark_deleted()
+    return True
+
+
+def create_profile(user_pk, username, date_joined=None):
+    """ Creates the profile of the user, the repeated calls do nothing. """
+    try:
+        with transaction.atomic(DB):
+            p = Profile(username=username, user_model_pk=user_pk)
+            p.save(date_joined=date_joined)
+    except IntegrityError:
+        logger.warning(f'AUCTIONS APP: the profile of the user [{username}-{user_pk}] already exists')
@@ -0,0 +1,96 @@
+import calendar
+from datetime import date
+
+from django import template
+from django.contrib.admin.templatetags.admin_list import pagination
+from django.contrib.admin.templatetags.base import InclusionAdminNode
+from django.utils import formats, timezone
+from django.utils.text import capfirst
+from django.utils.translation import gettext as _
+
+register = template.Library()
+
+
+def _local_date(value) -> date:
+    return timezone.localtime(value).date() if timezone.is_aware(value) else value.date()
+
+
+def bounded_date_hierarchy(cl):
+    """
+    admin_list.date_hierarchy without its DISTINCT dates scans of the whole table.
+    Only the first and the last date are read, each one row of the date index; the links
+    are every year between them, every month of a year and every day of a month, with rows or not.
+    """
+    field_name = cl.date_hierarchy
+    year_field, month_field, day_field = (f'{field_name}__{part}' for part in ('year', 'month', 'day'))
+    year, month, day = (cl.params.get(lookup) for lookup in (year_field, month_field, day_field))
+    first = last = None
+
+    def link(filters):
+        return cl.get_query_string(filters, [f'{field_name}__'])
+
+    if not year:
+        dates = cl.queryset.values_list(field_name, flat=True)
+        first, last = dates.order_by(field_name).first(), dates.order_by(f'-{field_name}').first()
+        if first is None:
+            return {'show': False}
+        first, last = _local_date(first), _local_date(last)
+        if first.year == last.year:
+            year = first.year
+            if first.month == last.month:
+                month = first.month
+
+    if year and month and day:
+        selected = date(int(year), int(month), int(day))
+        return {
+            'show': True,
+            'back': {
+                'link': link({year_field: year, month_field: month}),
+                'title': capfirst(formats.date_format(selected, 'YEAR_MONTH_FORMAT')),
+            },
+            'choices': [{'title': capfirst(formats.date_format(selected, 'MONTH_DAY_FORMAT'))}],
+        }
+    elif year and month:
+        year, month = int(year), int(month)
+        days = range(first.day, last.day + 1) if first else range(1, calendar.monthrange(year, month)[1] + 1)
+        return {
+            'show': True,
+            'back': {'link': link({year_field: year}), 'title': str(year)},
+            'choices': [{
+                'link': link({year_field: year, month_field: month, day_field: d}),
+                'title': capfirst(formats.date_format(date(year, month, d), 'MONTH_DAY_FORMAT')),
+            } for d in days],
+        }
+    elif year:
+        year = int(year)
+        months = range(first.month, last.month + 1) if first else range(1, 13)
+        return {
+            'show': True,
+            'back': {'link': link({}), 'title': _('All dates')},
+            'choices': [{
+                'link': link({year_field: year, month_field: m}),
+                'title': capfirst(formats.date_format(date(year, m, 1), 'YEAR_MONTH_FORMAT')),
+            } for m in months],
+        }
+    else:
+        return {
+            'show': True,
+            'back': None,
+            'choices': [{
+                'link': link({year_field: str(y)}),
+                'title': str(y),
+            } for y in range(first.year, last.year + 1)],
+        }
+
+
+@register.tag(name='bounded_date_hierarchy')
+def bounded_date_hierarchy_tag(parser, token):
+    return InclusionAdminNode(parser, token, func=bounded_date_hierarchy,
+                              template_name='date_hierarchy.html', takes_context=False)
+
+
+@register.tag(name='bounded_pagination')
+def bounded_pagination_tag(parser, token):
+    """ admin_list.pagination, with the estimated count of core.paginator.BoundedCountPaginator. """
+    return InclusionAdminNode(parser, token, func=pagination,
+                              template_name='bounded_pagination.html', takes_context=False)
@@ -1,9 +1,12 @@
 from django import template
 
+from auctions.models import COMMENTS_PER_PAGE
+
 register = template.Library()
 
 
 @register.simple_tag
-def comment_slice(comment_set, view=None, slice_=10):
-    if view: return comment_set
-    else: return comment_set[:slice_]
+def comment_slice(listing, view=None, page=None, slice_=COMMENTS_PER_PAGE):
+    """ The page of the comments view, or the latest comments of the listing. """
+    if view: return page
+    else: return listing.latest_comments(slice_)
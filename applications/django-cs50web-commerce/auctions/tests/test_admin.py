@@ -0,0 +1,347 @@
+import calendar
+from datetime import timedelta
+from unittest import mock
+
+from django.db import connections
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from django.contrib.auth.models import User
+from core.paginator import BoundedCountPaginator
+from auctions.admin import PaginatedInline
+from auctions.models import Profile, Listing, Bid, Comment, Watchlist, Log, money_changed
+from .tests import DB, DATABASES, get_category, get_profile, get_listing
+
+
+class AdminChangelistTests(TestCase):
+    databases = DATABASES
+
+    def setUp(self):
+        admin = User.objects.create_superuser('Alpaca', password='qwerty')
+        self.client.force_login(admin)
+        self.category = get_category()
+        self.profiles = 0
+
+    def _add_profiles(self, count):
+        """ Every profile owns a listing, has a bid and a comment on it. """
+        for _ in range(count):
+            self.profiles += 1
+            profile = get_profile(f'Friend-{self.profiles}')
+            listing = get_listing(category=self.category, profile=profile,
+                                  title=f'Japari bun {self.profiles}')
+            Bid.manager.create(auctioneer=profile, lot=listing, bid_value=1)
+            Comment.manager.create(author=profile, listing=listing, text='Tasty!')
+
+    def _changelist_queries(self, model_name, **params) -> (int, object):
+        url = reverse(f'admin:auctions_{model_name}_changelist')
+        with CaptureQueriesContext(connections[DB]) as context:
+            response = self.client.get(url, params)
+        self.assertEqual(response.status_code, 200)
+        return len(context), response
+
+    def test_profile_changelist_queries_do_not_grow_with_rows(self):
+        self._add_profiles(3)
+        queries, _ = self._changelist_queries('profile')
+        self._add_profiles(6)
+        more_queries, response = self._changelist_queries('profile')
+        self.assertEqual(more_queries, queries)
+
+        profile = response.context['cl'].result_list.get(username='Friend-1')
+        self.assertEqual((profile.lots_count, profile.bids_count, profile.comments_count), (1, 1, 1))
+
+    def test_category_changelist_queries_do_not_grow_with_rows(self):
+        self._add_profiles(2)
+        queries, _ = self._changelist_queries('listingcategory')
+        get_category('food')
+        self._add_profiles(2)
+        more_queries, response = self._changelist_queries('listingcategory')
+        self.assertEqual(more_queries, queries)
+        self.assertContains(response, '<td class="field-items_in_category">4</td>', html=True)
+
+    def test_counts_sortable(self):
+        Profile.manager.create(username='Lonely')
+        self._add_profiles(2)
+        # the profile counts are the columns 5-7 of list_display
+        for column, count in [(5, 'lots_count'), (6, 'bids_count'), (7, 'comments_count')]:
+            for order in (f'{column}', f'-{column}'):
+                _, response = self._changelist_queries('profile', o=order)
+                counts = [getattr(p, count) for p in response.context['cl'].result_list]
+                self.assertEqual(counts, sorted(counts, reverse=order.startswith('-')), msg=order)
+                self.assertEqual(set(counts), {0, 1}, msg=order)
+
+    def test_large_tables_counted_up_to_a_limit(self):
+        self._add_profiles(2)
+        for model_name, field in [('log', 'date'), ('bid', 'bid_date'), ('comment', 'pub_date')]:
+            url = reverse(f'admin:auctions_{model_name}_changelist')
+            with CaptureQueriesContext(connections[DB]) as context:
+                response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            counts = [q['sql'] for q in context.captured_queries if 'COUNT(' in q['sql']]
+            self.assertEqual(len(counts), 1, msg=model_name)
+            self.assertIn('LIMIT', counts[0], msg=model_name)
+            dates = [q['sql'] for q in context.captured_queries if 'DISTINCT' in q['sql']]
+            self.assertEqual(dates, [], msg=f'{model_name}: no date_hierarchy scan')
+            self.assertTemplateUsed(response, 'admin/auctions/bounded_pagination.html')
+
+            # the bounded date filter
+            today = timezone.localdate()
+            response = self.client.get(url, {f'{field}__gte': today, f'{field}__lt': today + timedelta(days=1)})
+            self.assertEqual(response.status_code, 200)
+            self.assertGreater(response.context['cl'].result_count, 0, msg=model_name)
+
+    def test_date_hierarchy_drilldown(self):
+        self._add_profiles(2)
+        today = timezone.localdate()
+        for model_name, field in [('log', 'date'), ('bid', 'bid_date'), ('comment', 'pub_date')]:
+            url = reverse(f'admin:auctions_{model_name}_changelist')
+            drilldown = [{}, {f'{field}__year': today.year},
+                         {f'{field}__year': today.year, f'{field}__month': today.month},
+                         {f'{field}__year': today.year, f'{field}__month': today.month,
+                          f'{field}__day': today.day}]
+            for params in drilldown:
+                with CaptureQueriesContext(connections[DB]) as context:
+                    response = self.client.get(url, params)
+                self.assertEqual(response.status_code, 200)
+                self.assertGreater(response.context['cl'].result_count, 0, msg=params)
+                dates = [q['sql'] for q in context.captured_queries if 'DISTINCT' in q['sql']]
+                self.assertEqual(dates, [], msg=f'{model_name}: no date_hierarchy scan')
+            self.assertContains(response, '<li class="date-back">')
+            # the month, with a link to every day of it
+            response = self.client.get(url, drilldown[2])
+            days = calendar.monthrange(today.year, today.month)[1]
+            self.assertContains(response, f'{field}__day=', count=days)
+
+    def test_other_changelists_paginated_as_usual(self):
+        self._add_profiles(1)
+        _, response = self._changelist_queries('watchlist')
+        self.assertTemplateUsed(response, 'admin/pagination.html')
+        self.assertTemplateNotUsed(response, 'admin/auctions/bounded_pagination.html')
+
+    def test_estimated_count_shown(self):
+        self._add_profiles(3)
+        url = reverse('admin:auctions_bid_changelist')
+        with mock.patch.object(BoundedCountPaginator, 'count_limit', 2):
+            response = self.client.get(url)
+        self.assertContains(response, '2+ placed bids')
+        response = self.client.get(url)
+        self.assertContains(response, '3 placed bids')
+
+
+class AdminInlinesTests(TestCase):
+    databases = DATABASES
+
+    def setUp(self):
+        admin = User.objects.create_superuser('Alpaca', password='qwerty')
+        self.client.force_login(admin)
+        self.profile = get_profile('Serval')
+        category = get_category()
+        for i in range(25):
+            listing = get_listing(category=category, profile=self.profile, title=f'Japari bun {i}')
+            Bid.manager.create(auctioneer=self.profile, lot=listing, bid_value=1)
+        self.url = reverse('admin:auctions_profile_change', args=[self.profile.pk])
+
+    def _queries(self, params) -> (int, object):
+        with CaptureQueriesContext(connections[DB]) as context:
+            response = self.client.get(self.url, params)
+        self.assertEqual(response.status_code, 200)
+        return len(context), response
+
+    def test_inlines_paginated(self):
+        _, response = self._queries({})
+        formsets = {f.formset.prefix: f.formset for f in response.context['inline_admin_formsets']}
+        bids = formsets['bid_set']
+        self.assertEqual(len(bids.forms), PaginatedInline.per_page)
+        self.assertEqual(bids.paginator.count, 25)
+        self.assertContains(response, '25 placed bids in total')
+        self.assertContains(response, '?bid_set-page=2#bid_set-group')
+
+        _, response = self._queries({'bid_set-page': 2, 'lots_owned-page': 2})
+        formsets = {f.formset.prefix: f.formset for f in response.context['inline_admin_formsets']}
+        self.assertEqual(len(formsets['bid_set'].forms), 5)
+        self.assertEqual(len(formsets['lots_owned'].forms), 5)
+        self.assertEqual(len(formsets['logs'].forms), PaginatedInline.per_page)
+
+    def test_change_page_queries_do_not_grow_with_rows(self):
+        queries, _ = self._queries({})
+        category = get_category('food')
+        for i in range(10):
+            listing = get_listing(category=category, profile=self.profile, title=f'Japari manju {i}')
+            Bid.manager.create(auctioneer=self.profile, lot=listing, bid_value=1)
+        more_queries, _ = self._queries({})
+        self.assertEqual(more_queries, queries)
+
+
+class AdminFiltersTests(TestCase):
+    databases = DATABASES
+
+    def setUp(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            admin = User.objects.create_superuser('Alpaca', password='qwerty')
+        self.client.force_login(admin)
+        category = get_category()
+        self.profiles = [get_profile(name, money=money) for name, money in
+                         [('Serval', 0), ('Caracal', 50), ('Fennec', 500), ('Shoebill', 5000)]]
+        self.listing = get_listing(category=category, profile=self.profiles[0])
+        for profile in self.profiles:
+            Bid.manager.create(auctioneer=profile, lot=self.listing, bid_value=1)
+
+    def test_autocomplete_filter_lists_no_rows(self):
+        url = reverse('admin:auctions_bid_changelist')
+        response = self.client.get(url)
+        self.assertNotContains(response, 'auctioneer__id__exact=')
+        self.assertContains(response, 'data-field-name="auctioneer"')
+        self.assertContains(response, 'admin/js/autocomplete.js')
+
+        caracal = self.profiles[1]
+        response = self.client.get(url, {'auctioneer__id__exact': caracal.pk})
+        self.assertEqual(response.context['cl'].result_count, 1)
+        self.assertContains(response, f'<option value="{caracal.pk}" selected>Caracal</option>', html=True)
+
+    def test_autocomplete_prefix_lookups(self):
+        url = reverse('admin:autocomplete')
+        params = {'app_label': 'auctions', 'model_name': 'bid', 'field_name': 'auctioneer', 'term': 'S'}
+        with CaptureQueriesContext(connections[DB]) as context:
+            response = self.client.get(url, params)
+        texts = [result['text'] for result in response.json()['results']]
+        self.assertEqual(sorted(texts), ['Serval', 'Shoebill'])
+        self.assertIn('"username" >= ', context.captured_queries[-1]['sql'])
+
+        params.update(field_name='lot', term='Japari B')
+        response = self.client.get(url, params)
+        self.assertEqual([result['id'] for result in response.json()['results']], [str(self.listing.pk)])
+
+    def test_profile_search_and_money_ranges(self):
+        url = reverse('admin:auctions_profile_changelist')
+        response = self.client.get(url, {'q': 'Ca'})
+        self.assertEqual([p.username for p in response.context['cl'].result_list], ['Caracal'])
+        # the search box of the changelist is not the case-sensitive one of the autocomplete
+        response = self.client.get(url, {'q': 'ca'})
+        self.assertEqual([p.username for p in response.context['cl'].result_list], ['Caracal'])
+        for value, usernames in [('0', {'Alpaca', 'Serval'}), ('100', {'Caracal'}),
+                                 ('1000', {'Fennec'}), ('more', {'Shoebill'})]:
+            response = self.client.get(url, {'money': value})
+            self.assertEqual({p.username for p in response.context['cl'].result_list}, usernames, msg=value)
+
+    def test_export_action_streams_the_filtered_rows(self):
+        url = reverse('admin:auctions_bid_changelist')
+        caracal = self.profiles[1]
+        # "Select all": the rows of the page are checked, the filtered ones exported
+        page = Bid.manager.filter(auctioneer=caracal).values_list('pk', flat=True)
+        response = self.client.post(f'{url}?auctioneer__id__exact={caracal.pk}', {
+            'action': 'export_csv', 'select_across': '1', 'index': '0', '_selected_action': list(page),
+        })
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(lines[0].split(',')[:3], ['id', 'date', 'value'])
+        self.assertEqual(len(lines), 2)
+        self.assertIn('Caracal', lines[1])
+
+
+class AdminBulkActionsTests(TestCase):
+    databases = DATABASES
+
+    def setUp(self):
+        admin = User.objects.create_superuser('Alpaca', password='qwerty')
+        self.client.force_login(admin)
+        self.category = get_category()
+        self.seller = get_profile('Serval', money=0)
+        self.bidders = [get_profile('Caracal', money=100), get_profile('Fennec', money=100)]
+        self.lots = 0
+        self.url = reverse('admin:auctions_listing_changelist')
+
+    def _lot(self, *bids, publish=True) -> Listing:
+        self.lots += 1
+        listing = get_listing(category=self.category, profile=self.seller, title=f'Japari bun {self.lots}')
+        if publish:
+            listing.publish_the_lot()
+        for bidder, value in bids:
+            self.assertTrue(listing.make_a_bid(bidder, value))
+        return listing
+
+    def _action(self, action, lots, **data) -> (int, object):
+        with CaptureQueriesContext(connections[DB]) as context:
+            response = self.client.post(self.url, {
+                'action': action, 'index': '0', '_selected_action': [lot.pk for lot in lots], **data,
+            }, follow=True)
+        self.assertEqual(response.status_code, 200)
+        return len(context), response
+
+    def _money(self) -> list:
+        return [Profile.manager.get(pk=p.pk).money for p in [self.seller, *self.bidders]]
+
+    def test_withdraw_selected(self):
+        caracal, fennec = self.bidders
+        lots = [self._lot((caracal, 10), (fennec, 20)), self._lot((caracal, 30)), self._lot(),
+                self._lot(publish=False)]
+        self.assertEqual(self._money(), [0, 60, 80])
+
+        _, response = self._action('withdraw_selected', lots)
+        self.assertContains(response, 'Withdrawn: 4 listings in')
+        self.assertContains(response, 'not active 1 (japari-bun-4)')
+        self.assertContains(response, 'withdrawn 3 (japari-bun-1, japari-bun-2, japari-bun-3)')
+
+        self.assertEqual(self._money(), [0, 100, 100])
+        self.assertFalse(Bid.manager.exists())
+        self.assertFalse(Listing.manager.filter(is_active=True).exists())
+        self.assertEqual(set(Watchlist.manager.values_list('profile', flat=True)), {self.seller.pk})
+        self.assertEqual(self.seller.logs.filter(event=Log.WITHDRAWN).count(), 3)
+        self.assertEqual(caracal.logs.filter(event=Log.OWNER_REMOVED).count(), 2)
+        self.assertEqual(fennec.logs.get(event=Log.OWNER_REMOVED).amount, 20)
+
+    def test_close_selected_to_the_highest_bidders(self):
+        caracal, fennec = self.bidders
+        lots = [self._lot((caracal, 10), (fennec, 20)), self._lot((caracal, 30)), self._lot()]
+
+        _, response = self._action('close_selected', lots)
+        self.assertContains(response, 'Closed: 3 listings in')
+        self.assertContains(response, 'no bids 1 (japari-bun-3)')
+        self.assertContains(response, 'sold 2')
+
+        self.assertEqual(self._money(), [50, 70, 80])
+        self.assertFalse(Bid.manager.exists())
+        owners = dict(Listing.manager.values_list('slug', 'owner'))
+        self.assertEqual(owners, {'japari-bun-1': fennec.pk, 'japari-bun-2': caracal.pk,
+                                  'japari-bun-3': self.seller.pk})
+        self.assertEqual(list(Listing.manager.filter(is_active=True)), [lots[2]])
+        self.assertTrue(Watchlist.manager.filter(profile=fennec, listing=lots[0]).exists())
+        self.assertFalse(Watchlist.manager.filter(profile=caracal, listing=lots[0]).exists())
+        self.assertEqual(self.seller.logs.filter(event=Log.ITEM_SOLD).count(), 2)
+        self.assertEqual(caracal.logs.get(event=Log.YOU_LOSE).amount, 10)
+        self.assertEqual(fennec.logs.get(event=Log.YOU_WON).listing, lots[0])
+
+    def test_credits_sent_as_money_changed(self):
+        """ The balances are logged as with the per-lot methods. """
+        caracal, fennec = self.bidders
+        lots = [self._lot((caracal, 10), (fennec, 20)), self._lot((caracal, 30))]
+        changes = []
+        receiver = lambda pk, balance, **kwargs: changes.append((pk, balance))
+        money_changed.connect(receiver, sender=Profile)
+        self.addCleanup(money_changed.disconnect, receiver, sender=Profile)
+
+        self._action('close_selected', lots)
+        self.assertEqual(sorted(changes), sorted([(self.seller.pk, 50), (caracal.pk, 70)]))
+
+    def test_queries_do_not_grow_with_lots(self):
+        caracal, fennec = self.bidders
+        few = [self._lot((caracal, 1), (fennec, 2)) for _ in range(2)]
+        queries, _ = self._action('close_selected', few)
+        many = [self._lot((caracal, 1), (fennec, 2)) for _ in range(6)]
+        more_queries, _ = self._action('close_selected', many)
+        self.assertEqual(more_queries, queries)
+
+    def test_reassign_category(self):
+        food = get_category('food')
+        lots = [self._lot(), self._lot(publish=False)]
+        lots[1].category = food
+        lots[1].save()
+
+        _, response = self._action('reassign_category', lots)
+        self.assertContains(response, 'Choose the category')
+
+        _, response = self._action('reassign_category', lots, category=food.pk)
+        self.assertContains(response, 'Moved to food: 2 listings in')
+        self.assertContains(response, 'already in the category 1 (japari-bun-2)')
+        self.assertEqual(set(Listing.manager.values_list('category', flat=True)), {food.pk})
@@ -0,0 +1,104 @@
+import io
+import csv
+import json
+import tempfile
+from datetime import datetime, timedelta, timezone as dt_timezone
+from pathlib import Path
+
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from django.contrib.auth.models import User
+from auctions.models import Profile, Log
+from .tests import DATABASES, FAST_HASHER, get_profile, get_listing, create_user
+
+
+@override_settings(PASSWORD_HASHERS=FAST_HASHER)
+class ImportUsersCommandTests(TestCase):
+    databases = DATABASES
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp_dir.cleanup)
+
+    def _import(self, name, content, **options):
+        path = Path(self.tmp_dir.name, name)
+        path.write_text(content, encoding='utf-8')
+        out = io.StringIO()
+        call_command('import_users', str(path), workers=1, batch_size=2, stdout=out, **options)
+        return out.getvalue()
+
+    def test_import_csv(self):
+        out = self._import('users.csv', 'username,password,email\n'
+                                        'Serval,qwerty,serval@japaripark.int\n'
+                                        'Fennec,,\n'
+                                        'Serval,other,\n')
+        self.assertIn('2 users imported, 1 skipped', out)
+        serval = User.objects.get(username='Serval')
+        self.assertTrue(serval.check_password('qwerty'))
+        self.assertEqual(serval.email, 'serval@japaripark.int')
+        self.assertFalse(User.objects.get(username='Fennec').has_usable_password())
+
+        self.assertEqual(Profile.manager.get(username='Serval').user_model_pk, serval.pk)
+        self.assertEqual(Log.manager.filter(event=Log.REGISTRATION).count(), 2)
+
+    def test_import_is_resumable(self):
+        create_user(username='Serval')
+        create_user(username='Fennec')
+        Profile.manager.filter(username='Fennec').delete()
+
+        lines = [{'username': name, 'password': 'qwerty'} for name in ('Serval', 'Fennec', 'Toki')]
+        out = self._import('users.jsonl', '\n'.join(json.dumps(line) for line in lines))
+        self.assertIn('1 users imported, 2 skipped, 2 profiles created', out)
+        self.assertEqual(Profile.manager.count(), 3)
+        self.assertEqual(Log.manager.filter(profile__username='Serval').count(), 1)
+        self.assertTrue(Profile.manager.filter(username='Fennec').exists())
+
+    def test_registration_dated_when_joined(self):
+        joined = create_user(username='Fennec').date_joined - timedelta(days=30)
+        User.objects.filter(username='Fennec').update(date_joined=joined)
+        Profile.manager.filter(username='Fennec').delete()
+
+        self._import('users.csv', 'username,date_joined\n'
+                                  'Serval,2022-01-02T03:04:05+00:00\n'
+                                  'Fennec,\n')
+        serval = User.objects.get(username='Serval')
+        self.assertEqual(serval.date_joined, datetime(2022, 1, 2, 3, 4, 5, tzinfo=dt_timezone.utc))
+        self.assertEqual(Log.manager.get(profile__username='Serval', event=Log.REGISTRATION).date,
+                         serval.date_joined)
+        self.assertEqual(Log.manager.get(profile__username='Fennec', event=Log.REGISTRATION).date, joined)
+
+
+class ExportTableCommandTests(TestCase):
+    databases = DATABASES
+
+    def setUp(self):
+        self.listing = get_listing(title='Japari bun')
+        self.listing.publish_the_lot()
+        for name, value in [('Serval', 10), ('Caracal', 20)]:
+            self.listing.make_a_bid(get_profile(name), value)
+
+    def test_export_bids_csv(self):
+        out = io.StringIO()
+        call_command('export_table', 'bids', stdout=out)
+        rows = list(csv.DictReader(io.StringIO(out.getvalue())))
+        self.assertEqual([(row['auctioneer'], row['value'], row['lot']) for row in rows],
+                         [('Serval', '10.0', self.listing.slug), ('Caracal', '20.0', self.listing.slug)])
+
+    def test_export_logs_jsonl_for_a_period(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = Path(tmp_dir, 'logs.jsonl')
+            err = io.StringIO()
+            call_command('export_table', 'logs', format='jsonl', output=str(path),
+                         since=str(timezone.localdate()), stderr=err)
+            lines = [json.loads(line) for line in path.read_text(encoding='utf-8').splitlines()]
+        self.assertEqual(len(lines), Log.manager.count())
+        self.assertIn(f'{len(lines)} rows exported', err.getvalue())
+        bids = [line for line in lines if line['event'] == Log.NEW_BID]
+        self.assertEqual({(line['profile'], line['amount']) for line in bids}, {('Serval', 10), ('Caracal', 20)})
+
+        out = io.StringIO()
+        tomorrow = timezone.localdate() + timedelta(days=1)
+        call_command('export_table', 'logs', format='jsonl', since=str(tomorrow), stdout=out)
+        self.assertEqual(out.getvalue(), '')
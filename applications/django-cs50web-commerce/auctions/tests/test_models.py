@@ -1,24 +1,34 @@
+import io
 from pathlib import Path
+from contextlib import nullcontext
+from unittest import mock, skipIf
 
 from django.conf import settings
-from django.test import TestCase
+from django.test import TestCase, TransactionTestCase
+from django.core.management import call_command
+from django.test.utils import CaptureQueriesContext
+from django.db import connections, DatabaseError
+from django.core.cache import cache
+from django.db.models.signals import post_save, post_delete
+from django.urls import reverse
 from django.utils import timezone
 from django.core.files.uploadedfile import SimpleUploadedFile
 
 from django.contrib.auth.models import User
 from auctions.models import (
     Profile, ListingCategory, Comment,
-    Listing, Watchlist, Bid, Log,
-    user_media_path,
+    Listing, Watchlist, Bid, Log, SyncCursor,
+    user_media_path, LowOnMoney, get_comments_page, money_changed,
+    BIDS_PLACED, AUCTIONS_CLOSED, REFUNDS,
 
     NO_BID_NO_MONEY_SP, NO_BID_THE_OWNER,
     NO_BID_NO_MONEY, NO_BID_ON_TOP, NEW_BID_PERCENT,
-    DEFAULT_STARTING_PRICE,
+    DEFAULT_STARTING_PRICE, DELETED_USERNAME, COMMENTS_COUNT_CACHE_KEY,
 
     LOG_REGISTRATION, LOG_NEW_LISTING, LOG_YOU_WON,
     LOG_LOT_PUBLISHED, LOG_NEW_BID, LOG_WITHDRAWN,
     LOG_YOU_LOSE, LOG_OWNER_REMOVED, LOG_ITEM_SOLD,
-    LOG_MONEY_ADDED
+    LOG_MONEY_ADDED, LOG_GONE
 )
 from .tests import (
     DB, DATABASES,
@@ -55,6 +65,7 @@ from .tests import (
     + refund()
 + comment model
 + profile log model
++ technical logs
 """
 
 
@@ -77,8 +88,10 @@ class UniqueSlugTests(TestCase):
 class UserProfileTests(TestCase):
     databases = DATABASES
 
+    @skipIf(DB == 'default', 'the SINGLE_DATABASE mode')
     def test_new_user_gets_new_profile_in_correct_db(self):
-        user = User.objects.create(username='Serval')
+        with self.captureOnCommitCallbacks(execute=True):
+            user = User.objects.create(username='Serval')
         self.assertFalse(User.objects.db_manager(DB).filter(username='Serval').exists())
         self.assertTrue(User.objects.db_manager('default').filter(username='Serval').exists())
 
@@ -90,21 +103,55 @@ class UserProfileTests(TestCase):
         except Exception: pass
         else: raise Exception('found auctions_profile TABLE ON DEFAULTS db')
 
+    def test_profile_created_once(self):
+        from auctions.sync import create_profile
+        with self.captureOnCommitCallbacks(execute=True):
+            user = User.objects.create(username='Serval')
+        create_profile(user.pk, user.username)
+        self.assertEqual(Profile.manager.filter(user_model_pk=user.pk).count(), 1)
+        self.assertEqual(Log.manager.filter(profile__username='Serval').count(), 1)
+
     def test_profile_username_updated_with_user_username(self):
-        user = User.objects.create(username='Manul')
+        with self.captureOnCommitCallbacks(execute=True):
+            user = User.objects.create(username='Manul')
         self.assertTrue(Profile.manager.filter(username='Manul').exists())
         user.username = 'Manul Cat'
-        user.save()
+        with self.captureOnCommitCallbacks(execute=True):
+            user.save()
         self.assertTrue(Profile.manager.filter(username='Manul Cat').exists())
         self.assertFalse(Profile.manager.filter(username='Manul').exists())
 
+    def test_profile_username_updated_with_loaded_user_username(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            User.objects.create(username='Manul')
+        user = User.objects.get(username='Manul')
+        user.username = 'Manul Cat'
+        with self.captureOnCommitCallbacks(execute=True):
+            user.save()
+        self.assertTrue(Profile.manager.filter(username='Manul Cat').exists())
+        user.username = 'Pallas Cat'
+        with self.captureOnCommitCallbacks(execute=True):
+            user.save(update_fields=['username'])
+        self.assertTrue(Profile.manager.filter(username='Pallas Cat').exists())
+
+    def test_login_does_not_sync_the_profile(self):
+        from django.contrib.auth.models import update_last_login
+        User.objects.create(username='Manul')
+        user = User.objects.get(username='Manul')
+        # with the SINGLE_DATABASE the default queries are all there is
+        no_auctions_queries = nullcontext if DB == 'default' else lambda: self.assertNumQueries(0, using=DB)
+        with self.assertNumQueries(1, using='default'), no_auctions_queries():
+            update_last_login(None, user)
+        with self.assertNumQueries(1, using='default'), no_auctions_queries():
+            user.save()
+
     def test_profile_backref(self):
         profile = get_profile()
         listing = get_listing(profile=profile)
         comment = get_comment(listing, profile)
         self.assertTrue(profile.lots_owned.contains(listing))
         self.assertTrue(profile.comment_set.contains(comment))
-        self.assertTrue(profile.logs.filter(entry='Date of your registration.').exists())
+        self.assertTrue(profile.logs.filter(event=Log.REGISTRATION).exists())
 
     def test_profile_method_money(self):
         profile = get_profile(money=0)
@@ -113,29 +160,56 @@ class UserProfileTests(TestCase):
         listing = get_listing()
         listing.publish_the_lot()
         listing.make_a_bid(profile, 10)
-        profile.refresh_from_db()
         self._display_money(profile)
 
         self._get_money(profile)
 
     def _add_money(self, profile):
-        profile.add_money(10)
-        profile.refresh_from_db()
+        self.assertEqual(profile.add_money(10), 10)
         self.assertTrue(profile.money == 10)
         profile.add_money(10)
-        profile.refresh_from_db()
         self.assertTrue(profile.money == 20)
+        self.assertEqual(Profile.manager.get(pk=profile.pk).money, 20)
+        with self.assertNumQueries(1, using=DB):
+            self.assertEqual(Profile.manager.credit(profile.pk, 0.5), 20.5)
+        with self.assertNumQueries(1, using=DB):
+            self.assertEqual(Profile.manager.debit(profile.pk, 0.5), 20)
+
+    def test_wallet_without_update_returning(self):
+        """ SQLite before 3.35: UPDATE, then SELECT the balance. """
+        profile = get_profile(money=10)
+        with mock.patch('auctions.models.can_return_from_update', return_value=False):
+            with self.assertNumQueries(2, using=DB):
+                self.assertEqual(Profile.manager.credit(profile.pk, 5), 15)
+            self.assertEqual(Profile.manager.debit(profile.pk, 15), 0)
+            with self.assertRaises(LowOnMoney), self.assertNumQueries(1, using=DB):
+                Profile.manager.debit(profile.pk, 1)
+
+    def test_credit_many_in_batches(self):
+        profiles = [get_profile(name, money=10) for name in ['Serval', 'Caracal', 'Fennec']]
+        changes = []
+        receiver = lambda pk, balance, **kwargs: changes.append((pk, balance))
+        money_changed.connect(receiver, sender=Profile)
+        self.addCleanup(money_changed.disconnect, receiver, sender=Profile)
+        totals = {profile.pk: 0.5 * i for i, profile in enumerate(profiles, 1)}
+        with self.assertNumQueries(4, using=DB):
+            balances = Profile.manager.credit_many(totals, batch_size=2)
+        self.assertEqual(balances, {profile.pk: 10 + 0.5 * i for i, profile in enumerate(profiles, 1)})
+        self.assertEqual(dict(changes), balances)
 
     def _display_money(self, profile):
         self.assertEqual(profile.display_money(), (10.0, 10.0))
 
     def _get_money(self, profile):
         self.assertEqual(profile.get_money(10.0), 10.0)
-        profile.refresh_from_db()
         self.assertTrue(profile.money == 0)
+        with self.assertRaises(LowOnMoney):
+            profile.get_money(0.01)
+        self.assertEqual(Profile.manager.get(pk=profile.pk).money, 0)
 
     def test_profile_integrity_cascade_deletion(self):
-        user = User.objects.create(username='Pallas')
+        with self.captureOnCommitCallbacks(execute=True):
+            user = User.objects.create(username='Pallas')
         profile_one = Profile.manager.get(username='Pallas')
         profile_two = get_profile('Manul')
         category = get_category()
@@ -155,7 +229,9 @@ class UserProfileTests(TestCase):
         self.assertTrue(Bid.manager.count() == 2)
         self.assertTrue(Watchlist.manager.count() == 4)
 
-        user.delete()
+        with self.captureOnCommitCallbacks(execute=True):
+            user.delete()
+        call_command('purge_profiles', stdout=io.StringIO())
         self.assertFalse(Profile.manager.filter(username='Pallas').exists(), 'user’s profile deleted')
         self.assertTrue(Profile.manager.filter(username='Manul').exists(), 'profile2 not touched')
         self.assertTrue(ListingCategory.manager.contains(category), 'category not touched')
@@ -170,6 +246,102 @@ class UserProfileTests(TestCase):
         comment_two.refresh_from_db()
         self.assertIsNone(comment_two.author, 'user’s comment now without author')
 
+    def test_profile_deletion_refunds_and_purges_in_chunks(self):
+        owner = get_profile('Pallas')
+        bidder_one, bidder_two = get_profile('Manul'), get_profile('Serval')
+        owned = [get_listing(profile=owner, title=f'bun {i}') for i in range(3)]
+        for listing in owned:
+            listing.publish_the_lot()
+            listing.make_a_bid(bidder_one, 10)
+            bidder_one.refresh_from_db()
+        foreign = get_listing(profile=bidder_two)
+        foreign.publish_the_lot()
+        foreign.make_a_bid(bidder_one, 10)
+        owner.add_money(100)
+        owner.refresh_from_db()
+        foreign.make_a_bid(owner, 20)
+        get_comment(foreign, owner)
+
+        owner.mark_deleted()
+        self.assertEqual(owner.username, DELETED_USERNAME % owner.pk)
+        self.assertFalse(Listing.manager.filter(owner=owner, is_active=True).exists())
+        get_profile('Pallas')  # the username is free again
+        self.assertFalse(Bid.manager.filter(auctioneer=owner).exists())
+        foreign.refresh_from_db()
+        self.assertEqual(foreign.highest_bid, 10, 'the highest bid falls back to the next one')
+        bidder_one.refresh_from_db()
+        self.assertEqual(bidder_one.money, 90, 'the bids on the owned listings are refunded at once')
+        self.assertFalse(Bid.manager.filter(lot__owner=owner).exists())
+
+        owner.purge(chunk_size=2)
+        self.assertFalse(Profile.manager.filter(pk=owner.pk).exists())
+        self.assertFalse(Listing.manager.filter(pk__in=[lot.pk for lot in owned]).exists())
+        bidder_one.refresh_from_db()
+        self.assertEqual(bidder_one.money, 90, 'refunded once')
+        self.assertIsNone(Comment.manager.get(listing=foreign).author)
+
+
+class UserSyncOutboxTests(TestCase):
+    databases = DATABASES
+
+    def test_user_changes_go_through_the_outbox(self):
+        """ The events are applied once the user changes are committed, then pruned. """
+        from accounts.models import UserSyncEvent
+        with self.captureOnCommitCallbacks() as callbacks:
+            user = User.objects.create(username='Manul')
+            user.username = 'Manul Cat'
+            user.save()
+            user.delete()
+        self.assertEqual(
+            list(UserSyncEvent.manager.values_list('action', 'username')),
+            [('created', 'Manul'), ('renamed', 'Manul Cat'), ('deleted', 'Manul Cat')]
+        )
+        self.assertFalse(Profile.manager.exists(), 'nothing applied before the commit')
+
+        last_event = UserSyncEvent.manager.last().pk
+        for callback in callbacks:
+            callback()
+        self.assertEqual(SyncCursor.manager.get().position, last_event)
+        self.assertFalse(UserSyncEvent.manager.exists(), 'the applied events are pruned')
+        self.assertTrue(Profile.manager.get().is_deleted)
+        call_command('purge_profiles', stdout=io.StringIO())
+        self.assertFalse(Profile.manager.exists())
+
+    def test_pending_events_applied_once(self):
+        from accounts.models import UserSyncEvent
+        from auctions.sync import apply_outbox, _apply_batch
+        UserSyncEvent.manager.create(action=UserSyncEvent.CREATED, user_pk=100, username='Kaban')
+        UserSyncEvent.manager.create(action=UserSyncEvent.RENAMED, user_pk=100, username='Kaban-chan')
+        stale_cursor = SyncCursor.manager.get_or_create(name='accounts.usersyncevent')[0]
+        events = list(UserSyncEvent.manager.all())
+
+        self.assertEqual(apply_outbox(batch_size=1), 2)
+        self.assertEqual(apply_outbox(), 0)
+        self.assertEqual(Profile.manager.get(user_model_pk=100).username, 'Kaban-chan')
+
+        moved = _apply_batch(stale_cursor, events)
+        self.assertFalse(moved, 'a batch already applied is not applied again')
+        self.assertEqual(Log.manager.filter(event=Log.REGISTRATION).count(), 1)
+
+
+class UserSyncAtomicTests(TransactionTestCase):
+    databases = DATABASES
+
+    def test_user_registered_along_with_its_event(self):
+        """ RegisterView writes the user and the outbox event in one transaction. """
+        data = {'username': 'Manul', 'password1': 'qwerty', 'password2': 'qwerty'}
+        with mock.patch('auctions.signals.record_user_event', side_effect=DatabaseError('no outbox')):
+            with self.assertRaises(DatabaseError):
+                self.client.post(reverse('accounts:register'), data)
+        self.assertFalse(User.objects.filter(username='Manul').exists())
+
+        self.client.post(reverse('accounts:register'), data)
+        self.assertTrue(Profile.manager.filter(username='Manul').exists(), 'applied on the commit')
+
+    def test_user_save_is_not_patched(self):
+        from django.contrib.auth.base_user import AbstractBaseUser
+        self.assertIs(User.save, AbstractBaseUser.save)
+
 
 class ListingCategoryTests(TestCase):
     databases = DATABASES
@@ -221,7 +393,11 @@ class ListingTests(TestCase):
         self.assertTrue(listing.in_watchlist.contains(self.profile))
         self.assertTrue(self.image_path.exists())
 
-        listing.delete()
+        with self.captureOnCommitCallbacks(using=DB) as callbacks:
+            listing.delete()
+        self.assertTrue(self.image_path.exists(), 'the image waits for the commit')
+        for callback in callbacks:
+            callback()
         self.assertFalse(self.image_path.exists(), 'image deleted along with the listing')
 
 
@@ -443,7 +619,6 @@ class BidTests(TestCase):
 
         profile = get_profile('Shoujoutoki')
         listing1.make_a_bid(profile, 2)
-        profile.refresh_from_db()
         listing2.make_a_bid(profile, 3)
 
         self.assertEqual(Bid.manager.count(), 2)
@@ -466,8 +641,6 @@ class BidTests(TestCase):
         listing.make_a_bid(profile1, 10)
         listing.make_a_bid(profile2, 20)
 
-        profile1.refresh_from_db()
-        profile2.refresh_from_db()
         self.assertTrue(profile1.money == 0)
         self.assertTrue(profile2.money == 0)
 
@@ -477,6 +650,26 @@ class BidTests(TestCase):
         self.assertTrue(profile1.money == 10)
         self.assertTrue(profile2.money == 20)
 
+    def test_bids_counted_once_committed(self):
+        listing = get_listing()
+        listing.publish_the_lot()
+        profile1 = get_profile('Aardwolf', money=10)
+        profile2 = get_profile('Graywolf', money=20)
+        before = [BIDS_PLACED.get(), AUCTIONS_CLOSED.get(), REFUNDS.get()]
+
+        with self.captureOnCommitCallbacks(using=DB, execute=True):
+            listing.make_a_bid(profile1, 10)
+            listing.make_a_bid(profile2, 20)
+        self.assertEqual(BIDS_PLACED.get(), before[0] + 2)
+        with self.captureOnCommitCallbacks(using=DB) as callbacks:
+            listing.change_the_owner()
+        self.assertEqual(AUCTIONS_CLOSED.get(), before[1], msg='not committed yet')
+
+        for callback in callbacks:
+            callback()
+        self.assertEqual([BIDS_PLACED.get(), AUCTIONS_CLOSED.get(), REFUNDS.get()],
+                         [before[0] + 2, before[1] + 1, before[2] + 1])
+
 
 class CommentTests(TestCase):
     databases = DATABASES
@@ -501,12 +694,53 @@ class CommentTests(TestCase):
         self.assertTrue(self.listing.comment_set.filter(text=self.comment_text).exists())
         self.assertTrue(self.profile.comment_set.filter(text=self.comment_text).exists())
 
+    def test_comments_keyset_pages(self):
+        for i in range(5):
+            get_comment(self.listing, self.profile, f'comment {i}')
+        # two of them at the same moment, the pk decides
+        date = self.listing.comment_set.latest('pub_date').pub_date
+        self.listing.comment_set.filter(text__in=['comment 3', 'comment 4']).update(pub_date=date)
+
+        pages, cursor = [], None
+        while True:
+            with self.assertNumQueries(1, using=DB):
+                comments, cursor = get_comments_page(self.listing, cursor, per_page=2)
+            pages.append([c.text for c in comments])
+            if cursor is None:
+                break
+        self.assertEqual(pages, [['comment 4', 'comment 3'], ['comment 2', 'comment 1'], ['comment 0']])
+
+        for bad_cursor in ['not-a-cursor', f'{10 ** 20}_1', '1.5_2', 'nan_1']:
+            comments, cursor = get_comments_page(self.listing, bad_cursor, per_page=5)
+            self.assertEqual((len(comments), cursor), (5, None), msg=bad_cursor)
+
+    def test_comments_count_cached(self):
+        cache.clear()
+        get_comment(self.listing, self.profile, self.comment_text)
+        self.assertEqual(self.listing.comments_count(), 1)
+        with self.assertNumQueries(0, using=DB):
+            self.assertEqual(self.listing.comments_count(), 1)
+
+        comment = get_comment(self.listing, self.profile, self.comment_text)
+        self.assertEqual(self.listing.comments_count(), 2)
+        comment.delete()
+        self.assertEqual(self.listing.comments_count(), 1)
+
+    def test_comments_count_dropped_after_commit(self):
+        cache.clear()
+        with self.captureOnCommitCallbacks(using=DB, execute=True):
+            get_comment(self.listing, self.profile, self.comment_text)
+            # a reader of another worker caches the count before the commit
+            cache.set(COMMENTS_COUNT_CACHE_KEY % self.listing.pk, 0)
+        self.assertEqual(self.listing.comments_count(), 1)
+
 
 class LogTests(TestCase):
     databases = DATABASES
 
     def test_auctions_logs(self):
-        user = User.objects.create(username='LuckyBeast')
+        with self.captureOnCommitCallbacks(execute=True):
+            user = User.objects.create(username='LuckyBeast')
         self._log_registration()
 
         profile = Profile.manager.get(username='LuckyBeast')
@@ -530,23 +764,70 @@ class LogTests(TestCase):
 
         self.assertTrue(Log.manager.count() == 16, 'total log entries')
 
+    def test_log_message_rendered(self):
+        winner = get_profile(username='Lion')
+        listing = get_listing(title='Japari Bun')
+        log = Log.manager.create(profile=listing.owner, event=Log.ITEM_SOLD,
+                                 listing=listing, counterparty=winner)
+        self.assertEqual(log.message, LOG_ITEM_SOLD % ('Japari Bun', 'Lion'))
+        log = Log.manager.create(profile=winner, event=Log.YOU_WON, listing=listing, amount=20)
+        self.assertEqual(str(log), LOG_YOU_WON % ('Japari Bun', 20))
+        Listing.manager.filter(pk=listing.pk).delete()
+        log.refresh_from_db()
+        self.assertEqual(log.message, LOG_YOU_WON % (LOG_GONE, 20))
+
+    def test_migration_parses_old_messages(self):
+        from importlib import import_module
+        migration = import_module('auctions.migrations.0020_log_event')
+        pattern, _ = migration.PATTERNS[Log.NEW_BID]
+        self.assertEqual(pattern.match(LOG_NEW_BID % ('Japari [Bun]', 12.5)).groups(),
+                         ('Japari [Bun]', '12.50'))
+        pattern, prefix = migration.PATTERNS[Log.OWNER_REMOVED]
+        truncated = (LOG_OWNER_REMOVED % ('Japari Bun', 10))[:40]
+        self.assertIsNone(pattern.match(truncated))
+        self.assertTrue(truncated.startswith(prefix))
+        self.assertEqual(migration.parse(truncated), (Log.OWNER_REMOVED, {'title': 'Japari Bun'}))
+        self.assertEqual(migration.parse('Some other message.'), (Log.LEGACY, {}))
+
+    def test_migration_finds_the_listings_of_the_profile(self):
+        from importlib import import_module
+        migration = import_module('auctions.migrations.0020_log_event')
+        serval, caracal = get_profile('Serval'), get_profile('Caracal')
+        category = get_category()
+        own = get_listing(category, serval, title='Japari bun')
+        get_listing(category, caracal, title='Japari bun')
+        get_listing(category, caracal, title='Japari bun deluxe')
+        find = lambda profile, title, counterparty=None: \
+            migration.find_listing(Listing.manager.all(), profile.pk, counterparty, title)
+
+        self.assertEqual(find(serval, 'Japari bun'), own.pk, 'not the listing of another user')
+        self.assertEqual(find(serval, 'Japari'), own.pk, 'a title cut off')
+        self.assertIsNone(find(caracal, 'Japari'), 'two listings match')
+        self.assertIsNone(find(serval, 'Japari bun deluxe'))
+        self.assertEqual(find(serval, 'Japari bun deluxe', caracal.pk), Listing.manager.get(
+            title='Japari bun deluxe').pk, 'the item sold to the counterparty')
+
+    def test_legacy_message_kept(self):
+        log = Log.manager.create(profile=get_profile(), event=Log.LEGACY, entry='An old message.')
+        self.assertEqual(log.message, 'An old message.')
+
     def _log_registration(self):
-        self.assertTrue(Log.manager.filter(entry=LOG_REGISTRATION).exists())
+        self.assertTrue(Log.manager.filter(event=Log.REGISTRATION).exists())
 
     def _log_money_added(self, profile, money):
         profile.add_money(money)
-        self.assertTrue(Log.manager.filter(entry=LOG_MONEY_ADDED % money).exists())
+        self.assertTrue(Log.manager.filter(event=Log.MONEY_ADDED, amount=money).exists())
 
     def _log_new_listing(self, listing):
-        self.assertTrue(Log.manager.filter(entry=LOG_NEW_LISTING % listing.title).exists())
+        self.assertTrue(Log.manager.filter(event=Log.NEW_LISTING, listing=listing).exists())
 
     def _log_auction_created(self, listing):
         listing.publish_the_lot()
-        self.assertTrue(Log.manager.filter(entry=LOG_LOT_PUBLISHED % listing.title).exists())
+        self.assertTrue(Log.manager.filter(event=Log.PUBLISHED, listing=listing).exists())
 
     def _logs_new_bid(self, listing, profile, bid_value):
         listing.make_a_bid(profile, bid_value)
-        self.assertTrue(Log.manager.filter(entry=LOG_NEW_BID % (listing.title, bid_value)).exists())
+        self.assertTrue(Log.manager.filter(event=Log.NEW_BID, listing=listing, amount=bid_value).exists())
 
     def _logs_auction_closed(self, listing, lowest_bid):
         winner = get_profile(username='Lion')
@@ -555,12 +836,13 @@ class LogTests(TestCase):
         winner.refresh_from_db()
         listing.change_the_owner()
 
-        self.assertTrue(Log.manager.filter(entry=LOG_ITEM_SOLD % (listing.title, 'Lion')).exists())
-        self.assertTrue(Log.manager.filter(entry=LOG_MONEY_ADDED % highest_bid,
+        self.assertTrue(Log.manager.filter(event=Log.ITEM_SOLD, listing=listing,
+                                           counterparty__username='Lion').exists())
+        self.assertTrue(Log.manager.filter(event=Log.MONEY_ADDED, amount=highest_bid,
                                            profile__username='LuckyBeast').exists())
-        self.assertTrue(Log.manager.filter(entry=LOG_YOU_LOSE % (listing.title, lowest_bid),
+        self.assertTrue(Log.manager.filter(event=Log.YOU_LOSE, listing=listing, amount=lowest_bid,
                                            profile__username='Moose').exists())
-        self.assertTrue(Log.manager.filter(entry=LOG_YOU_WON % (listing.title, highest_bid),
+        self.assertTrue(Log.manager.filter(event=Log.YOU_WON, listing=listing, amount=highest_bid,
                                            profile__username='Lion').exists())
 
     def _logs_withdrawn(self, listing, profile):
@@ -568,5 +850,57 @@ class LogTests(TestCase):
         bid_value = 30
         listing.make_a_bid(profile, bid_value)
         listing.withdraw()
-        self.assertTrue(Log.manager.filter(entry=LOG_WITHDRAWN % listing.title).exists())
-        self.assertTrue(Log.manager.filter(entry=LOG_OWNER_REMOVED % (listing.title, bid_value)).exists())
+        self.assertTrue(Log.manager.filter(event=Log.WITHDRAWN, listing=listing).exists())
+        self.assertTrue(Log.manager.filter(event=Log.OWNER_REMOVED, listing=listing, amount=bid_value).exists())
+
+
+class ModelLogsTests(TestCase):
+    databases = DATABASES
+
+    def setUp(self):
+        self.category = get_category()
+        self.owner = get_profile('Fennec')
+
+    def _connect_receivers(self):
+        from auctions.apps import AuctionsConfig
+        AuctionsConfig._logger_signals(Profile)
+        for uid, signal, model in [('profile', post_save, Profile),
+                                   ('profile-delete', post_delete, Profile),
+                                   ('profile-money', money_changed, Profile),
+                                   ('category', post_save, ListingCategory),
+                                   ('bid', post_save, Bid),
+                                   ('listing', post_save, Listing)]:
+            self.addCleanup(signal.disconnect, sender=model, dispatch_uid=uid)
+
+    def _bid_queries(self, title, username) -> int:
+        listing = get_listing(title=title, category=self.category, profile=self.owner)
+        listing.publish_the_lot()
+        profile = get_profile(username, money=100)
+        with CaptureQueriesContext(connections[DB]) as context:
+            self.assertTrue(listing.make_a_bid(profile, 10))
+        return len(context)
+
+    def test_logging_a_bid_makes_no_queries(self):
+        without_logs = self._bid_queries('Japari Bun', 'Serval')
+        self._connect_receivers()
+        with self.assertLogs('auctions.logs', 'INFO'):
+            with_logs = self._bid_queries('Japari Manju', 'Caracal')
+        self.assertEqual(with_logs, without_logs)
+
+    def test_related_rows_not_loaded(self):
+        self._connect_receivers()
+        listing = get_listing(category=self.category, profile=self.owner)
+        profile = get_profile('Serval')
+        with self.assertLogs('auctions.logs', 'INFO') as logs, self.assertNumQueries(1, using=DB):
+            # only the insert
+            Bid.manager.create(auctioneer_id=profile.pk, lot_id=listing.pk, bid_value=5)
+        self.assertIn(f'bid from [pk-{profile.pk}], on [pk-{listing.pk}]', logs.output[0])
+
+    def test_balance_logged_with_the_model_logs(self):
+        with self.assertNoLogs('auctions', 'INFO'):
+            self.owner.add_money(10, silent=True)
+        self._connect_receivers()
+        with self.assertLogs('auctions.logs', 'INFO') as logs:
+            self.owner.add_money(10, silent=True)
+        self.assertIn(f'profile [pk-{self.owner.pk}] money changed, now has {self.owner.money} coins',
+                      logs.output[0])
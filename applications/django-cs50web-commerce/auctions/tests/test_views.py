@@ -1,20 +1,23 @@
 from pathlib import Path
 
+from django.db import connections
 from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from django.conf import settings
+from django.core.cache import cache
 from django.contrib.auth.hashers import make_password
 from django.core.files.uploadedfile import SimpleUploadedFile
 
 from django.contrib.auth.models import User
 from auctions.models import (
-    Profile, user_media_path,
+    Profile, Bid, user_media_path,
     LOG_REGISTRATION, NO_BID_NO_MONEY_SP,
-    NO_BID_ON_TOP, NO_BID_NO_MONEY
+    NO_BID_ON_TOP, NO_BID_NO_MONEY, COMMENTS_PER_PAGE, BIDS_PER_PAGE
 )
 from .tests import (
-    DATABASES, SMALL_GIF, IMGNAME, FAST_HASHER,
-    get_category, get_listing
+    DB, DATABASES, SMALL_GIF, IMGNAME, FAST_HASHER,
+    get_category, get_profile, get_listing, create_user
 )
 from auctions.utils import format_bid_value
 
@@ -64,7 +67,7 @@ from auctions.utils import format_bid_value
 
 @override_settings(PASSWORD_HASHERS=FAST_HASHER)
 def get_user(username) -> User:
-    return User.objects.create(username=username, password=make_password('qwerty'))
+    return create_user(username=username, password=make_password('qwerty'))
 
 
 @override_settings(PASSWORD_HASHERS=FAST_HASHER)
@@ -720,6 +723,22 @@ class CommentsViewTests(TestNavbarAndSessionMixin, TestAccessMixin, TestCase):
 
         self._no_form_for_unpublished(response)
 
+    def test_comments_pages(self):
+        cache.clear()
+        for i in range(COMMENTS_PER_PAGE):
+            self.listing.comment_set.create(author=self.second_profile, text=f'more comment {i}')
+        login_user(self, self.owner_profile.username)
+        response = self.client.get(self.test_url)
+        self.assertContains(response, f'Comments ({COMMENTS_PER_PAGE + 2}) to')
+        self.assertEqual(len(response.context['comments']), COMMENTS_PER_PAGE)
+        self.assertNotContains(response, 'first comment')
+
+        cursor = response.context['next_cursor']
+        self.assertContains(response, f"href='?after={cursor}'")
+        response = self.client.get(self.test_url, {'after': cursor})
+        self.assertEqual([c.text for c in response.context['comments']], ['second comment', 'first comment'])
+        self.assertIsNone(response.context['next_cursor'])
+
     def _no_form_for_unpublished(self, response):
         text_input = '<textarea name="text_field"'
         author_hidden = '<input type="hidden" name="author_hidden"'
@@ -824,6 +843,46 @@ class BidViewTests(TestNavbarAndSessionMixin, TestCase):
         self.assertContains(response, self.second_profile.username)
         self.assertContains(response, '🪙20.0')
 
+    def test_bids_pages(self):
+        auctioneers = [get_profile(f'Friend-{i}') for i in range(3)]
+        for i in range(BIDS_PER_PAGE + 5):
+            # pairs of the same value, the pk decides
+            Bid.manager.create(auctioneer=auctioneers[i % 3], lot=self.listing, bid_value=i // 2 + 1)
+        expected = list(self.listing.bid_set.order_by('-bid_value', 'pk').values_list('pk', flat=True))
+
+        with CaptureQueriesContext(connections[DB]) as context:
+            response = self.client.get(self.test_url)
+        self.assertLess(len(context), 5, msg='no query per bid')
+        bids = response.context['bids']
+        self.assertEqual([bid.pk for bid in bids], expected[:BIDS_PER_PAGE])
+        self.assertContains(response, 'Friend-2')
+
+        cursor = response.context['next_cursor']
+        self.assertContains(response, f"href='?after={cursor}'")
+        response = self.client.get(self.test_url, {'after': cursor})
+        self.assertEqual([bid.pk for bid in response.context['bids']], expected[BIDS_PER_PAGE:])
+        self.assertIsNone(response.context['next_cursor'])
+
+        for bad_cursor in ['nan_1', 'inf_1', '1e400_1', '1_x', 'not-a-cursor']:
+            response = self.client.get(self.test_url, {'after': bad_cursor})
+            self.assertEqual([bid.pk for bid in response.context['bids']], expected[:BIDS_PER_PAGE],
+                             msg=bad_cursor)
+
+    def test_bids_pages_of_large_values(self):
+        """ 1e+16: the plus of the cursor is encoded in the link, not read back as a space. """
+        profile = get_profile('Friend')
+        for _ in range(BIDS_PER_PAGE + 1):
+            Bid.manager.create(auctioneer=profile, lot=self.listing, bid_value=1e16)
+        expected = list(self.listing.bid_set.order_by('-bid_value', 'pk').values_list('pk', flat=True))
+
+        response = self.client.get(self.test_url)
+        cursor = response.context['next_cursor']
+        self.assertTrue(cursor.startswith('1e+16_'))
+        link = f"?after={cursor.replace('+', '%2B')}"
+        self.assertContains(response, f"href='{link}'")
+        response = self.client.get(self.test_url + link)
+        self.assertEqual([bid.pk for bid in response.context['bids']], expected[BIDS_PER_PAGE:])
+
     def _unpublished_redirects(self):
         self.listing.withdraw()
         self.assertRedirects(
@@ -21,6 +21,12 @@ IMGNAME = 'dot.gif'
 TMP_IMAGE = tempfile.NamedTemporaryFile(suffix='.jpg').name
 
 
+def create_user(**fields) -> User:
+    """ The profile is created once the user is committed, see auctions.sync. """
+    with TestCase.captureOnCommitCallbacks(execute=True):
+        return User.objects.create(**fields)
+
+
 def get_category(label='precious') -> ListingCategory:
     return ListingCategory.manager.create(label=label)
 
@@ -59,13 +65,11 @@ class AuctionsResourcesTests(SimpleTestCase):
     resources = [
         app_dir / 'readme.md',
         app_dir / 'auctions' / 'logs.py',
-        app_dir / 'auctions' / 'db_router.py',
         app_dir / 'auctions' / 'static' / 'auctions' / 'favicon.ico',
         app_dir / 'auctions' / 'static' / 'auctions' / 'logo.jpg',
         app_dir / 'auctions' / 'templates' / 'auctions' / 'base_auctions.html',
     ]
     def test_base_resources_exists(self):
-        from auctions.db_router import CommerceRouter
         for item in self.resources:
             self.assertTrue(item.exists(), msg=item)
 
@@ -92,7 +96,8 @@ class AuctionsIntegrationWithRegistrationTests(TestCase):
             'password1': 'qwerty',
             'password2': 'qwerty',
         }
-        response_post = self.client.post(url, form_data)
+        with self.captureOnCommitCallbacks(execute=True):
+            response_post = self.client.post(url, form_data)
 
         self.assertRedirects(response_post, reverse('auctions:index'), 302, 200)
 
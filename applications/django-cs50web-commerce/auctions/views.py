@@ -9,7 +9,7 @@ from .forms import (
     EditListingForm, PublishListingForm,
     AuctionLotForm, CommentForm
 )
-from .models import Profile, Listing, Log
+from .models import Profile, Listing, Log, get_comments_page, get_bids_page
 from .mixins import AuctionsAuthMixin, PresetMixin, ListingRedirectMixin
 
 logger = logging.getLogger(__name__)
@@ -58,7 +58,9 @@ class UserHistoryView(AuctionsAuthMixin, PresetMixin, generic.ListView):
     context_object_name = 'profile_logs'
 
     def get_queryset(self):
-        return Log.manager.filter(profile__pk=self.auctioneer_pk).all()
+        return Log.manager\
+            .select_related('listing', 'counterparty')\
+            .filter(profile__pk=self.auctioneer_pk)
 
 
 class WatchlistView(AuctionsAuthMixin, PresetMixin, generic.DetailView):
@@ -174,7 +176,6 @@ class CommentsView(PresetMixin, generic.UpdateView):
     def get_queryset(self):
         return Listing.manager\
                 .select_related('owner')\
-                .prefetch_related('comment_set', 'comment_set__author')\
                 .filter(slug=self.kwargs.get('slug'))
 
     def get_form(self, *args, **kwargs):
@@ -183,6 +184,13 @@ class CommentsView(PresetMixin, generic.UpdateView):
             form.fields['author_hidden'].initial = self.auctioneer
         return form
 
+    def get_context_data(self, **kwargs):
+        """ A page of the comments, the older ones are reached by ?after=<cursor>. """
+        context = super().get_context_data(**kwargs)
+        context['comments'], context['next_cursor'] = \
+            get_comments_page(self.object, self.request.GET.get('after'))
+        return context
+
 
 class BidView(PresetMixin, generic.DetailView):
     template_name = 'auctions/bids_list.html'
@@ -198,9 +206,14 @@ class BidView(PresetMixin, generic.DetailView):
             return result
 
     def get_queryset(self):
-        return Listing.manager\
-                .prefetch_related('bid_set')\
-                .filter(slug=self.kwargs.get('slug'))
+        return Listing.manager.filter(slug=self.kwargs.get('slug'))
+
+    def get_context_data(self, **kwargs):
+        """ A page of the bid history, the lower bids are reached by ?after=<cursor>. """
+        context = super().get_context_data(**kwargs)
+        context['bids'], context['next_cursor'] = \
+            get_bids_page(self.object, self.request.GET.get('after'))
+        return context
 
 
 """ TODO
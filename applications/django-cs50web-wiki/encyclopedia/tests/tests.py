@@ -46,7 +46,6 @@ class WikiResourcesTests(SimpleTestCase):
     app_dir = settings.PROJECT_MAIN_APPS['encyclopedia']['app_dir']
     resources = [
         app_dir / 'readme.md',
-        app_dir / 'encyclopedia' / 'db_router.py',
         app_dir / 'encyclopedia' / 'logs.py',
         app_dir / 'encyclopedia' / 'static' / 'encyclopedia' / 'favicon.ico',
         app_dir / 'encyclopedia' / 'static' / 'encyclopedia' / 'logo.jpg',
@@ -54,6 +53,5 @@ class WikiResourcesTests(SimpleTestCase):
     ]
 
     def test_base_resources_exists(self):
-        from encyclopedia.db_router import WikiRouter
         for item in self.resources:
             self.assertTrue(item.exists(), msg=item)
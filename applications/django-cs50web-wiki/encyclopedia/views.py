@@ -1,6 +1,8 @@
 import logging
 import markdown2
+from contextlib import nullcontext
 
+from django.apps import apps
 from django.urls import reverse_lazy
 from django.views import generic
 
@@ -9,6 +11,12 @@ from .forms import EntryForm, DeleteEntryForm
 
 logger = logging.getLogger(__name__)
 
+if apps.is_installed('core'):
+    from core.server_timing import timed
+else:
+    # the phases are timed only in a project with core
+    timed = nullcontext
+
 
 class NavbarMixin:
     @staticmethod
@@ -38,9 +46,10 @@ class DetailView(NavbarMixin, generic.DetailView):
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        context['entry_text_html'] = markdown2.markdown(
-            context['article'].entry_text
-        )
+        with timed('markdown'):
+            context['entry_text_html'] = markdown2.markdown(
+                context['article'].entry_text
+            )
 
         slug = context['article'].slug
         url_edit = reverse_lazy('encyclopedia:edit_entry', args=[slug])
@@ -10,11 +10,12 @@ class ChoiceInline(admin.TabularInline):
 
 @admin.register(Question)
 class QuestionAdmin(admin.ModelAdmin):
-    list_display = ['pk', 'question_text', 'pub_date', 'published_recently']
+    list_display = ['pk', 'question_text', 'pub_date', 'total_votes', 'published_recently']
     list_display_links = ['pk', 'question_text']
     list_filter = ['pub_date']
 
-    fields = ['question_text', 'pub_date']
+    fields = ['question_text', 'pub_date', 'total_votes']
+    readonly_fields = ['total_votes']
     search_fields = ['question_text']
 
     inlines = [ChoiceInline]
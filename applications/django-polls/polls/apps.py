@@ -7,8 +7,33 @@ class PollsConfig(AppConfig):
     name = 'polls'
 
     def ready(self):
+        self._cache_signals()
+        self._metrics_signals()
+
         if os.environ.get('RUN_MAIN') != 'true' and 'test' not in sys.argv:
             from django.db.models.signals import post_save
             from .logs import log_choice_save
             from .models import Choice
             post_save.connect(log_choice_save, sender=Choice, dispatch_uid='choice-save')
+
+    @staticmethod
+    def _cache_signals():
+        """ The materialized vote totals and the results cache. """
+        from django.db.models.signals import post_save, post_delete
+        from .signals import question_changed_signal, choice_changed_signal
+        from .models import Question, Choice
+        post_save.connect(question_changed_signal, sender=Question, dispatch_uid='question-cache-save')
+        post_delete.connect(question_changed_signal, sender=Question, dispatch_uid='question-cache-delete')
+        post_save.connect(choice_changed_signal, sender=Choice, dispatch_uid='choice-cache-save')
+        post_delete.connect(choice_changed_signal, sender=Choice, dispatch_uid='choice-cache-delete')
+
+    @staticmethod
+    def _metrics_signals():
+        """ The votes are counted in the metrics of core, if the project has it. """
+        from django.apps import apps
+        if not apps.is_installed('core'):
+            return
+        from core.metrics import Counter
+        from .models import vote_cast
+        votes = Counter('polls_votes_total', 'Votes cast.')
+        vote_cast.connect(lambda **kwargs: votes.inc(), weak=False, dispatch_uid='votes-metric')
@@ -1,5 +1,4 @@
 from django.forms import ModelForm, RadioSelect, ModelChoiceField
-from django.db.models import F
 
 from .models import Question, Choice
 
@@ -18,6 +17,9 @@ class ChoiceSetForm(ModelForm):
 
     def clean_choices(self):
         choice = self.cleaned_data['choices']
-        choice.votes = F('votes') + 1
-        choice.save()
+        self.instance.vote(choice)
         return choice
+
+    def save(self, commit=True):
+        """ The vote is already counted, the question itself has nothing to save. """
+        return self.instance
@@ -0,0 +1,37 @@
+# Generated by Django 4.0 on 2026-10-19 15:27
+
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+
+
+def count_total_votes(apps, schema_editor):
+    Question = apps.get_model('polls', 'Question')
+    Choice = apps.get_model('polls', 'Choice')
+    db = schema_editor.connection.alias
+    votes = Choice._default_manager.using(db)\
+        .filter(question=OuterRef('pk'))\
+        .values('question')\
+        .annotate(total=Sum('votes'))\
+        .values('total')
+    Question._default_manager.using(db).update(total_votes=Coalesce(Subquery(votes), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('polls', '0002_alter_choice_managers_alter_question_managers'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='question',
+            name='total_votes',
+            field=models.IntegerField(default=0, verbose_name='total votes'),
+        ),
+        migrations.AddIndex(
+            model_name='choice',
+            index=models.Index(fields=['question', '-votes'], name='polls_choice_results_idx'),
+        ),
+        migrations.RunPython(count_total_votes, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 4.0 on 2026-10-19 15:27
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('polls', '0003_question_total_votes_choice_results_idx'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='question',
+            name='pub_date',
+            field=models.DateTimeField(db_index=True, default=django.utils.timezone.localtime, verbose_name='date published'),
+        ),
+    ]
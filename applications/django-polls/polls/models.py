@@ -1,20 +1,98 @@
+import math
+import time
 import datetime
 
 from django.utils import timezone
 from django.urls import reverse
 from django.contrib import admin
-from django.db import models
+from django.core.cache import cache
+from django.db import models, transaction, router
 from django.db.models import (
     Model, IntegerField, CharField,
-    DateTimeField, ForeignKey
+    DateTimeField, ForeignKey,
+    Sum, Min, F, OuterRef, Subquery
 )
+from django.db.models.functions import Coalesce
+from django.dispatch import Signal
+
+RESULTS_CACHE_KEY = 'polls:results:%s'
+RESULTS_CACHE_TIMEOUT = 60 * 5
+
+INDEX_CACHE_KEY = 'polls:index:%s:%s'
+INDEX_VERSION_KEY = 'polls:index:version'
+INDEX_CACHE_TIMEOUT = 60
+
+# sent after the vote is committed, with question_pk and choice_pk
+vote_cast = Signal()
+
+
+def get_results(question_pk) -> 'Question | None':
+    """ Question with its choices ordered by votes in the `results` attribute.
+        A cache hit or a single query over the (question, -votes) index. """
+    key = RESULTS_CACHE_KEY % question_pk
+    question = cache.get(key)
+    if question is not None:
+        return question
+
+    choices = list(
+        Choice.manager
+        .select_related('question')
+        .filter(question_id=question_pk)
+        .order_by('-votes')
+    )
+    if choices:
+        question = choices[0].question
+    else:
+        question = Question.manager.filter(pk=question_pk).first()
+        if question is None:
+            return None
+
+    for choice in choices:
+        choice.question = question
+        choice.percent = choice.votes * 100 / question.total_votes if question.total_votes else 0
+    question.results = choices
+    cache.set(key, question, RESULTS_CACHE_TIMEOUT)
+    return question
+
+
+def invalidate_results(question_pk):
+    cache.delete(RESULTS_CACHE_KEY % question_pk)
+
+
+def index_cache_key(page) -> str:
+    """ Keys of the index pages are versioned, so every page is dropped at once.
+        The cache is shared by the workers, so a bump reaches all of them. """
+    version = cache.get_or_set(INDEX_VERSION_KEY, time.time_ns, None)
+    return INDEX_CACHE_KEY % (version, page)
+
+
+def invalidate_index():
+    """ A version evicted from the cache starts anew from the clock, never from a number
+        the old pages may still be cached under. """
+    try:
+        cache.incr(INDEX_VERSION_KEY)
+    except ValueError:
+        cache.set(INDEX_VERSION_KEY, time.time_ns(), None)
+
+
+def index_cache_timeout(now=None) -> int:
+    """ The cached index must expire exactly when the next scheduled question goes live. """
+    now = now if now else timezone.localtime()
+    next_pub_date = Question.manager\
+        .filter(pub_date__gt=now)\
+        .aggregate(next_pub_date=Min('pub_date'))['next_pub_date']
+    if next_pub_date is None:
+        return INDEX_CACHE_TIMEOUT
+    seconds = math.ceil((next_pub_date - now).total_seconds())
+    return max(1, min(INDEX_CACHE_TIMEOUT, seconds))
 
 
 class Question(Model):
     manager = models.Manager()
 
     question_text = CharField('text', max_length=200)
-    pub_date = DateTimeField('date published', default=timezone.localtime)
+    pub_date = DateTimeField('date published', default=timezone.localtime, db_index=True)
+    total_votes = IntegerField('total votes', default=0)
 
     class Meta:
         """ question --< choice_set """
@@ -34,6 +112,28 @@ class Question(Model):
         yesterday = now - datetime.timedelta(days=1)
         return yesterday <= self.pub_date <= now
 
+    def vote(self, choice):
+        """ Count the vote on the choice and on the question's total in one transaction,
+            the results cache is dropped after commit. """
+        db = router.db_for_write(Question)
+        with transaction.atomic(db, savepoint=False):
+            Choice.manager.filter(pk=choice.pk, question=self).update(votes=F('votes') + 1)
+            Question.manager.filter(pk=self.pk).update(total_votes=F('total_votes') + 1)
+            transaction.on_commit(lambda: invalidate_results(self.pk), using=db)
+            transaction.on_commit(
+                lambda: vote_cast.send(sender=Question, question_pk=self.pk, choice_pk=choice.pk), using=db
+            )
+
+    def recount_votes(self):
+        """ Rebuild the materialized total from the choices, nothing for a deleted question. """
+        votes = Choice.manager\
+            .filter(question=OuterRef('pk'))\
+            .values('question')\
+            .annotate(total=Sum('votes'))\
+            .values('total')
+        Question.manager.filter(pk=self.pk).update(total_votes=Coalesce(Subquery(votes), 0))
+        invalidate_results(self.pk)
+
     def __str__(self): return self.question_text
 
 
@@ -46,5 +146,8 @@ class Choice(Model):
 
     class Meta:
         ordering = ['-votes']
+        indexes = [
+            models.Index(fields=['question', '-votes'], name='polls_choice_results_idx'),
+        ]
 
     def __str__(self): return self.choice_text
@@ -0,0 +1,27 @@
+from django.db import connections, router, transaction
+
+from .models import Question, Choice, invalidate_results, invalidate_index
+
+
+def question_changed_signal(instance, **kwargs):
+    """ Cached results and index pages must not outlive the question. """
+    invalidate_results(instance.pk)
+    invalidate_index()
+
+
+def choice_changed_signal(instance, **kwargs):
+    """ A choice edited or removed outside of the voting keeps the question's total in sync.
+        The total is recounted once per question after the commit, not once per choice
+        of a bulk delete; for a question deleted with its choices the recount updates no row. """
+    db = router.db_for_write(Choice)
+    question_pk = instance.question_id
+    for _, pending, *_ in connections[db].run_on_commit:
+        if getattr(pending, 'question_pk', None) == question_pk:
+            break
+    else:
+        def recount():
+            recount.question_pk = None
+            Question(pk=question_pk).recount_votes()
+        recount.question_pk = question_pk
+        transaction.on_commit(recount, using=db)
+    invalidate_index()
@@ -1,9 +1,14 @@
 import datetime
+from unittest import mock
 
 from django.test import TestCase
 from django.utils import timezone
+from django.core.cache import cache
 
-from polls.models import Question, Choice
+from polls.models import (
+    Question, Choice, get_results, vote_cast,
+    index_cache_key, invalidate_index, INDEX_VERSION_KEY
+)
 from .tests import DB, create_question
 
 
@@ -32,3 +37,94 @@ class QuestionAndChoiceModelTests(TestCase):
         queryset = question.choice_set.all()
         self.assertIn(choice1, queryset)
         self.assertIn(choice2, queryset)
+
+
+class QuestionResultsTests(TestCase):
+    databases = [DB]
+
+    def setUp(self):
+        cache.clear()
+
+    def test_vote_counts_the_total(self):
+        question = create_question('Total Question?')
+        choice1 = Choice.manager.create(question=question, choice_text='Choice #1')
+        choice2 = Choice.manager.create(question=question, choice_text='Choice #2')
+        question.vote(choice1)
+        question.vote(choice1)
+        question.vote(choice2)
+        question.refresh_from_db()
+        self.assertEqual(question.total_votes, 3)
+
+        results = get_results(question.pk)
+        self.assertEqual([c.choice_text for c in results.results], ['Choice #1', 'Choice #2'])
+        self.assertAlmostEqual(results.results[0].percent, 200 / 3)
+
+    def test_results_cached_until_vote(self):
+        question = create_question('Cached Question?')
+        choice = Choice.manager.create(question=question, choice_text='Choice #1')
+        with self.assertNumQueries(1, using=DB):
+            get_results(question.pk)
+        with self.assertNumQueries(0, using=DB):
+            get_results(question.pk)
+
+        with self.captureOnCommitCallbacks(using=DB, execute=True):
+            question.vote(choice)
+        self.assertEqual(get_results(question.pk).total_votes, 1)
+
+    def test_vote_cast_sent_on_commit(self):
+        question = create_question('Signal Question?')
+        choice = Choice.manager.create(question=question, choice_text='Choice #1')
+        votes = []
+        receiver = lambda **kwargs: votes.append((kwargs['question_pk'], kwargs['choice_pk']))
+        vote_cast.connect(receiver, sender=Question)
+        self.addCleanup(vote_cast.disconnect, receiver, sender=Question)
+
+        with self.captureOnCommitCallbacks(using=DB, execute=True):
+            question.vote(choice)
+            self.assertEqual(votes, [])
+        self.assertEqual(votes, [(question.pk, choice.pk)])
+
+    def test_recounted_once_per_question(self):
+        question = create_question('Deleted Question?')
+        with self.captureOnCommitCallbacks(using=DB, execute=True):
+            for i in range(3):
+                Choice.manager.create(question=question, choice_text=f'Choice #{i}', votes=1)
+        question.refresh_from_db()
+        self.assertEqual(question.total_votes, 3)
+
+        with mock.patch.object(Question, 'recount_votes') as recount_votes:
+            with self.captureOnCommitCallbacks(using=DB, execute=True) as callbacks:
+                Choice.manager.filter(question=question).delete()
+            self.assertEqual(len(callbacks), 1)
+        recount_votes.assert_called_once()
+
+        # the question is deleted with its choices: the recount updates no row
+        question.refresh_from_db()
+        Choice.manager.create(question=question, choice_text='Choice #3')
+        with self.captureOnCommitCallbacks(using=DB, execute=True):
+            Choice.manager.filter(question=question).delete()
+            question.delete()
+        self.assertFalse(Question.manager.exists())
+
+    def test_index_version_never_reused(self):
+        """ An evicted version key must not bring back the pages of an old version. """
+        first = index_cache_key(1)
+        invalidate_index()
+        second = index_cache_key(1)
+        self.assertNotEqual(second, first)
+        cache.delete(INDEX_VERSION_KEY)
+        self.assertNotIn(index_cache_key(1), [first, second])
+        cache.delete(INDEX_VERSION_KEY)
+        invalidate_index()
+        self.assertNotIn(index_cache_key(1), [first, second])
+
+    def test_choice_edit_recounts_the_total(self):
+        question = create_question('Recount Question?')
+        with self.captureOnCommitCallbacks(using=DB, execute=True):
+            choice = Choice.manager.create(question=question, choice_text='Choice #1', votes=5)
+        question.refresh_from_db()
+        self.assertEqual(question.total_votes, 5)
+        with self.captureOnCommitCallbacks(using=DB, execute=True):
+            choice.delete()
+        question.refresh_from_db()
+        self.assertEqual(question.total_votes, 0)
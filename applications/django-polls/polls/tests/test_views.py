@@ -1,9 +1,13 @@
+import datetime
+
 from django.test import TestCase, override_settings
+from django.utils import timezone
 from django.urls import reverse
+from django.core.cache import cache
 from django.contrib.auth.hashers import make_password
 
 from accounts.models import ProxyUser
-from polls.models import Choice
+from polls.models import Question, Choice
 from polls.forms import ChoiceSetForm
 from .tests import DB, PASSWORD_HASHER, create_question, check_default_navbar
 
@@ -11,6 +15,9 @@ from .tests import DB, PASSWORD_HASHER, create_question, check_default_navbar
 class PollsIndexViewTests(TestCase):
     databases = ['default', DB]
 
+    def setUp(self):
+        cache.clear()
+
     def test_no_questions(self):
         """ If no questions exist, an appropriate message is displayed. """
         response = self.client.get(reverse('polls:index'))
@@ -55,6 +62,42 @@ class PollsIndexViewTests(TestCase):
             response.context['latest_question_list'], [question]
         )
 
+    def test_index_served_from_cache(self):
+        """ The second request doesn't touch the polls database. """
+        question = create_question(question_text='Cached question?')
+        Choice.manager.create(question=question, choice_text='Choice #1')
+        self.client.get(reverse('polls:index'))
+        with self.assertNumQueries(0, using=DB):
+            response = self.client.get(reverse('polls:index'))
+        self.assertContains(response, 'Choice #1')
+
+        question.question_text = 'Renamed question?'
+        question.save()
+        response = self.client.get(reverse('polls:index'))
+        self.assertContains(response, 'Renamed question?')
+
+    def test_cache_expires_with_the_next_question(self):
+        """ The cache timeout is cut down to the next scheduled pub_date. """
+        from polls.models import index_cache_timeout, INDEX_CACHE_TIMEOUT
+        self.assertEqual(index_cache_timeout(), INDEX_CACHE_TIMEOUT)
+        now = timezone.localtime()
+        Question.manager.create(question_text='Soon?', pub_date=now + datetime.timedelta(seconds=10))
+        with self.assertNumQueries(1, using=DB):
+            self.assertEqual(index_cache_timeout(now), 10)
+
+    def test_index_paginated(self):
+        for i in range(12):
+            create_question(question_text=f'Question {i}?', days=-i)
+        response = self.client.get(reverse('polls:index'))
+        self.assertEqual(len(response.context['latest_question_list']), 10)
+        self.assertTrue(response.context['is_paginated'])
+
+        response = self.client.get(reverse('polls:index'), {'page': 2})
+        self.assertQuerysetEqual(
+            response.context['latest_question_list'],
+            list(Question.manager.order_by('-pub_date')[10:])
+        )
+
     @override_settings(PASSWORD_HASHERS=PASSWORD_HASHER)
     def test_polls_navbar(self):
         response_anon = self.client.get(reverse('polls:index'))
@@ -107,6 +150,9 @@ class PollsDetailViewTests(TestCase):
 class PollsResultsTests(TestCase):
     databases = [DB]
 
+    def setUp(self):
+        cache.clear()
+
     def test_future_question(self):
         """ The results view of a question with a pub_date in the future returns a 404 not found. """
         future_question = create_question(question_text='Future question?', days=1)
@@ -127,5 +173,17 @@ class PollsResultsTests(TestCase):
         self.assertContains(response, choice1.choice_text)
         self.assertContains(response, choice2.choice_text)
 
+    def test_totals_and_percentages(self):
+        """ The results view shows the total and the share of each choice. """
+        question = create_question(question_text='Share Question?')
+        with self.captureOnCommitCallbacks(using=DB, execute=True):
+            Choice.manager.create(question=question, choice_text='Choice #1', votes=3)
+            Choice.manager.create(question=question, choice_text='Choice #2', votes=1)
+
+        response = self.client.get(reverse('polls:results', args=[question.pk]))
+        self.assertContains(response, '4 votes in total')
+        self.assertContains(response, '75%')
+        self.assertContains(response, '25%')
+
     def test_results_navbar(self):
         check_default_navbar(self, 'results')
@@ -47,7 +47,6 @@ class PollsResourcesTests(SimpleTestCase):
     app_dir = settings.PROJECT_MAIN_APPS['polls']['app_dir']
     resources = [
         app_dir / 'readme.md',
-        app_dir / 'polls' / 'db_router.py',
         app_dir / 'polls' / 'logs.py',
         app_dir / 'polls' / 'static' / 'polls' / 'favicon.ico',
         app_dir / 'polls' / 'static' / 'polls' / 'logo.jpg',
@@ -55,6 +54,5 @@ class PollsResourcesTests(SimpleTestCase):
     ]
 
     def test_base_resources_exists(self):
-        from polls.db_router import PollsRouter
         for item in self.resources:
             self.assertTrue(item.exists(), msg=item)
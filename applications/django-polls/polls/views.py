@@ -1,10 +1,13 @@
 import logging
 
+from django.http import Http404
 from django.urls import reverse_lazy
 from django.views import generic
 from django.utils import timezone
+from django.core.cache import cache
+from django.core.paginator import Page
 
-from .models import Question
+from .models import Question, get_results, index_cache_key, index_cache_timeout
 from .forms import ChoiceSetForm
 
 logger = logging.getLogger(__name__)
@@ -22,11 +25,35 @@ class NavbarMixin:
 
 
 class IndexView(generic.ListView):
+    """ Pages are cached until the next scheduled question goes live
+        or a question changes; the vote counts may lag by the cache timeout. """
     template_name = 'polls/index.html'
     context_object_name = 'latest_question_list'
+    paginate_by = 10
 
     def get_queryset(self):
-        return Question.manager.filter(pub_date__lte=timezone.localtime())
+        return Question.manager\
+            .prefetch_related('choice_set')\
+            .filter(pub_date__lte=timezone.localtime())
+
+    def paginate_queryset(self, queryset, page_size):
+        page_kwarg = self.page_kwarg
+        page_number = self.kwargs.get(page_kwarg) or self.request.GET.get(page_kwarg) or 1
+        key = index_cache_key(page_number)
+
+        cached = cache.get(key)
+        if cached is None:
+            paginator, page, object_list, is_paginated = super().paginate_queryset(queryset, page_size)
+            object_list = page.object_list = list(object_list)
+            cache.set(key, (paginator.count, page.number, object_list), index_cache_timeout())
+        else:
+            count, number, object_list = cached
+            paginator = self.get_paginator(queryset, page_size)
+            paginator.count = count
+            page = Page(object_list, number, paginator)
+            is_paginated = page.has_other_pages()
+
+        return paginator, page, object_list, is_paginated
 
 
 class DetailView(NavbarMixin, generic.UpdateView):
@@ -47,5 +74,9 @@ class ResultsView(NavbarMixin, generic.DetailView):
     template_name = 'polls/results.html'
     model = Question
 
-    def get_queryset(self):
-        return Question.manager.filter(pub_date__lte=timezone.localtime())
+    def get_object(self, queryset=None):
+        """ Served from the results cache, the publication date is checked on every request. """
+        question = get_results(self.kwargs.get('pk'))
+        if question is None or question.pub_date > timezone.localtime():
+            raise Http404('No question found matching the query')
+        return question
@@ -14,3 +14,8 @@ from django.core.asgi import get_asgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'alpaca.settings')
 
 application = get_asgi_application()
+
+# the metrics of the processes serving the requests are written for /metrics;
+# core is on the path once the settings are loaded
+from core.metrics import serve  # noqa: E402
+serve()
@@ -1,22 +1,95 @@
+from contextvars import ContextVar
+
 from django.conf import settings
+from django.db import connections
+
+""" Set for the requests that must see their own writes, see ReadYourWritesMiddleware. """
+read_primary = ContextVar('read_primary', default=False)
+
+STICKY_COOKIE = 'read_primary'
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS', 'TRACE')
+
+
+def get_app_databases() -> dict:
+    """ app_label -> database, for the main applications. """
+    return {app: conf['db']['name'] for app, conf in settings.PROJECT_MAIN_APPS.items()}
 
 
-class DefaultRouter:
-    """ A router that will redirect all requests to the default database,
-        except for the main applications. """
-    db_name = 'default'
-    app_labels = settings.PROJECT_MAIN_APPS.keys()
+def get_replicas() -> dict:
+    """ database -> its read-only replica, for the databases that have one. """
+    return {
+        conf['db']['name']: f"{conf['db']['name']}_replica"
+        for conf in settings.PROJECT_MAIN_APPS.values() if conf['db'].get('replica')
+    }
+
+
+class ProjectRouter:
+    """
+    A single router for the whole project, generated from the PROJECT_MAIN_APPS.
+    Main applications go to their own databases, everything else to the default.
+    Reads go to a replica if the database has one,
+    unless the request has just written something or a transaction is open.
+    """
+    default_db = 'default'
+    # users live in the default db, but are referred to from the app databases
+    shared_labels = {'auth'}
+
+    def __init__(self, app_databases=None, replicas=None):
+        self.app_databases = get_app_databases() if app_databases is None else app_databases
+        self.replicas = get_replicas() if replicas is None else replicas
+        self.replica_names = set(self.replicas.values())
+        self.relation_labels = set(self.app_databases) | self.shared_labels
 
     def db_for_read(self, model, **hints):
-        """ Attempts to read from the MAIN_APPS will go farther. """
-        if model._meta.app_label not in self.app_labels:
-            return self.db_name
+        db = self.app_databases.get(model._meta.app_label, self.default_db)
+        replica = self.replicas.get(db)
+        if replica is None or read_primary.get() or connections[db].in_atomic_block:
+            return db
         else:
-            return None
+            return replica
 
     def db_for_write(self, model, **hints):
-        """ Attempts to write to the MAIN_APPS will go farther. """
-        if model._meta.app_label not in self.app_labels:
-            return self.db_name
+        return self.app_databases.get(model._meta.app_label, self.default_db)
+
+    def allow_relation(self, obj1, obj2, **hints):
+        """ Allow any relation if a model in the main applications or the auth is involved. """
+        if obj1._meta.app_label in self.relation_labels or \
+                obj2._meta.app_label in self.relation_labels:
+            return True
         else:
             return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        """ The main applications only appear in their databases, replicas are never migrated. """
+        if db in self.replica_names:
+            return False
+        elif app_label in self.app_databases:
+            return db == self.app_databases[app_label]
+        else:
+            return None
+
+
+class ReadYourWritesMiddleware:
+    """ Reads of a POST request, and of the requests that follow it for a few seconds,
+        go to the primary databases, so users always see their own changes.
+        Does nothing if no database has a replica. """
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.sticky_seconds = getattr(settings, 'REPLICA_STICKY_SECONDS', 5)
+        self.replicas = get_replicas()
+
+    def __call__(self, request):
+        if not self.replicas:
+            return self.get_response(request)
+
+        writes = request.method not in SAFE_METHODS
+        token = read_primary.set(writes or STICKY_COOKIE in request.COOKIES)
+        try:
+            response = self.get_response(request)
+        finally:
+            read_primary.reset(token)
+
+        if writes:
+            response.set_cookie(STICKY_COOKIE, '1', max_age=self.sticky_seconds,
+                                secure=request.is_secure(), httponly=True, samesite='Lax')
+        return response
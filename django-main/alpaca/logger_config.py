@@ -13,7 +13,7 @@ if 'test' not in sys.argv:
                 'level': 'INFO',
             },
             'django.server': {
-                'handlers': ['django.server', 'django_main_file'],
+                'handlers': ['django_server', 'django_main_file'],
                 'level': 'INFO',
                 'propagate': False,
             },
@@ -25,13 +25,13 @@ if 'test' not in sys.argv:
         'handlers': {
             'django_main_file': {
                 'level': 'ERROR',
-                'class': 'logging.FileHandler',
+                'class': 'core.log_handlers.GzipRotatingFileHandler',
                 'filename': BASE_DIR / 'django-main.log',
                 'formatter': 'file',
             },
             'detail_errors_file': {
                 'level': 'ERROR',
-                'class': 'logging.FileHandler',
+                'class': 'core.log_handlers.GzipRotatingFileHandler',
                 'filename': BASE_DIR / 'detail-errors.log',
                 'formatter': 'file_errors',
             },
@@ -46,7 +46,7 @@ if 'test' not in sys.argv:
                 'filters': ['require_debug_true'],
                 'class': 'logging.StreamHandler',
             },
-            'django.server': {
+            'django_server': {
                 'level': 'INFO',
                 'class': 'logging.StreamHandler',
                 'formatter': 'django.server',
@@ -94,7 +94,7 @@ if 'test' not in sys.argv:
         handler = {
             app_handler_name: {
                 'level': 'INFO',
-                'class': 'logging.FileHandler',
+                'class': 'core.log_handlers.GzipRotatingFileHandler',
                 'filename': ALL_PROJECT_APPS[app]['app_dir'] / f'{app}.log',
                 'formatter': 'file',
             }
@@ -102,7 +102,12 @@ if 'test' not in sys.argv:
         LOGGING['loggers'].update(logger)
         LOGGING['handlers'].update(handler)
 
+    # the loggers put the records in one queue, its listener thread writes them,
+    # see core.log_handlers
+    LOGGING_CONFIG = 'core.log_handlers.configure'
+
 else:
+    LOGGING_CONFIG = 'logging.config.dictConfig'
     LOGGING = {
         'version': 1,
         'disable_existing_loggers': False,
@@ -1,4 +1,5 @@
 import sys
+import tempfile
 from pathlib import Path
 
 
@@ -14,20 +15,68 @@ for item in PROJECT_APPS_DIR.iterdir():
     if item.is_dir() and str(item) not in sys.path:
         sys.path.append(str(item))
 
+# https://www.sqlite.org/pragma.html
+# Applied to every new connection by core.db.apply_sqlite_profile.
+SQLITE_PROFILE = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'mmap_size': 64 * 1024 * 1024,
+    'cache_size': -16 * 1024,
+    'temp_store': 'MEMORY',
+    'busy_timeout': 5000,
+}
+CONN_MAX_AGE = 600
+
+# A read-only connection (mode=ro) to the same file serves the reads of an app database,
+# taking them off its single writer connection. 'replica': True in the app's db to enable.
+REPLICA_STICKY_SECONDS = 5
+
+# All the applications in the default database, so that their tables can be joined,
+# e.g. Profile.user. The per-app .sqlite3 files are merged into it by manage.py merge_databases.
+SINGLE_DATABASE = False
+
+# The technical logs of the model changes in <app>.log, written by signal receivers on every save.
+MODEL_LOGS = True
+
+# The runtime metrics of every serving process are written to a file of its own in the directory,
+# /metrics sums them; see core.metrics. Empty it when the server is deployed anew.
+METRICS_DIR = Path(tempfile.gettempdir()) / 'alpaca-metrics'
+if 'test' in sys.argv:
+    # removed at exit, the tests never read the files of the server
+    _metrics_tmp_dir = tempfile.TemporaryDirectory(prefix='alpaca-metrics-')
+    METRICS_DIR = Path(_metrics_tmp_dir.name)
+
+# The cache shared by all the processes of the server, so that the invalidations
+# of one worker reach the others: the poll results and index pages, the comment counts.
+CACHE_DIR = Path(tempfile.gettempdir()) / 'alpaca-cache'
+
+# The share of the requests timed, the staff get the Server-Timing header; see core.server_timing.
+SERVER_TIMING_SAMPLE_RATE = 1.0 if DEBUG else 0.05
+
+DEFAULT_DB = {'conn_max_age': CONN_MAX_AGE, 'sqlite': SQLITE_PROFILE}
+
 PROJECT_MAIN_APPS = {
     'polls': {
         'app_dir': PROJECT_APPS_DIR / 'django-polls',
-        'db': {'name': 'polls_db', 'dependencies': [], 'router_class': 'PollsRouter'}
+        'db': {'name': 'polls_db', 'dependencies': [],
+               'conn_max_age': CONN_MAX_AGE, 'replica': False, 'sqlite': SQLITE_PROFILE}
     },
     'encyclopedia': {
         'app_dir': PROJECT_APPS_DIR / 'django-cs50web-wiki',
-        'db': {'name': 'encyclopedia_db', 'dependencies': [], 'router_class': 'WikiRouter'}
+        'db': {'name': 'encyclopedia_db', 'dependencies': [],
+               'conn_max_age': CONN_MAX_AGE, 'replica': False, 'sqlite': SQLITE_PROFILE}
     },
     'auctions': {
         'app_dir': PROJECT_APPS_DIR / 'django-cs50web-commerce',
-        'db': {'name': 'auctions_db', 'dependencies': ['default'], 'router_class': 'CommerceRouter'}
+        'db': {'name': 'auctions_db', 'dependencies': ['default'],
+               'conn_max_age': CONN_MAX_AGE, 'replica': False,
+               'sqlite': {**SQLITE_PROFILE, 'cache_size': -32 * 1024, 'busy_timeout': 10000}}
     },
 }
+if SINGLE_DATABASE:
+    for conf in PROJECT_MAIN_APPS.values():
+        conf['db'].update(name='default', dependencies=[], replica=False)
+
 ALL_PROJECT_APPS = {
     'core': {'app_dir': PROJECT_APPS_DIR / 'django-core-app', 'db': False},
     'accounts': {'app_dir': PROJECT_APPS_DIR / 'django-accounts', 'db': False},
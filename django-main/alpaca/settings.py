@@ -13,11 +13,14 @@ As a security measure, Django will exclude from debug pages any setting
 whose name partial includes any of the following:
 'API', 'KEY', 'PASS', 'SECRET', 'SIGNATURE', 'TOKEN'
 """
+import sys
 import secrets
 
 from .presets import (
     DEBUG, BASE_DIR, PROJECT_ROOT_DIR, PROJECT_APPS_DIR,
-    ALL_PROJECT_APPS, PROJECT_MAIN_APPS
+    ALL_PROJECT_APPS, PROJECT_MAIN_APPS, DEFAULT_DB,
+    REPLICA_STICKY_SECONDS, SINGLE_DATABASE, MODEL_LOGS, METRICS_DIR,
+    SERVER_TIMING_SAMPLE_RATE, CACHE_DIR
 )
 
 
@@ -51,8 +54,8 @@ WSGI_APPLICATION = 'alpaca.wsgi.application'
 """ To install or change an app:
 1. Append the [app].apps.ConfigClass to the INSTALLED_APPS.
 2. Append the app [app].urls to the alpaca.urls.
-3. Configure the app in the alpaca.presets.
-3.1. Set up the app db router if needed.
+3. Configure the app in the alpaca.presets,
+   the database router is generated from the PROJECT_MAIN_APPS.
 """
 INSTALLED_APPS = [
     'django.contrib.admin',
@@ -61,7 +64,6 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
-    'debug_toolbar',
 
     'core.apps.CoreAppConfig',
     'accounts.apps.AccountsConfig',
@@ -70,6 +72,8 @@ INSTALLED_APPS = [
     'auctions.apps.AuctionsConfig',
 ]
 MIDDLEWARE = [
+    'core.metrics.MetricsMiddleware',
+    'core.server_timing.ServerTimingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -77,8 +81,13 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
-    'debug_toolbar.middleware.DebugToolbarMiddleware'
+    'alpaca.db_router.ReadYourWritesMiddleware',
 ]
+if DEBUG:
+    # the Server-Timing header is enough in production, see core.server_timing
+    INSTALLED_APPS.append('debug_toolbar')
+    MIDDLEWARE.append('debug_toolbar.middleware.DebugToolbarMiddleware')
+
 TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
@@ -119,11 +128,14 @@ SESSION_COOKIE_SECURE = True
 
 # <database>
 # https://docs.djangoproject.com/en/4.0/ref/settings/#databases
+# PRAGMAS — the SQLite profile of a database, see alpaca.presets and core.db
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'django-main.sqlite3',
         'TIME_ZONE': 'Europe/Moscow',
+        'CONN_MAX_AGE': DEFAULT_DB['conn_max_age'],
+        'PRAGMAS': DEFAULT_DB['sqlite'],
         'TEST': {
             'NAME': None,
             'DEPENDENCIES': [],
@@ -133,16 +145,18 @@ DATABASES = {
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 # https://docs.djangoproject.com/en/4.0/topics/db/multi-db/#topics-db-multi-db-routing
-DATABASE_ROUTERS = ['alpaca.db_router.DefaultRouter']
+DATABASE_ROUTERS = ['alpaca.db_router.ProjectRouter']
 
 for app in ALL_PROJECT_APPS:
-    if ALL_PROJECT_APPS[app]['db'] is not False:
+    if ALL_PROJECT_APPS[app]['db'] is not False and not SINGLE_DATABASE:
         app_db = ALL_PROJECT_APPS[app]['db']
         dict_ = {
             app_db['name']: {
                 'ENGINE': 'django.db.backends.sqlite3',
                 'NAME': ALL_PROJECT_APPS[app]['app_dir'] / f'{app}.sqlite3',
                 'TIME_ZONE': 'Europe/Moscow',
+                'CONN_MAX_AGE': app_db['conn_max_age'],
+                'PRAGMAS': app_db['sqlite'],
                 'TEST': {
                     'NAME': None,
                     'DEPENDENCIES': app_db['dependencies']
@@ -150,7 +164,20 @@ for app in ALL_PROJECT_APPS:
             },
         }
         DATABASES.update(dict_)
-        DATABASE_ROUTERS.append(f"{app}.db_router.{app_db['router_class']}")
+
+        if app_db.get('replica'):
+            replica_profile = {k: v for k, v in app_db['sqlite'].items()
+                               if k not in ('journal_mode', 'synchronous')}
+            db_path = ALL_PROJECT_APPS[app]['app_dir'] / f'{app}.sqlite3'
+            DATABASES[f"{app_db['name']}_replica"] = {
+                'ENGINE': 'django.db.backends.sqlite3',
+                'NAME': f'{db_path.as_uri()}?mode=ro',
+                'OPTIONS': {'uri': True},
+                'TIME_ZONE': 'Europe/Moscow',
+                'CONN_MAX_AGE': app_db['conn_max_age'],
+                'PRAGMAS': replica_profile,
+                'TEST': {'MIRROR': app_db['name']},
+            }
 # </database>
 
 
@@ -170,6 +197,20 @@ AUTH_PASSWORD_VALIDATORS = [
 # </sessions>
 
 
+# <cache>
+# https://docs.djangoproject.com/en/4.0/topics/cache/
+# One for all the workers; the tests run in one process, each with an empty cache.
+if 'test' not in sys.argv:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': CACHE_DIR,
+            'OPTIONS': {'MAX_ENTRIES': 5000},
+        }
+    }
+# </cache>
+
+
 # <internationalization>
 # https://docs.djangoproject.com/en/4.0/topics/i18n/
 LANGUAGE_COOKIE_SECURE = True
@@ -191,7 +232,7 @@ SHORT_DATE_FORMAT = 'Y.n.j P'
 
 
 # <logging>
-from .logger_config import LOGGING
+from .logger_config import LOGGING, LOGGING_CONFIG
 # </logging>
 
 